@@ -4,12 +4,128 @@ Data analysis algorithms for MediTrack
 from datetime import datetime, timedelta
 from collections import Counter, defaultdict
 
+# Age groups as (label, oldest age in the group); the last group is open-ended
+AGE_GROUPS = [("0-18", 18), ("19-35", 35), ("36-50", 50), ("51-65", 65), ("66+", None)]
+
+DAYS_OF_WEEK = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+def age_group(age):
+    """Label of the age group an age in years falls into"""
+    for label, oldest in AGE_GROUPS:
+        if oldest is None or age <= oldest:
+            return label
+
+class CountingAccumulator:
+    """
+    Base of the analysis accumulators: a total plus Counters
+    
+    update() folds in a batch of rows, merge() adds the counts of another
+    accumulator (e.g. one filled by another process from another primary
+    key range) and finalize() builds the result. Accumulators over
+    consecutive chunks, merged in chunk order, give the same result as one
+    pass over all the rows. to_state() and from_state() convert the counts
+    to and from JSON-compatible data, keeping key types and order.
+    """
+    
+    # Attribute holding the number of rows, and the Counter attributes
+    total_field = None
+    counter_fields = ()
+    
+    def merge(self, other):
+        """Add the counts of another accumulator of the same class and return this one"""
+        setattr(self, self.total_field, getattr(self, self.total_field) + getattr(other, self.total_field))
+        for name in self.counter_fields:
+            getattr(self, name).update(getattr(other, name))
+        return self
+    
+    def to_state(self):
+        """The counts as JSON-compatible data, Counters as lists of [key, count] pairs"""
+        state = {self.total_field: getattr(self, self.total_field)}
+        for name in self.counter_fields:
+            state[name] = [[key, count] for key, count in getattr(self, name).items()]
+        return state
+    
+    @classmethod
+    def from_state(cls, state, *args):
+        """
+        Accumulator holding counts saved by to_state
+        
+        Args:
+            state: Data returned by to_state
+            *args: Constructor arguments
+            
+        Returns:
+            The accumulator
+        """
+        accumulator = cls(*args)
+        setattr(accumulator, cls.total_field, state[cls.total_field])
+        for name in cls.counter_fields:
+            setattr(accumulator, name, Counter({key: count for key, count in state[name]}))
+        return accumulator
+
+class DemographicsAccumulator(CountingAccumulator):
+    """Single-pass, mergeable state of analyze_patient_demographics"""
+    
+    total_field = "total_patients"
+    counter_fields = ("age_groups", "genders", "insurance_types", "reg_months")
+    
+    def __init__(self, today=None):
+        self.today = today or datetime.now().date()
+        self.total_patients = 0
+        self.age_groups = Counter()
+        self.genders = Counter()
+        self.insurance_types = Counter()
+        self.reg_months = Counter()
+    
+    def update(self, patients):
+        """
+        Fold a batch of patients into the counts
+        
+        Args:
+            patients: List or lazy iterable of patient objects (read in one pass)
+            
+        Returns:
+            The accumulator
+        """
+        today = self.today
+        for patient in patients:
+            self.total_patients += 1
+            
+            # Calculate age
+            age = today.year - patient.dob.year - ((today.month, today.day) < (patient.dob.month, patient.dob.day))
+            
+            # Update age groups
+            self.age_groups[age_group(age)] += 1
+            
+            # Update gender counter if gender attribute exists
+            if hasattr(patient, 'gender'):
+                self.genders[patient.gender] += 1
+            
+            # Update insurance counter
+            if hasattr(patient, 'insurance_info') and patient.insurance_info:
+                # Extract insurance type from insurance_info
+                insurance_type = patient.insurance_info.split()[0] if patient.insurance_info else "None"
+                self.insurance_types[insurance_type] += 1
+            
+            # Update registration trends
+            if hasattr(patient, 'reg_date'):
+                reg_month = patient.reg_date.strftime("%Y-%m")
+                self.reg_months[reg_month] += 1
+        
+        return self
+    
+    def finalize(self):
+        """Result dictionary of the patients folded in so far"""
+        return demographics_result(
+            self.total_patients, self.age_groups, self.genders, self.insurance_types, self.reg_months
+        )
+
 def analyze_patient_demographics(patients):
     """
     Analyze patient demographics
     
     Args:
-        patients: List of patient objects
+        patients: List or lazy iterable of patient objects (read in one pass)
         
     Returns:
         Dictionary with demographic analysis
@@ -17,61 +133,30 @@ def analyze_patient_demographics(patients):
     if not patients:
         return {"error": "No patients to analyze"}
     
-    today = datetime.now().date()
-    
-    # Age distribution
-    age_groups = {
-        "0-18": 0,
-        "19-35": 0,
-        "36-50": 0,
-        "51-65": 0,
-        "66+": 0
-    }
-    
-    # Gender distribution (assuming gender is stored in the patient object)
-    genders = Counter()
-    
-    # Insurance distribution
-    insurance_types = Counter()
+    return DemographicsAccumulator().update(patients).finalize()
+
+def demographics_result(total_patients, age_groups, genders, insurance_types, reg_months):
+    """
+    Result dictionary of analyze_patient_demographics from its counters
     
-    # Registration trends
-    reg_months = Counter()
+    Shared with the SQL implementation in db.analytics.
     
-    for patient in patients:
-        # Calculate age
-        age = today.year - patient.dob.year - ((today.month, today.day) < (patient.dob.month, patient.dob.day))
-        
-        # Update age groups
-        if age <= 18:
-            age_groups["0-18"] += 1
-        elif age <= 35:
-            age_groups["19-35"] += 1
-        elif age <= 50:
-            age_groups["36-50"] += 1
-        elif age <= 65:
-            age_groups["51-65"] += 1
-        else:
-            age_groups["66+"] += 1
-        
-        # Update gender counter if gender attribute exists
-        if hasattr(patient, 'gender'):
-            genders[patient.gender] += 1
-        
-        # Update insurance counter
-        if hasattr(patient, 'insurance_info') and patient.insurance_info:
-            # Extract insurance type from insurance_info
-            insurance_type = patient.insurance_info.split()[0] if patient.insurance_info else "None"
-            insurance_types[insurance_type] += 1
+    Args:
+        total_patients: Number of patients
+        age_groups: Counter of patients per AGE_GROUPS label
+        genders: Counter of patients per gender
+        insurance_types: Counter of patients per insurance type
+        reg_months: Counter of registrations per "YYYY-MM" month
         
-        # Update registration trends
-        if hasattr(patient, 'reg_date'):
-            reg_month = patient.reg_date.strftime("%Y-%m")
-            reg_months[reg_month] += 1
+    Returns:
+        Dictionary with demographic analysis
+    """
+    if total_patients == 0:
+        return {"error": "No patients to analyze"}
     
     # Calculate percentages
-    total_patients = len(patients)
-    age_distribution = {group: {"count": count, "percentage": (count / total_patients) * 100} 
-                        for group, count in age_groups.items()}
+    age_distribution = {label: {"count": age_groups[label], "percentage": (age_groups[label] / total_patients) * 100} 
+                        for label, _ in AGE_GROUPS}
     
     gender_distribution = {gender: {"count": count, "percentage": (count / total_patients) * 100} 
                           for gender, count in genders.items()}
@@ -90,12 +175,107 @@ def analyze_patient_demographics(patients):
         "registration_trends": sorted_reg_months
     }
 
+class AppointmentPatternsAccumulator(CountingAccumulator):
+    """
+    Single-pass, mergeable state of analyze_appointment_patterns
+    
+    Doctors are counted in order of first appearance, which decides the
+    order of ties in the top doctors, so merge chunks in the order they
+    were read. Appointments can also be taken out again with retract(),
+    e.g. with their old values when they change.
+    """
+    
+    total_field = "total_appointments"
+    counter_fields = ("days_of_week", "hours_of_day", "status_counts", "doctor_appointments")
+    
+    def __init__(self):
+        self.total_appointments = 0
+        self.days_of_week = Counter()
+        self.hours_of_day = Counter()
+        self.status_counts = Counter()
+        self.doctor_appointments = Counter()
+    
+    def update(self, appointments):
+        """
+        Fold a batch of appointments into the counts
+        
+        Args:
+            appointments: List or lazy iterable of appointment objects (read in one pass)
+            
+        Returns:
+            The accumulator
+        """
+        for appointment in appointments:
+            self.total_appointments += 1
+            
+            # Day of week
+            day_of_week = appointment.schedule_time.strftime("%A")
+            self.days_of_week[day_of_week] += 1
+            
+            # Hour of day
+            hour = appointment.schedule_time.hour
+            self.hours_of_day[hour] += 1
+            
+            # Status
+            self.status_counts[appointment.status] += 1
+            
+            # Doctor workload
+            if hasattr(appointment, 'doctor') and hasattr(appointment.doctor, 'id'):
+                doctor_id = appointment.doctor.id
+                self.doctor_appointments[doctor_id] += 1
+        
+        return self
+    
+    def add(self, schedule_time, status, doctor_id=None, count=1):
+        """
+        Count one appointment given by its values
+        
+        Args:
+            schedule_time: Start time of the appointment
+            status: Appointment status
+            doctor_id: ID of the appointment's doctor, if any
+            count: 1 to add the appointment, -1 to take it out
+        """
+        self.total_appointments += count
+        self.days_of_week[schedule_time.strftime("%A")] += count
+        self.hours_of_day[schedule_time.hour] += count
+        self.status_counts[status] += count
+        if doctor_id is not None:
+            self.doctor_appointments[doctor_id] += count
+    
+    def retract(self, values):
+        """
+        Take appointments counted before out of the counts
+        
+        Args:
+            values: Iterable of (schedule_time, status, doctor_id) tuples
+            
+        Returns:
+            The accumulator
+        """
+        for schedule_time, status, doctor_id in values:
+            self.add(schedule_time, status, doctor_id, count=-1)
+        
+        # Drop what no appointment has any more, as a fresh count would
+        for name in self.counter_fields:
+            counter = getattr(self, name)
+            for key in [key for key, count in counter.items() if count == 0]:
+                del counter[key]
+        return self
+    
+    def finalize(self):
+        """Result dictionary of the appointments folded in so far"""
+        return appointment_patterns_result(
+            self.total_appointments, self.days_of_week, self.hours_of_day, self.status_counts,
+            self.doctor_appointments
+        )
+
 def analyze_appointment_patterns(appointments):
     """
     Analyze appointment patterns
     
     Args:
-        appointments: List of appointment objects
+        appointments: List or lazy iterable of appointment objects (read in one pass)
         
     Returns:
         Dictionary with appointment analysis
@@ -103,57 +283,38 @@ def analyze_appointment_patterns(appointments):
     if not appointments:
         return {"error": "No appointments to analyze"}
     
-    # Day of week distribution
-    days_of_week = Counter()
-    
-    # Hour of day distribution
-    hours_of_day = Counter()
-    
-    # Status distribution
-    status_counts = Counter()
-    
-    # Doctor workload
-    doctor_appointments = defaultdict(int)
-    
-    # Cancellation rate
-    total_appointments = len(appointments)
-    cancelled_appointments = 0
+    return AppointmentPatternsAccumulator().update(appointments).finalize()
+
+def appointment_patterns_result(total_appointments, days_of_week, hours_of_day, status_counts,
+                                doctor_appointments):
+    """
+    Result dictionary of analyze_appointment_patterns from its counters
     
-    # No-show rate (if status includes "no-show")
-    no_show_appointments = 0
+    Shared with the SQL implementation in db.analytics.
     
-    for appointment in appointments:
-        # Day of week
-        day_of_week = appointment.schedule_time.strftime("%A")
-        days_of_week[day_of_week] += 1
-        
-        # Hour of day
-        hour = appointment.schedule_time.hour
-        hours_of_day[hour] += 1
-        
-        # Status
-        status_counts[appointment.status] += 1
-        
-        # Doctor workload
-        if hasattr(appointment, 'doctor') and hasattr(appointment.doctor, 'id'):
-            doctor_id = appointment.doctor.id
-            doctor_appointments[doctor_id] += 1
-        
-        # Cancellation count
-        if appointment.status == "cancelled":
-            cancelled_appointments += 1
+    Args:
+        total_appointments: Number of appointments
+        days_of_week: Counter of appointments per weekday name
+        hours_of_day: Counter of appointments per hour of the day
+        status_counts: Counter of appointments per status
+        doctor_appointments: Mapping of doctor ID to number of appointments
         
-        # No-show count
-        if appointment.status == "no-show":
-            no_show_appointments += 1
+    Returns:
+        Dictionary with appointment analysis
+    """
+    if total_appointments == 0:
+        return {"error": "No appointments to analyze"}
+    
+    # Cancellation and no-show counts
+    cancelled_appointments = status_counts["cancelled"]
+    no_show_appointments = status_counts["no-show"]
     
     # Calculate rates
     cancellation_rate = (cancelled_appointments / total_appointments) * 100 if total_appointments > 0 else 0
     no_show_rate = (no_show_appointments / total_appointments) * 100 if total_appointments > 0 else 0
     
     # Sort distributions
-    days_sorted = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-    days_of_week_sorted = {day: days_of_week[day] for day in days_sorted}
+    days_of_week_sorted = {day: days_of_week[day] for day in DAYS_OF_WEEK}
     
     hours_of_day_sorted = dict(sorted(hours_of_day.items()))
     
@@ -170,12 +331,64 @@ def analyze_appointment_patterns(appointments):
         "no_show_rate": no_show_rate
     }
 
+class MedicalConditionsAccumulator(CountingAccumulator):
+    """Single-pass, mergeable state of analyze_medical_conditions"""
+    
+    total_field = "total_records"
+    counter_fields = ("diagnoses", "treatments", "abnormal_tests")
+    
+    def __init__(self):
+        self.total_records = 0
+        self.diagnoses = Counter()
+        self.treatments = Counter()
+        self.abnormal_tests = Counter()
+    
+    def update(self, medical_records):
+        """
+        Fold a batch of medical records into the counts
+        
+        Args:
+            medical_records: List or lazy iterable of medical record objects
+                             with their lab tests loaded (read in one pass)
+            
+        Returns:
+            The accumulator
+        """
+        for record in medical_records:
+            self.total_records += 1
+            
+            # Extract diagnoses (assuming diagnoses are comma-separated)
+            if hasattr(record, 'diagnosis'):
+                for diagnosis in record.diagnosis.split(','):
+                    self.diagnoses[diagnosis.strip()] += 1
+            
+            # Extract treatments (assuming treatments are comma-separated)
+            if hasattr(record, 'treatment_plan'):
+                for treatment in record.treatment_plan.split(','):
+                    self.treatments[treatment.strip()] += 1
+            
+            # Count abnormal lab tests
+            if hasattr(record, 'lab_tests'):
+                for test in record.lab_tests:
+                    if test.is_abnormal:
+                        self.abnormal_tests[test.test_name] += 1
+        
+        return self
+    
+    def finalize(self):
+        """Result dictionary of the medical records folded in so far"""
+        return medical_conditions_result(self.total_records, self.diagnoses, self.treatments, self.abnormal_tests)
+
 def analyze_medical_conditions(medical_records):
     """
     Analyze medical conditions from medical records
     
+    Lab tests are read from every record, so database records should come
+    with lab_tests already loaded (MedicalRecordRepository.iter_for_analysis)
+    rather than lazily, one query per record.
+    
     Args:
-        medical_records: List of medical record objects
+        medical_records: List or lazy iterable of medical record objects (read in one pass)
         
     Returns:
         Dictionary with medical condition analysis
@@ -183,31 +396,25 @@ def analyze_medical_conditions(medical_records):
     if not medical_records:
         return {"error": "No medical records to analyze"}
     
-    # Common diagnoses
-    diagnoses = Counter()
-    
-    # Common treatments
-    treatments = Counter()
+    return MedicalConditionsAccumulator().update(medical_records).finalize()
+
+def medical_conditions_result(total_records, diagnoses, treatments, abnormal_tests):
+    """
+    Result dictionary of analyze_medical_conditions from its counters
     
-    # Abnormal lab tests
-    abnormal_tests = Counter()
+    Shared with the SQL implementation in db.analytics.
     
-    for record in medical_records:
-        # Extract diagnoses (assuming diagnoses are comma-separated)
-        if hasattr(record, 'diagnosis'):
-            for diagnosis in record.diagnosis.split(','):
-                diagnoses[diagnosis.strip()] += 1
-        
-        # Extract treatments (assuming treatments are comma-separated)
-        if hasattr(record, 'treatment_plan'):
-            for treatment in record.treatment_plan.split(','):
-                treatments[treatment.strip()] += 1
+    Args:
+        total_records: Number of medical records
+        diagnoses: Counter of records per diagnosis
+        treatments: Counter of records per treatment
+        abnormal_tests: Counter of abnormal results per lab test name
         
-        # Count abnormal lab tests
-        if hasattr(record, 'lab_tests'):
-            for test in record.lab_tests:
-                if test.is_abnormal:
-                    abnormal_tests[test.test_name] += 1
+    Returns:
+        Dictionary with medical condition analysis
+    """
+    if total_records == 0:
+        return {"error": "No medical records to analyze"}
     
     # Get top diagnoses, treatments, and abnormal tests
     top_diagnoses = dict(diagnoses.most_common(10))
@@ -215,7 +422,7 @@ def analyze_medical_conditions(medical_records):
     top_abnormal_tests = dict(abnormal_tests.most_common(10))
     
     return {
-        "total_records": len(medical_records),
+        "total_records": total_records,
         "top_diagnoses": top_diagnoses,
         "top_treatments": top_treatments,
         "top_abnormal_tests": top_abnormal_tests
@@ -0,0 +1,193 @@
+"""
+Vectorized NumPy versions of the data analysis functions
+
+The functions here take columns instead of objects: a dictionary of
+equal-length NumPy arrays holding only the fields the analysis reads
+(dates as datetime64, IDs as integers). Ages, weekdays, hours and months
+are computed on whole arrays and counted with np.digitize, np.bincount and
+np.unique, and the results are built by the same helpers as
+algorithms.data_analysis, so they are identical to what those functions
+return for the same rows.
+
+Columns come from AnalyticsRepository.load_patient_columns and
+load_appointment_columns, or from a CSV file (such as a report export)
+through read_csv_columns. NumPy is optional: it is only imported when one
+of these functions runs.
+"""
+import csv
+from collections import Counter
+from datetime import date
+
+from algorithms.data_analysis import (
+    AGE_GROUPS, DAYS_OF_WEEK, appointment_patterns_result, demographics_result
+)
+
+# Column types of the patient and appointment analyses
+PATIENT_COLUMNS = {"dob": "datetime64[D]", "reg_date": "datetime64[D]", "insurance_info": object}
+APPOINTMENT_COLUMNS = {"schedule_time": "datetime64[s]", "status": object, "doctor_id": "int64"}
+
+def _numpy():
+    """The numpy module, with a helpful error if it is not installed"""
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("NumPy is required for the vectorized analysis. Install it with 'pip install numpy'")
+    return numpy
+
+def to_columns(values, dtypes):
+    """
+    Build typed column arrays from per-column value sequences
+    
+    Args:
+        values: Mapping of column name to a sequence of values (dates,
+                datetimes, ISO strings, numbers or None; a missing integer
+                becomes -1)
+        dtypes: Mapping of column name to NumPy dtype, e.g. PATIENT_COLUMNS
+        
+    Returns:
+        Dictionary of column name to NumPy array
+    """
+    np = _numpy()
+    columns = {}
+    for name, dtype in dtypes.items():
+        if name not in values:
+            continue
+        column = values[name]
+        if dtype is object:
+            array = np.empty(len(column), dtype=object)
+            array[:] = list(column)
+        elif np.issubdtype(np.dtype(dtype), np.integer):
+            # Missing IDs become -1
+            array = np.array([-1 if value is None else value for value in column], dtype=dtype)
+        else:
+            array = np.array(column, dtype=dtype)
+        columns[name] = array
+    return columns
+
+def read_csv_columns(path, dtypes):
+    """
+    Read the columns an analysis needs from a CSV file
+    
+    Only the listed columns are kept; empty cells become NaT for dates and
+    None for text.
+    
+    Args:
+        path: CSV file with a header row (e.g. written by report export)
+        dtypes: Mapping of column name to NumPy dtype, e.g. APPOINTMENT_COLUMNS
+        
+    Returns:
+        Dictionary of column name to NumPy array
+    """
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        wanted = [(name, header.index(name)) for name in dtypes if name in header]
+        values = {name: [] for name, _ in wanted}
+        for row in reader:
+            for name, index in wanted:
+                values[name].append(row[index] if row[index] != "" else None)
+    
+    return to_columns(values, dtypes)
+
+def _ordered_counts(np, values):
+    """Counter of values, keys in order of first appearance like counting in a loop"""
+    unique, first_index, counts = np.unique(values, return_index=True, return_counts=True)
+    order = np.argsort(first_index, kind="stable")
+    return Counter({unique[i].item(): int(counts[i]) for i in order})
+
+def _ages(np, dob, today):
+    """Age in whole years at today for a datetime64[D] array of birth dates"""
+    years = dob.astype("datetime64[Y]").astype(np.int64) + 1970
+    months = dob.astype("datetime64[M]")
+    month = months.astype(np.int64) % 12 + 1
+    day = (dob - months.astype("datetime64[D]")).astype(np.int64) + 1
+    birthday_ahead = (today.month < month) | ((today.month == month) & (today.day < day))
+    return today.year - years - birthday_ahead
+
+def analyze_patient_demographics(columns, today=None):
+    """
+    Vectorized analyze_patient_demographics
+    
+    Args:
+        columns: Dictionary with a datetime64[D] "dob" array and optionally
+                 "reg_date", "insurance_info" and "gender" arrays
+        today: Date ages are computed at (defaults to today)
+        
+    Returns:
+        Dictionary with demographic analysis
+    """
+    np = _numpy()
+    today = today or date.today()
+    
+    dob = columns["dob"]
+    total_patients = len(dob)
+    if total_patients == 0:
+        return {"error": "No patients to analyze"}
+    
+    # Age groups: digitize against the first age of each following group
+    bins = [oldest + 1 for _, oldest in AGE_GROUPS if oldest is not None]
+    group_counts = np.bincount(np.digitize(_ages(np, dob, today), bins), minlength=len(AGE_GROUPS))
+    age_groups = Counter({label: int(count) for (label, _), count in zip(AGE_GROUPS, group_counts)})
+    
+    genders = Counter()
+    if "gender" in columns:
+        genders = _ordered_counts(np, columns["gender"])
+    
+    # Insurance type is the first word; each distinct text is split once
+    insurance_types = Counter()
+    if "insurance_info" in columns:
+        infos = columns["insurance_info"]
+        infos = infos[infos.astype(bool)]
+        for info, count in _ordered_counts(np, infos.astype(str)).items():
+            insurance_types[info.split()[0]] += count
+    
+    reg_months = Counter()
+    if "reg_date" in columns:
+        reg_date = columns["reg_date"]
+        months = reg_date[~np.isnat(reg_date)].astype("datetime64[M]")
+        unique, counts = np.unique(months, return_counts=True)
+        reg_months = Counter(dict(zip(np.datetime_as_string(unique, unit="M").tolist(), counts.tolist())))
+    
+    return demographics_result(total_patients, age_groups, genders, insurance_types, reg_months)
+
+def analyze_appointment_patterns(columns):
+    """
+    Vectorized analyze_appointment_patterns
+    
+    Args:
+        columns: Dictionary with a datetime64 "schedule_time" array, a
+                 "status" array and optionally an integer "doctor_id" array
+                 (negative IDs are treated as missing)
+                 
+    Returns:
+        Dictionary with appointment analysis
+    """
+    np = _numpy()
+    
+    schedule_time = columns["schedule_time"]
+    total_appointments = len(schedule_time)
+    if total_appointments == 0:
+        return {"error": "No appointments to analyze"}
+    
+    # Weekday from days since 1970-01-01, a Thursday (3 with Monday as 0)
+    days = schedule_time.astype("datetime64[D]")
+    weekday_counts = np.bincount((days.astype(np.int64) + 3) % 7, minlength=7)
+    days_of_week = Counter({day: int(count) for day, count in zip(DAYS_OF_WEEK, weekday_counts)})
+    
+    hours = (schedule_time - days).astype("timedelta64[h]").astype(np.int64)
+    hours_of_day = Counter({
+        hour: int(count) for hour, count in enumerate(np.bincount(hours, minlength=24)) if count
+    })
+    
+    # Counter counts in C and keeps the first-appearance order
+    status_counts = Counter(columns["status"].tolist())
+    
+    # Workload per doctor, in order of first appearance so ties rank the same
+    doctor_appointments = {}
+    if "doctor_id" in columns:
+        doctor_id = columns["doctor_id"]
+        doctor_appointments = _ordered_counts(np, doctor_id[doctor_id >= 0])
+    
+    return appointment_patterns_result(
+        total_appointments, days_of_week, hours_of_day, status_counts, doctor_appointments
+    )
@@ -1,8 +1,116 @@
 """
 Scheduling algorithms for MediTrack
 """
+import heapq
+from bisect import bisect_right
+from collections import defaultdict
 from datetime import datetime, timedelta
 
+def appointment_intervals(appointments):
+    """
+    Convert appointments into busy time intervals
+    
+    Args:
+        appointments: List of appointment objects
+        
+    Returns:
+        List of (start, end) tuples, excluding cancelled appointments
+    """
+    intervals = []
+    
+    for appointment in appointments:
+        # Skip cancelled appointments
+        if hasattr(appointment, 'status') and appointment.status == "cancelled":
+            continue
+        
+        appt_start = appointment.schedule_time
+        intervals.append((appt_start, appt_start + timedelta(minutes=appointment.duration)))
+    
+    return intervals
+
+def merge_intervals(intervals):
+    """
+    Sort intervals and merge the ones that overlap or touch
+    
+    Args:
+        intervals: Iterable of (start, end) tuples
+        
+    Returns:
+        Sorted list of disjoint (start, end) tuples
+    """
+    merged = []
+    
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            # Overlaps or touches the previous interval, extend it
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    
+    return merged
+
+def is_interval_free(busy_intervals, start_time, duration):
+    """
+    Check whether a time slot overlaps none of the given busy intervals
+    
+    Args:
+        busy_intervals: Iterable of (start, end) tuples
+        start_time: Start of the proposed slot
+        duration: Duration of the proposed slot in minutes
+        
+    Returns:
+        True if the slot does not overlap any busy interval
+    """
+    end_time = start_time + timedelta(minutes=duration)
+    
+    return not any(
+        start_time < busy_end and end_time > busy_start
+        for busy_start, busy_end in busy_intervals
+    )
+
+def iter_free_slots(busy_intervals, start_time, end_time, duration, interval=30, first_index=0):
+    """
+    Sweep the gaps between merged busy intervals and yield free slots
+    
+    Candidate slots start at start_time and repeat every interval minutes.
+    When a candidate collides with a busy interval the sweep jumps straight
+    to the first candidate at or after the end of that interval, so each
+    busy interval and each free slot is visited once.
+    
+    Args:
+        busy_intervals: Sorted, disjoint (start, end) tuples (see merge_intervals)
+        start_time: Start of the time range
+        end_time: End of the time range
+        duration: Duration of the appointment in minutes
+        interval: Interval between slots in minutes
+        first_index: Index of the first busy interval that may end after start_time
+        
+    Yields:
+        Start times of available slots
+    """
+    if interval <= 0:
+        raise ValueError("Slot interval must be positive")
+    
+    slot_length = timedelta(minutes=duration)
+    step = timedelta(minutes=interval)
+    index = first_index
+    current_time = start_time
+    
+    while current_time + slot_length <= end_time:
+        # Skip busy intervals that finish before the candidate slot starts
+        while index < len(busy_intervals) and busy_intervals[index][1] <= current_time:
+            index += 1
+        
+        if index < len(busy_intervals) and busy_intervals[index][0] < current_time + slot_length:
+            # Conflict, jump to the first slot on the grid after the busy interval
+            steps = -(-(busy_intervals[index][1] - start_time) // step)
+            current_time = start_time + steps * step
+            continue
+        
+        yield current_time
+        current_time += step
+
 def find_available_slots(appointments, start_time, end_time, duration, interval=30):
     """
     Find available time slots within a time range
@@ -23,39 +131,55 @@ def find_available_slots(appointments, start_time, end_time, duration, interval=
     if isinstance(end_time, str):
         end_time = datetime.strptime(end_time, "%Y-%m-%d %H:%M")
     
-    # Generate all possible time slots
-    all_slots = []
-    current_time = start_time
+    busy_intervals = merge_intervals(appointment_intervals(appointments))
     
-    while current_time + timedelta(minutes=duration) <= end_time:
-        all_slots.append(current_time)
-        current_time += timedelta(minutes=interval)
+    return list(iter_free_slots(busy_intervals, start_time, end_time, duration, interval))
+
+def find_available_slots_by_day(appointments, start_date, end_date, duration, interval=30,
+                                working_start=9, working_end=17):
+    """
+    Find available time slots for every day in a date range
     
-    # Filter out slots that conflict with existing appointments
-    available_slots = []
+    The busy intervals are sorted and merged once for the whole range and
+    each day starts its sweep from a binary search into them, so a range of
+    N days with n appointments and k free slots costs O((n + k) log n).
     
-    for slot in all_slots:
-        slot_end = slot + timedelta(minutes=duration)
-        is_available = True
+    Args:
+        appointments: List of existing appointments (may span many days)
+        start_date: First day of the range (inclusive)
+        end_date: Last day of the range (inclusive)
+        duration: Duration of the appointment in minutes
+        interval: Interval between slots in minutes
+        working_start: Hour the working day starts
+        working_end: Hour the working day ends
         
-        for appointment in appointments:
-            # Skip cancelled appointments
-            if hasattr(appointment, 'status') and appointment.status == "cancelled":
-                continue
-            
-            # Get appointment times
-            appt_start = appointment.schedule_time
-            appt_end = appt_start + timedelta(minutes=appointment.duration)
-            
-            # Check for overlap
-            if (slot < appt_end and slot_end > appt_start):
-                is_available = False
-                break
+    Returns:
+        Dictionary mapping each date to its list of available time slots
+    """
+    # Convert string dates to date if needed
+    if isinstance(start_date, str):
+        start_date = datetime.strptime(start_date, "%Y-%m-%d").date()
+    if isinstance(end_date, str):
+        end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
+    
+    busy_intervals = merge_intervals(appointment_intervals(appointments))
+    busy_ends = [end for _, end in busy_intervals]
+    
+    slots_by_day = {}
+    day = start_date
+    
+    while day <= end_date:
+        day_start = datetime.combine(day, datetime.min.time().replace(hour=working_start))
+        day_end = datetime.combine(day, datetime.min.time().replace(hour=working_end))
         
-        if is_available:
-            available_slots.append(slot)
+        first_index = bisect_right(busy_ends, day_start)
+        slots_by_day[day] = list(iter_free_slots(
+            busy_intervals, day_start, day_end, duration, interval, first_index
+        ))
+        
+        day += timedelta(days=1)
     
-    return available_slots
+    return slots_by_day
 
 def optimize_doctor_schedule(doctor, appointments, date):
     """
@@ -102,44 +226,79 @@ def optimize_doctor_schedule(doctor, appointments, date):
     
     return optimized_appointments
 
-def detect_scheduling_conflicts(appointments):
+def _conflict_group(appointment, by):
+    """Get the doctor or patient an appointment belongs to for conflict detection"""
+    if by is None:
+        return None
+    
+    group = getattr(appointment, f"{by}_id", None)
+    if group is None:
+        # Fall back to the related object when only that is available
+        group = getattr(getattr(appointment, by, None), 'id', None)
+    return group
+
+def iter_scheduling_conflicts(sorted_appointments, by="doctor"):
     """
-    Detect conflicts in a list of appointments
+    Stream conflicting appointment pairs with a sweep line
+    
+    The appointments must already be ordered by (group, schedule_time), e.g.
+    straight from an ORDER BY doctor_id, schedule_time query. A heap keyed on
+    end time holds the appointments still running when the next one starts,
+    so only true overlaps are examined: O(n log n + k) for k conflicts.
     
     Args:
-        appointments: List of appointment objects
+        sorted_appointments: Iterable of appointments sorted by group and start time
+        by: "doctor", "patient" or None to treat all appointments as one group
         
-    Returns:
-        List of conflicting appointment pairs
+    Yields:
+        (earlier, later) tuples of overlapping appointments in the same group
     """
-    conflicts = []
-    
-    # Sort appointments by time
-    sorted_appointments = sorted(appointments, key=lambda a: a.schedule_time)
+    active = []  # Heap of (end_time, sequence, appointment)
+    current_group = object()
     
-    # Check for overlaps
-    for i in range(len(sorted_appointments)):
-        appt1 = sorted_appointments[i]
-        
+    for sequence, appointment in enumerate(sorted_appointments):
         # Skip cancelled appointments
-        if appt1.status == "cancelled":
+        if appointment.status == "cancelled":
             continue
         
-        appt1_end = appt1.schedule_time + timedelta(minutes=appt1.duration)
+        group = _conflict_group(appointment, by)
+        if group != current_group:
+            active = []
+            current_group = group
         
-        for j in range(i + 1, len(sorted_appointments)):
-            appt2 = sorted_appointments[j]
-            
-            # Skip cancelled appointments
-            if appt2.status == "cancelled":
-                continue
-            
-            # If appt2 starts after appt1 ends, no need to check further
-            if appt2.schedule_time >= appt1_end:
-                break
-            
-            # If we're here, there's a conflict
-            conflicts.append((appt1, appt2))
+        start = appointment.schedule_time
+        
+        # Drop appointments that ended before this one starts
+        while active and active[0][0] <= start:
+            heapq.heappop(active)
+        
+        # Everything still running overlaps this appointment
+        for _, _, running in active:
+            yield (running, appointment)
+        
+        heapq.heappush(active, (start + timedelta(minutes=appointment.duration), sequence, appointment))
+
+def detect_scheduling_conflicts(appointments, by="doctor"):
+    """
+    Detect conflicts in a list of appointments
+    
+    Args:
+        appointments: List of appointment objects
+        by: Group appointments by "doctor" (default) or "patient" before
+            comparing them, or None to compare every appointment
+        
+    Returns:
+        List of conflicting appointment pairs
+    """
+    # Group appointments, then sort each group by time
+    groups = defaultdict(list)
+    for appointment in appointments:
+        groups[_conflict_group(appointment, by)].append(appointment)
+    
+    conflicts = []
+    for group_appointments in groups.values():
+        group_appointments.sort(key=lambda a: a.schedule_time)
+        conflicts.extend(iter_scheduling_conflicts(group_appointments, by))
     
     return conflicts
 
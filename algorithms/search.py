@@ -2,12 +2,350 @@
 Search algorithms for MediTrack
 """
 import re
+from collections import Counter
 from datetime import datetime, timedelta
+from itertools import chain
+
+# Words are the runs of letters and digits in a field value
+_WORD_PATTERN = re.compile(r"\w+")
+
+def _trigrams(text):
+    """Set of the three-character substrings of text"""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+def _word_trigrams(word):
+    """Trigrams of a word padded so that its first and last letters count too"""
+    return _trigrams(f"  {word} ")
+
+def _char_masks(word):
+    """Bit mask of the positions of each character of word"""
+    masks = {}
+    for position, char in enumerate(word):
+        masks[char] = masks.get(char, 0) | (1 << position)
+    return masks
+
+def _bit_parallel_distance(masks, length, other, max_distance):
+    """
+    Levenshtein distance from a word, given its character masks, to other
+    
+    Myers' bit-vector algorithm keeps a whole column of the edit distance
+    table in two integers, so each character of other costs a handful of
+    integer operations instead of a loop over the word.
+    """
+    if length == 0:
+        return min(len(other), max_distance + 1)
+    
+    full = (1 << length) - 1
+    last = 1 << (length - 1)
+    positive, negative = full, 0
+    distance = length
+    remaining = len(other)
+    
+    for char in other:
+        equal = masks.get(char, 0)
+        vertical = equal | negative
+        horizontal = (((equal & positive) + positive) ^ positive) | equal
+        horizontal_positive = negative | (~(horizontal | positive) & full)
+        horizontal_negative = positive & horizontal
+        
+        if horizontal_positive & last:
+            distance += 1
+        elif horizontal_negative & last:
+            distance -= 1
+        
+        # The distance drops by at most one per remaining character
+        remaining -= 1
+        if distance - remaining > max_distance:
+            return max_distance + 1
+        
+        horizontal_positive = ((horizontal_positive << 1) | 1) & full
+        horizontal_negative = (horizontal_negative << 1) & full
+        positive = horizontal_negative | (~(vertical | horizontal_positive) & full)
+        negative = horizontal_positive & vertical
+    
+    return min(distance, max_distance + 1)
+
+def bounded_edit_distance(a, b, max_distance):
+    """
+    Levenshtein distance between two strings, giving up past a bound
+    
+    Args:
+        a: First string
+        b: Second string
+        max_distance: Largest distance of interest
+        
+    Returns:
+        The edit distance, or max_distance + 1 if it is larger than max_distance
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    return _bit_parallel_distance(_char_masks(a), len(a), b, max_distance)
+
+def word_similarity(a, b, distance=None):
+    """
+    Similarity of two words from their edit distance, between 0 and 1
+    
+    Args:
+        a: First word
+        b: Second word
+        distance: Edit distance between them, if already known
+        
+    Returns:
+        1 - 2 * distance / (len(a) + len(b)), floored at 0
+    """
+    if not a and not b:
+        return 1.0
+    if distance is None:
+        distance = bounded_edit_distance(a, b, len(a) + len(b))
+    return max(0.0, 1 - 2 * distance / (len(a) + len(b)))
+
+class FuzzyIndex:
+    """
+    Fuzzy search index over the fields of a collection of items
+    
+    A search term matches a field exactly (score 1.0) when it is a
+    case-insensitive substring of the field value. Otherwise every word of
+    the term must be similar to some word of the same field, and the field
+    scores the weakest of those word similarities. An item scores its best
+    field. Trigram postings narrow each lookup to the words and values that
+    can reach the threshold, so only a few candidates get an edit distance.
+    """
+    
+    def __init__(self, fields, items=(), threshold=0.6):
+        """
+        Build the index
+        
+        Args:
+            fields: List of field names to index
+            items: Initial items to index
+            threshold: Default similarity threshold (0-1) for searches
+        """
+        self.fields = list(fields)
+        self.threshold = threshold
+        self._next_id = 0
+        self._items = {}            # item id -> item
+        self._ids = {}              # id(item) -> item id
+        self._values = {}           # item id -> lowercased field values (None if absent)
+        self._value_postings = {}   # trigram -> item ids whose values contain it
+        self._word_postings = {}    # word -> {(item id, field index)}
+        self._word_grams = {}       # trigram -> words containing it
+        self._word_gram_counts = {} # word -> number of distinct trigrams
+        self._words_by_shape = {}   # (length, distinct trigrams) -> words
+        
+        for item in items:
+            self.add(item)
+    
+    def __len__(self):
+        return len(self._items)
+    
+    def __contains__(self, item):
+        return id(item) in self._ids
+    
+    def add(self, item):
+        """
+        Index an item
+        
+        Args:
+            item: Object with some of the indexed fields as attributes
+        """
+        if id(item) in self._ids:
+            self.remove(item)
+        
+        item_id = self._next_id
+        self._next_id += 1
+        self._items[item_id] = item
+        self._ids[id(item)] = item_id
+        
+        values = []
+        for field_index, field in enumerate(self.fields):
+            value = getattr(item, field, None)
+            if value is None:
+                values.append(None)
+                continue
+            
+            value = str(value).lower()
+            values.append(value)
+            
+            for gram in _trigrams(value):
+                self._value_postings.setdefault(gram, set()).add(item_id)
+            
+            for word in _WORD_PATTERN.findall(value):
+                postings = self._word_postings.get(word)
+                if postings is None:
+                    postings = self._word_postings[word] = set()
+                    grams = _word_trigrams(word)
+                    for gram in grams:
+                        self._word_grams.setdefault(gram, set()).add(word)
+                    self._word_gram_counts[word] = len(grams)
+                    self._words_by_shape.setdefault((len(word), len(grams)), set()).add(word)
+                postings.add((item_id, field_index))
+        
+        self._values[item_id] = values
+    
+    def remove(self, item):
+        """
+        Remove an item from the index
+        
+        Args:
+            item: A previously added item
+            
+        Returns:
+            True if the item was indexed, False otherwise
+        """
+        item_id = self._ids.pop(id(item), None)
+        if item_id is None:
+            return False
+        
+        del self._items[item_id]
+        for field_index, value in enumerate(self._values.pop(item_id)):
+            if value is None:
+                continue
+            
+            for gram in _trigrams(value):
+                postings = self._value_postings[gram]
+                postings.discard(item_id)
+                if not postings:
+                    del self._value_postings[gram]
+            
+            for word in set(_WORD_PATTERN.findall(value)):
+                postings = self._word_postings[word]
+                postings.discard((item_id, field_index))
+                if postings:
+                    continue
+                
+                del self._word_postings[word]
+                for gram in _word_trigrams(word):
+                    words = self._word_grams[gram]
+                    words.discard(word)
+                    if not words:
+                        del self._word_grams[gram]
+                shape = (len(word), self._word_gram_counts.pop(word))
+                same_shape = self._words_by_shape[shape]
+                same_shape.discard(word)
+                if not same_shape:
+                    del self._words_by_shape[shape]
+        
+        return True
+    
+    def _substring_matches(self, search_term):
+        """Ids of the items with a field value containing search_term"""
+        if len(search_term) >= 3:
+            postings = [self._value_postings.get(gram, set()) for gram in _trigrams(search_term)]
+            candidates = set.intersection(*sorted(postings, key=len))
+        else:
+            candidates = self._values
+        
+        return {
+            item_id for item_id in candidates
+            if any(value is not None and search_term in value for value in self._values[item_id])
+        }
+    
+    def _similar_words(self, word, threshold):
+        """Indexed words at least threshold similar to word, with their similarity"""
+        grams = _word_trigrams(word)
+        shared = Counter(chain.from_iterable(self._word_grams.get(gram, ()) for gram in grams))
+        
+        # Largest distance still meeting the threshold, by candidate length
+        limits = {}
+        for length, _ in self._words_by_shape:
+            max_distance = int((1 - threshold) * (len(word) + length) / 2 + 1e-9)
+            if abs(len(word) - length) <= max_distance:
+                limits[length] = max_distance
+        
+        # Each edit removes at most three distinct trigrams from either word, so
+        # a match shares at least (distinct trigrams of either) - 3 * distance.
+        # Words sharing none can only match when that bound drops to zero.
+        candidates = set(shared)
+        for (length, gram_count), words in self._words_by_shape.items():
+            max_distance = limits.get(length)
+            if max_distance is not None and max(len(grams), gram_count) <= 3 * max_distance:
+                candidates.update(words)
+        
+        masks = _char_masks(word)
+        similar = {}
+        for candidate in candidates:
+            max_distance = limits.get(len(candidate))
+            if max_distance is None:
+                continue
+            needed = max(len(grams), self._word_gram_counts[candidate]) - 3 * max_distance
+            if shared[candidate] < needed:
+                continue
+            
+            distance = _bit_parallel_distance(masks, len(word), candidate, max_distance)
+            if distance <= max_distance:
+                similarity = word_similarity(word, candidate, distance)
+                if similarity >= threshold:
+                    similar[candidate] = similarity
+        
+        return similar
+    
+    def scores(self, search_term, threshold=None):
+        """
+        Score the items matching a search term
+        
+        Args:
+            search_term: The term to search for
+            threshold: Similarity threshold (0-1), defaults to the index's
+            
+        Returns:
+            Dictionary of item id to score for every item scoring at least threshold
+        """
+        if threshold is None:
+            threshold = self.threshold
+        search_term = search_term.lower()
+        
+        field_scores = None
+        for word in _WORD_PATTERN.findall(search_term):
+            best = {}
+            for similar_word, similarity in self._similar_words(word, threshold).items():
+                for key in self._word_postings[similar_word]:
+                    if similarity > best.get(key, 0):
+                        best[key] = similarity
+            
+            if field_scores is None:
+                field_scores = best
+            else:
+                field_scores = {
+                    key: min(score, best[key]) for key, score in field_scores.items() if key in best
+                }
+            if not field_scores:
+                break
+        
+        scores = {}
+        for (item_id, _), score in (field_scores or {}).items():
+            if score > scores.get(item_id, 0):
+                scores[item_id] = score
+        
+        for item_id in self._substring_matches(search_term):
+            scores[item_id] = 1.0
+        
+        return scores
+    
+    def search(self, search_term, threshold=None, limit=None):
+        """
+        Search the index
+        
+        Args:
+            search_term: The term to search for
+            threshold: Similarity threshold (0-1), defaults to the index's
+            limit: Maximum number of items to return
+            
+        Returns:
+            List of matching items sorted by relevance, ties in insertion order
+        """
+        scores = self.scores(search_term, threshold)
+        ranked = sorted(scores, key=lambda item_id: (-scores[item_id], item_id))
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [self._items[item_id] for item_id in ranked]
 
 def fuzzy_search(items, search_term, fields, threshold=0.6):
     """
     Perform a fuzzy search on a list of items
     
+    Builds a FuzzyIndex for a single query; keep the index instead when
+    searching the same items repeatedly.
+    
     Args:
         items: List of objects to search through
         search_term: The term to search for
@@ -17,38 +355,10 @@ def fuzzy_search(items, search_term, fields, threshold=0.6):
     Returns:
         List of matching items sorted by relevance
     """
-    import difflib
-    
     if not search_term:
         return items
     
-    search_term = search_term.lower()
-    results = []
-    
-    for item in items:
-        max_ratio = 0
-        
-        for field in fields:
-            if hasattr(item, field):
-                field_value = str(getattr(item, field)).lower()
-                
-                # Check for exact substring match first
-                if search_term in field_value:
-                    ratio = 1.0
-                else:
-                    # Use difflib for fuzzy matching
-                    ratio = difflib.SequenceMatcher(None, search_term, field_value).ratio()
-                
-                max_ratio = max(max_ratio, ratio)
-        
-        if max_ratio >= threshold:
-            results.append((item, max_ratio))
-    
-    # Sort by relevance (highest ratio first)
-    results.sort(key=lambda x: x[1], reverse=True)
-    
-    # Return just the items
-    return [item for item, ratio in results]
+    return FuzzyIndex(fields, items, threshold).search(search_term)
 
 def binary_search(sorted_items, key, key_func=None):
     """
@@ -84,6 +394,46 @@ def binary_search(sorted_items, key, key_func=None):
     
     return None
 
+def compile_search_pattern(pattern):
+    """
+    Build the matcher used by the regex searches
+    
+    Args:
+        pattern: Regular expression pattern
+        
+    Returns:
+        Function taking a string and returning whether it matches. Invalid
+        patterns fall back to a case-insensitive substring test.
+    """
+    try:
+        regex = re.compile(pattern, re.IGNORECASE)
+    except re.error:
+        needle = pattern.lower()
+        return lambda value: needle in value.lower()
+    
+    return lambda value: regex.search(value) is not None
+
+def iter_regex_matches(items, pattern, fields):
+    """
+    Lazily search items using regular expressions
+    
+    Args:
+        items: Iterable of objects to search through
+        pattern: Regular expression pattern
+        fields: List of field names to search in
+        
+    Yields:
+        Matching items, in input order
+    """
+    matches = compile_search_pattern(pattern)
+    
+    for item in items:
+        for field in fields:
+            value = getattr(item, field, None)
+            if value is not None and matches(str(value)):
+                yield item
+                break  # Break to avoid yielding the same item multiple times
+
 def search_by_regex(items, pattern, fields):
     """
     Search items using regular expressions
@@ -96,26 +446,7 @@ def search_by_regex(items, pattern, fields):
     Returns:
         List of matching items
     """
-    try:
-        regex = re.compile(pattern, re.IGNORECASE)
-        results = []
-        
-        for item in items:
-            for field in fields:
-                if hasattr(item, field):
-                    field_value = str(getattr(item, field))
-                    
-                    if regex.search(field_value):
-                        results.append(item)
-                        break  # Break to avoid adding the same item multiple times
-        
-        return results
-    except re.error:
-        # If the pattern is invalid, fall back to simple substring search
-        return [item for item in items if any(
-            hasattr(item, field) and pattern.lower() in str(getattr(item, field)).lower() 
-            for field in fields
-        )]
+    return list(iter_regex_matches(items, pattern, fields))
 
 def search_appointments_by_date_range(appointments, start_date, end_date):
     """
@@ -0,0 +1,110 @@
+"""
+Benchmark for the SQL analysis reports in db.analytics
+
+Runs the appointment patterns report over a synthetic appointment table
+with the Python implementation (every row streamed through
+analyze_appointment_patterns) and with AnalyticsRepository's GROUP BY
+queries, reporting time and peak Python memory (tracemalloc, measured in
+a second run because tracing slows allocation-heavy code down).
+
+Usage:
+    python benchmarks/bench_analytics.py [number of appointments, default 100000]
+"""
+import os
+import sys
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import selectinload, sessionmaker
+from algorithms.data_analysis import analyze_appointment_patterns
+from db.analytics import AnalyticsRepository
+from db.models import Appointment, Base
+from db.repository import AppointmentRepository
+
+DOCTORS = 50
+PATIENTS = 1000
+
+def populate(engine, count):
+    """Insert doctors, patients and count appointments with raw executemany batches"""
+    dob = date(1980, 1, 1).isoformat()
+    persons = [(i, f"First{i}", "Stats", f"stats{i}@example.com", dob, "doctor") for i in range(1, DOCTORS + 1)]
+    persons += [
+        (i, f"First{i}", "Stats", f"stats{i}@example.com", dob, "patient")
+        for i in range(DOCTORS + 1, DOCTORS + PATIENTS + 1)
+    ]
+    start = datetime(2024, 1, 1, 8, 0)
+    statuses = ["scheduled", "completed", "completed", "cancelled", "no-show"]
+    appointments = [
+        (
+            DOCTORS + 1 + i % PATIENTS, 1 + i % DOCTORS,
+            (start + timedelta(days=i % 365, minutes=30 * (i % 20))).isoformat(sep=" "),
+            30, statuses[i % len(statuses)]
+        )
+        for i in range(count)
+    ]
+    
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "INSERT INTO persons (id, first_name, last_name, email, dob, type) VALUES (?, ?, ?, ?, ?, ?)", persons
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO staff (id, staff_id, role) VALUES (?, ?, 'Doctor')",
+            [(i, f"D{i:08d}") for i in range(1, DOCTORS + 1)]
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO doctors (id, specialisation, license_number) VALUES (?, 'Cardiology', ?)",
+            [(i, f"L{i:08d}") for i in range(1, DOCTORS + 1)]
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO patients (id, patient_id) VALUES (?, ?)",
+            [(i, f"P{i:08d}") for i in range(DOCTORS + 1, DOCTORS + PATIENTS + 1)]
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO appointments (patient_id, doctor_id, schedule_time, duration, status) "
+            "VALUES (?, ?, ?, ?, ?)", appointments
+        )
+
+def measure(Session, func):
+    """Elapsed seconds, peak traced memory in bytes and result of func(session)"""
+    session = Session()
+    started = time.perf_counter()
+    result = func(session)
+    elapsed = time.perf_counter() - started
+    session.close()
+    
+    session = Session()
+    tracemalloc.start()
+    func(session)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    session.close()
+    return elapsed, peak, result
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    populate(engine, count)
+    Session = sessionmaker(bind=engine)
+    
+    python_time, python_peak, python_result = measure(Session, lambda session: analyze_appointment_patterns(
+        AppointmentRepository(session).iter_all(options=[selectinload(Appointment.doctor)])
+    ))
+    sql_time, sql_peak, sql_result = measure(
+        Session, lambda session: AnalyticsRepository(session).appointment_patterns()
+    )
+    assert python_result["status_distribution"] == sql_result["status_distribution"], "results differ"
+    
+    print(f"{count} appointments, appointment patterns report")
+    print(f"{'engine':>8} {'time (ms)':>10} {'peak memory (KB)':>17}")
+    print(f"{'python':>8} {python_time * 1000:>10.1f} {python_peak / 1024:>17.1f}")
+    print(f"{'sql':>8} {sql_time * 1000:>10.1f} {sql_peak / 1024:>17.1f}")
+
+if __name__ == "__main__":
+    main()
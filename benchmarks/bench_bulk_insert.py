@@ -0,0 +1,68 @@
+"""
+Benchmark for BaseRepository.create_many
+
+Compares loading patients one PatientRepository.create call at a time,
+which commits after every row, against create_many with one transaction
+per chunk, on a file-backed SQLite database so commit costs are real.
+
+Usage:
+    python benchmarks/bench_bulk_insert.py [number of patients, default 5000]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import date
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from db.models import Base, Patient
+from db.repository import PatientRepository
+
+def patient_rows(count, prefix):
+    """Mappings for count synthetic patients"""
+    return [
+        dict(first_name=f"First{i}", last_name="Legacy", dob=date(1980, 1, 1),
+             email=f"{prefix}{i}@example.com", patient_id=f"{prefix.upper()}{i:07d}")
+        for i in range(count)
+    ]
+
+def timed_load(load, count, prefix):
+    """Run a load into a fresh database file and return elapsed seconds"""
+    handle, path = tempfile.mkstemp(suffix=".db")
+    os.close(handle)
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    
+    try:
+        started = time.perf_counter()
+        load(PatientRepository(session), patient_rows(count, prefix))
+        elapsed = time.perf_counter() - started
+        assert session.query(Patient).count() == count
+        return elapsed
+    finally:
+        session.close()
+        engine.dispose()
+        os.remove(path)
+
+def one_by_one(repo, rows):
+    """Previous approach: one create, and so one commit, per patient"""
+    for row in rows:
+        repo.create(Patient(**row))
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    
+    print(f"{'patients':>9} {'create (s)':>11} {'create_many (s)':>16} {'speedup':>8}")
+    
+    single = timed_load(one_by_one, count, "a")
+    bulk = timed_load(lambda repo, rows: repo.create_many(rows, chunk_size=1000), count, "b")
+    
+    print(f"{count:>9} {single:>11.2f} {bulk:>16.2f} {single / bulk:>7.0f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Benchmark for the fuzzy search in algorithms.search
+
+Compares the previous difflib-based fuzzy_search, which runs a
+SequenceMatcher for every item and field on every query, against a
+FuzzyIndex built once over the same synthetic names and queried repeatedly.
+
+Usage:
+    python benchmarks/bench_fuzzy_search.py [number of names, default 100000]
+"""
+import os
+import sys
+import difflib
+import random
+import time
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from algorithms.search import FuzzyIndex
+
+SYLLABLES = ["an", "ber", "ca", "del", "e", "fi", "gor", "ha", "is", "jo", "ka", "li",
+             "mar", "na", "o", "pe", "ri", "sa", "ta", "u", "vin", "wen", "ya", "zo"]
+
+class Person:
+    """Minimal person record for benchmarking"""
+    
+    def __init__(self, name, email):
+        self.name = name
+        self.email = email
+
+def difflib_fuzzy_search(items, search_term, fields, threshold=0.6):
+    """Previous algorithm: SequenceMatcher over every item and field"""
+    search_term = search_term.lower()
+    results = []
+    
+    for item in items:
+        max_ratio = 0
+        for field in fields:
+            if hasattr(item, field):
+                field_value = str(getattr(item, field)).lower()
+                if search_term in field_value:
+                    ratio = 1.0
+                else:
+                    ratio = difflib.SequenceMatcher(None, search_term, field_value).ratio()
+                max_ratio = max(max_ratio, ratio)
+        if max_ratio >= threshold:
+            results.append((item, max_ratio))
+    
+    results.sort(key=lambda x: x[1], reverse=True)
+    return [item for item, ratio in results]
+
+def generate_people(count, seed=0):
+    """Generate count people with random syllable names"""
+    rng = random.Random(seed)
+    
+    def word():
+        return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+    
+    people = []
+    for i in range(count):
+        first, last = word(), word()
+        people.append(Person(f"{first} {last}", f"{first}.{last}{i}@example.com".lower()))
+    return people
+
+def timed(func, *args):
+    """Run func once and return (result, elapsed seconds)"""
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    fields = ["name", "email"]
+    people = generate_people(count)
+    
+    # Misspelled versions of existing names plus exact substrings
+    rng = random.Random(1)
+    queries = []
+    for person in rng.sample(people, 3):
+        first = person.name.split()[0]
+        queries.append(first[:-1] + "x" if len(first) > 3 else first + "x")
+    queries.append(people[count // 2].name.split()[1])
+    
+    index, build_time = timed(FuzzyIndex, fields, people)
+    print(f"{count} names, index built in {build_time:.2f}s")
+    print(f"{'query':>14} {'difflib':>8} {'index':>8} {'difflib (s)':>12} {'index (ms)':>11} {'speedup':>8}")
+    
+    for query in queries:
+        old, old_time = timed(difflib_fuzzy_search, people, query, fields)
+        new, new_time = timed(index.search, query)
+        print(f"{query:>14} {len(old):>8} {len(new):>8} {old_time:>12.2f} "
+              f"{new_time * 1000:>11.1f} {old_time / new_time:>7.0f}x")
+
+if __name__ == "__main__":
+    main()
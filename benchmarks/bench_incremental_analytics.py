@@ -0,0 +1,74 @@
+"""
+Benchmark for the incremental analysis in db.incremental_analytics
+
+Builds the appointment patterns state over a synthetic appointment table,
+then books new appointments and cancels some existing ones through the
+ORM (so the changes are logged) and times refreshing the saved state
+against recounting the whole history with full=True.
+
+Usage:
+    python benchmarks/bench_incremental_analytics.py [appointments, default 200000] [new appointments, default 1000]
+"""
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from bench_analytics import DOCTORS, PATIENTS, populate
+from db.incremental_analytics import IncrementalAnalytics
+from db.models import Appointment, Base
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    new = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    populate(engine, count)
+    Session = sessionmaker(bind=engine)
+    
+    session = Session()
+    started = time.perf_counter()
+    IncrementalAnalytics(session).appointment_patterns()
+    build_time = time.perf_counter() - started
+    session.close()
+    
+    # New bookings, and a tenth as many cancellations of counted appointments
+    session = Session()
+    start = datetime(2025, 1, 1, 8, 0)
+    session.add_all([
+        Appointment(patient_id=DOCTORS + 1 + i % PATIENTS, doctor_id=1 + i % DOCTORS,
+                    schedule_time=start + timedelta(minutes=30 * i), duration=30, status="scheduled")
+        for i in range(new)
+    ])
+    for appointment in session.query(Appointment).filter(Appointment.appointment_id <= new // 10):
+        appointment.status = "cancelled"
+    session.commit()
+    session.close()
+    
+    session = Session()
+    started = time.perf_counter()
+    refreshed = IncrementalAnalytics(session).appointment_patterns()
+    refresh_time = time.perf_counter() - started
+    session.close()
+    
+    session = Session()
+    started = time.perf_counter()
+    recounted = IncrementalAnalytics(session).appointment_patterns(full=True)
+    full_time = time.perf_counter() - started
+    session.close()
+    assert refreshed == recounted, "results differ"
+    
+    print(f"{count} appointments, then {new} new and {new // 10} cancelled")
+    print(f"{'run':>12} {'time (ms)':>10}")
+    print(f"{'first build':>12} {build_time * 1000:>10.1f}")
+    print(f"{'refresh':>12} {refresh_time * 1000:>10.1f}")
+    print(f"{'full':>12} {full_time * 1000:>10.1f}")
+
+if __name__ == "__main__":
+    main()
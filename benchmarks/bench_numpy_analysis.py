@@ -0,0 +1,89 @@
+"""
+Benchmark for the vectorized NumPy analysis in algorithms.numpy_analysis
+
+Runs the appointment patterns report over synthetic appointments with the
+Python implementation (one object per appointment, streamed from a
+generator so memory stays flat) and with the NumPy implementation over the
+same appointments as columns. The time spent just creating the objects is
+reported on its own line, as a floor for the Python implementation.
+
+Usage:
+    python benchmarks/bench_numpy_analysis.py [number of appointments ...] (default 1000000 10000000)
+"""
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from algorithms.data_analysis import analyze_appointment_patterns
+from algorithms import numpy_analysis
+
+DOCTORS = 50
+STATUSES = ["scheduled", "completed", "completed", "cancelled", "no-show"]
+START = datetime(2024, 1, 1, 8, 0)
+
+class Doctor:
+    __slots__ = ("id",)
+    
+    def __init__(self, id):
+        self.id = id
+
+class Appointment:
+    __slots__ = ("schedule_time", "status", "doctor")
+    
+    def __init__(self, schedule_time, status, doctor):
+        self.schedule_time = schedule_time
+        self.status = status
+        self.doctor = doctor
+
+def iter_appointments(count):
+    """Appointment objects: day i % 365, slot i % 20, doctor (i * 7) % DOCTORS + 1"""
+    doctors = [Doctor(i) for i in range(1, DOCTORS + 1)]
+    for i in range(count):
+        yield Appointment(
+            START + timedelta(days=i % 365, minutes=30 * (i % 20)),
+            STATUSES[i % len(STATUSES)],
+            doctors[i * 7 % DOCTORS]
+        )
+
+def appointment_columns(count):
+    """The same appointments as iter_appointments, as NumPy columns"""
+    i = np.arange(count, dtype=np.int64)
+    minutes = (i % 365) * 24 * 60 + 30 * (i % 20)
+    statuses = np.empty(len(STATUSES), dtype=object)
+    statuses[:] = STATUSES
+    return {
+        "schedule_time": np.datetime64(START, "s") + (minutes * 60).astype("timedelta64[s]"),
+        "status": statuses[i % len(STATUSES)],
+        "doctor_id": i * 7 % DOCTORS + 1,
+    }
+
+def timed(func):
+    """Elapsed seconds and result of func()"""
+    started = time.perf_counter()
+    result = func()
+    return time.perf_counter() - started, result
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [1000000, 10000000]
+    
+    print(f"{'appointments':>12} {'engine':>8} {'time (ms)':>10}")
+    for count in counts:
+        objects_time, _ = timed(lambda: sum(1 for _ in iter_appointments(count)))
+        python_time, python_result = timed(lambda: analyze_appointment_patterns(iter_appointments(count)))
+        
+        columns = appointment_columns(count)
+        numpy_time, numpy_result = timed(lambda: numpy_analysis.analyze_appointment_patterns(columns))
+        del columns
+        assert python_result == numpy_result, "results differ"
+        
+        print(f"{count:>12} {'objects':>8} {objects_time * 1000:>10.1f}")
+        print(f"{count:>12} {'python':>8} {python_time * 1000:>10.1f}")
+        print(f"{count:>12} {'numpy':>8} {numpy_time * 1000:>10.1f}")
+
+if __name__ == "__main__":
+    main()
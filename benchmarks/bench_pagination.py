@@ -0,0 +1,80 @@
+"""
+Benchmark for keyset pagination in BaseRepository.get_page
+
+Compares fetching a page at increasing depths with the OFFSET paging of
+get_all(limit, offset) against get_page with a cursor positioned at the
+same depth, on a synthetic patient table.
+
+Usage:
+    python benchmarks/bench_pagination.py [number of patients, default 500000]
+"""
+import os
+import sys
+import time
+from datetime import date
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from db.models import Base
+from db.repository import PatientRepository
+
+PAGE_SIZE = 50
+
+def populate(engine, count):
+    """Insert count patients with raw executemany batches"""
+    persons = [
+        (i + 1, f"First{i}", "Page", f"page{i}@example.com", date(1980, 1, 1).isoformat(), "patient")
+        for i in range(count)
+    ]
+    patients = [(i + 1, f"P{i:08d}") for i in range(count)]
+    
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "INSERT INTO persons (id, first_name, last_name, email, dob, type) VALUES (?, ?, ?, ?, ?, ?)",
+            persons
+        )
+        connection.exec_driver_sql("INSERT INTO patients (id, patient_id) VALUES (?, ?)", patients)
+
+def timed(func, repeat=5):
+    """Run func repeat times and return (last result, best elapsed seconds)"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    depths = [depth for depth in (0, 1000, 10000, 100000, 1000000) if depth < count - PAGE_SIZE]
+    
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    populate(engine, count)
+    session = sessionmaker(bind=engine)()
+    repo = PatientRepository(session)
+    
+    print(f"{count} patients, {PAGE_SIZE} per page")
+    print(f"{'depth':>9} {'offset (ms)':>12} {'keyset (ms)':>12} {'speedup':>8}")
+    
+    for depth in depths:
+        # Cursor of the page ending just before the requested depth
+        cursor = repo._encode_cursor("id", [depth]) if depth else None
+        
+        offset_page, offset_time = timed(lambda: repo.get_all(limit=PAGE_SIZE, offset=depth))
+        keyset_page, keyset_time = timed(lambda: repo.get_page(limit=PAGE_SIZE, after=cursor)[0])
+        
+        assert [p.id for p in offset_page] == [p.id for p in keyset_page], "pages differ"
+        session.expunge_all()
+        
+        print(f"{depth:>9} {offset_time * 1000:>12.2f} {keyset_time * 1000:>12.2f} "
+              f"{offset_time / keyset_time:>7.1f}x")
+    
+    session.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Benchmark for the parallel analysis in db.parallel_analytics
+
+Runs the appointment patterns report over a synthetic SQLite file with the
+Python implementation in one process and with analyze_in_parallel on an
+increasing number of worker processes. Scaling is bounded by the number
+of CPUs (printed first) and, for SQLite, by the disk.
+
+Usage:
+    python benchmarks/bench_parallel_analytics.py [number of appointments, default 200000] [max workers, default CPU count]
+"""
+import os
+import sys
+import tempfile
+import time
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import selectinload, sessionmaker
+from algorithms.data_analysis import analyze_appointment_patterns
+from bench_analytics import populate
+from db.models import Appointment, Base
+from db.parallel_analytics import analyze_in_parallel
+from db.repository import AppointmentRepository
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count() or 1
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        database = {
+            "url": f"sqlite:///{os.path.join(temp_dir, 'bench.db')}",
+            "pool_size": 1, "max_overflow": 0, "pool_timeout": 30, "pool_recycle": 1800, "pool_pre_ping": False,
+        }
+        engine = create_engine(database["url"])
+        Base.metadata.create_all(engine)
+        populate(engine, count)
+        
+        session = sessionmaker(bind=engine)()
+        started = time.perf_counter()
+        expected = analyze_appointment_patterns(
+            AppointmentRepository(session).iter_all(options=[selectinload(Appointment.doctor)])
+        )
+        single_time = time.perf_counter() - started
+        session.close()
+        engine.dispose()
+        
+        print(f"{count} appointments, appointment patterns report, {os.cpu_count()} CPUs")
+        print(f"{'workers':>8} {'time (ms)':>10} {'speedup':>8}")
+        print(f"{'-':>8} {single_time * 1000:>10.1f} {1:>8.2f}")
+        
+        workers = 1
+        while workers <= max_workers:
+            started = time.perf_counter()
+            result = analyze_in_parallel("appointments", database, workers=workers)
+            elapsed = time.perf_counter() - started
+            assert result == expected, "results differ"
+            print(f"{workers:>8} {elapsed * 1000:>10.1f} {single_time / elapsed:>8.2f}")
+            workers *= 2
+
+if __name__ == "__main__":
+    main()
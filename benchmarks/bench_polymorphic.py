@@ -0,0 +1,119 @@
+"""
+Benchmark for loading the Person/Staff/Doctor inheritance hierarchy
+
+Mixed person listing: a page of Person rows (patients, staff and doctors)
+with their subclass columns, loaded
+- per row: one SELECT per row for the subclass columns, which is what
+  joined inheritance does without a polymorphic loading strategy
+- selectin: the strategy configured on the mappers, one SELECT ... IN per
+  subclass for the whole page
+  
+Doctor listing: a page of doctors loaded as entities (all columns of
+persons, staff and doctors) and as a projection of
+DoctorRepository.listing_columns.
+
+Usage:
+    python benchmarks/bench_polymorphic.py [number of persons, default 100000]
+"""
+import os
+import sys
+import time
+from datetime import date
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event, inspect, select
+from sqlalchemy.orm import sessionmaker
+from db.models import Base, Person
+from db.repository import DoctorRepository
+
+PAGE_SIZE = 1000
+
+def populate(engine, count):
+    """Insert count persons: half patients, 40% doctors, 10% other staff"""
+    persons, patients, staff, doctors = [], [], [], []
+    dob = date(1980, 1, 1).isoformat()
+    for i in range(1, count + 1):
+        kind = "patient" if i % 10 < 5 else "doctor" if i % 10 < 9 else "staff"
+        persons.append((i, f"First{i}", "Poly", f"poly{i}@example.com", dob, f"Address {i}", kind))
+        if kind == "patient":
+            patients.append((i, f"P{i:08d}", "Insurance"))
+        else:
+            staff.append((i, f"S{i:08d}", kind, "Cardiology" if i % 2 else "Neurology", dob))
+        if kind == "doctor":
+            doctors.append((i, "Cardiology" if i % 2 else "Neurology", f"L{i:08d}", "[]"))
+    
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "INSERT INTO persons (id, first_name, last_name, email, dob, address, type) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)", persons
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO patients (id, patient_id, insurance_info) VALUES (?, ?, ?)", patients
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO staff (id, staff_id, role, department, hire_date) VALUES (?, ?, ?, ?, ?)", staff
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO doctors (id, specialisation, license_number, certifications) VALUES (?, ?, ?, ?)",
+            doctors
+        )
+
+def load_per_row(session):
+    """Person rows, then each row's subclass columns with its own SELECT"""
+    classes = {identity: mapper.class_ for identity, mapper in inspect(Person).polymorphic_map.items()}
+    rows = session.execute(select(Person.id, Person.type).order_by(Person.id).limit(PAGE_SIZE))
+    return [session.get(classes[row.type], row.id) for row in rows]
+
+def load_selectin(session):
+    """Person entities with the configured selectin polymorphic loading"""
+    return list(session.execute(select(Person).order_by(Person.id).limit(PAGE_SIZE)).scalars())
+
+def measure(engine, Session, func, repeat=5):
+    """Best time in seconds and number of queries of func(session), each run on a fresh session"""
+    queries = [0]
+    
+    def count(*args):
+        queries[0] += 1
+    
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        best = None
+        for _ in range(repeat):
+            session = Session()
+            queries[0] = 0
+            started = time.perf_counter()
+            func(session)
+            elapsed = time.perf_counter() - started
+            session.close()
+            best = elapsed if best is None else min(best, elapsed)
+        return best, queries[0]
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    populate(engine, count)
+    Session = sessionmaker(bind=engine)
+    
+    strategies = [
+        ("persons, per row", load_per_row),
+        ("persons, selectin", load_selectin),
+        ("doctors, entities", lambda session: DoctorRepository(session).get_page(limit=PAGE_SIZE)),
+        ("doctors, projection", lambda session: DoctorRepository(session).get_page(
+            limit=PAGE_SIZE, columns=DoctorRepository.listing_columns
+        )),
+    ]
+    
+    print(f"{count} persons, {PAGE_SIZE} rows per listing")
+    print(f"{'strategy':>20} {'time (ms)':>10} {'queries':>8}")
+    for name, func in strategies:
+        elapsed, queries = measure(engine, Session, func)
+        print(f"{name:>20} {elapsed * 1000:>10.2f} {queries:>8}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark for the availability engine in algorithms.scheduling
+
+Compares the sweep-based find_available_slots_by_day against the previous
+approach of generating every candidate slot and scanning every appointment
+for each one, over multi-week ranges with thousands of appointments.
+
+Usage:
+    python benchmarks/bench_scheduling.py
+"""
+import os
+import sys
+import random
+import time
+from datetime import datetime, timedelta
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from algorithms.scheduling import find_available_slots_by_day
+
+class Appointment:
+    """Minimal appointment record for benchmarking"""
+    
+    def __init__(self, schedule_time, duration, status="scheduled"):
+        self.schedule_time = schedule_time
+        self.duration = duration
+        self.status = status
+
+def naive_slots_by_day(appointments, start_date, days, duration, interval):
+    """Previous algorithm: every candidate slot checked against every appointment"""
+    slots_by_day = {}
+    
+    for offset in range(days):
+        day = start_date + timedelta(days=offset)
+        current_time = datetime.combine(day, datetime.min.time().replace(hour=9))
+        end_time = datetime.combine(day, datetime.min.time().replace(hour=17))
+        slots = []
+        
+        while current_time + timedelta(minutes=duration) <= end_time:
+            slot_end = current_time + timedelta(minutes=duration)
+            is_available = True
+            
+            for appointment in appointments:
+                if appointment.status == "cancelled":
+                    continue
+                appt_end = appointment.schedule_time + timedelta(minutes=appointment.duration)
+                if current_time < appt_end and slot_end > appointment.schedule_time:
+                    is_available = False
+                    break
+            
+            if is_available:
+                slots.append(current_time)
+            current_time += timedelta(minutes=interval)
+        
+        slots_by_day[day] = slots
+    
+    return slots_by_day
+
+def generate_appointments(start_date, days, count, seed=0):
+    """Generate count random appointments during working hours"""
+    rng = random.Random(seed)
+    appointments = []
+    
+    for _ in range(count):
+        day = start_date + timedelta(days=rng.randrange(days))
+        start = datetime.combine(day, datetime.min.time().replace(hour=9))
+        appointments.append(Appointment(
+            start + timedelta(minutes=rng.randrange(0, 8 * 60, 5)),
+            rng.choice([15, 30, 45, 60]),
+            "cancelled" if rng.random() < 0.1 else "scheduled"
+        ))
+    
+    return appointments
+
+def timed(func, *args):
+    """Run func once and return (result, elapsed seconds)"""
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+def main():
+    start_date = datetime(2024, 1, 1).date()
+    duration, interval = 30, 15
+    
+    print(f"{'weeks':>6} {'appointments':>13} {'naive (s)':>10} {'sweep (s)':>10} {'speedup':>8}")
+    
+    for weeks, count in [(1, 500), (4, 2000), (8, 5000), (12, 10000)]:
+        days = weeks * 7
+        appointments = generate_appointments(start_date, days, count)
+        end_date = start_date + timedelta(days=days - 1)
+        
+        naive, naive_time = timed(naive_slots_by_day, appointments, start_date, days, duration, interval)
+        sweep, sweep_time = timed(
+            find_available_slots_by_day, appointments, start_date, end_date, duration, interval
+        )
+        
+        assert naive == sweep, "sweep and naive results differ"
+        
+        print(f"{weeks:>6} {count:>13} {naive_time:>10.3f} {sweep_time:>10.4f} {naive_time / sweep_time:>7.0f}x")
+
+if __name__ == "__main__":
+    main()
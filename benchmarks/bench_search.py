@@ -0,0 +1,99 @@
+"""
+Benchmark for the indexed patient search in db.repository
+
+Compares PatientRepository.search through the SQLite FTS5 trigram index
+against the previous ILIKE scan over the joined persons and patients
+tables, on synthetic patient tables of increasing size.
+
+Usage:
+    python benchmarks/bench_search.py [largest table size, default 200000]
+"""
+import os
+import sys
+import random
+import time
+from datetime import date
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from db.models import Base, Patient
+from db.repository import PatientRepository
+
+FIRST_NAMES = ["James", "Mary", "Robert", "Patricia", "John", "Jennifer", "Michael", "Linda",
+               "David", "Elizabeth", "William", "Barbara", "Richard", "Susan", "Joseph", "Jessica"]
+LAST_NAMES = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis",
+              "Rodriguez", "Martinez", "Hernandez", "Lopez", "Gonzalez", "Wilson", "Anderson"]
+
+def populate(engine, start, count, seed=0):
+    """Insert patients start..start+count-1 with raw executemany batches"""
+    rng = random.Random(seed + start)
+    persons, patients = [], []
+    
+    for i in range(start, start + count):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        suffix = rng.randrange(10 ** 6)
+        persons.append((i + 1, f"{first}{suffix}", last, f"{first}.{last}{i}@example.com".lower(),
+                        date(1980, 1, 1).isoformat(), "patient"))
+        patients.append((i + 1, f"P{i:08d}"))
+    
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "INSERT INTO persons (id, first_name, last_name, email, dob, type) VALUES (?, ?, ?, ?, ?, ?)",
+            persons
+        )
+        connection.exec_driver_sql("INSERT INTO patients (id, patient_id) VALUES (?, ?)", patients)
+
+def scan_search(session, search_term):
+    """Previous search: OR of ILIKE predicates over every row"""
+    search_pattern = f"%{search_term}%"
+    return session.query(Patient).filter(
+        (Patient.first_name.ilike(search_pattern)) |
+        (Patient.last_name.ilike(search_pattern)) |
+        (Patient.email.ilike(search_pattern)) |
+        (Patient.patient_id.ilike(search_pattern))
+    ).all()
+
+def timed(func, *args, repeat=5):
+    """Run func repeat times and return (last result, best elapsed seconds)"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+def main():
+    largest = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    sizes = [size for size in (10000, 50000, 200000, 1000000) if size < largest] + [largest]
+    terms = ["P00004242", "123456", "anderson7"]
+    
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    repo = PatientRepository(session)
+    
+    print(f"{'patients':>9} {'term':>10} {'matches':>8} {'scan (ms)':>10} {'index (ms)':>11} {'speedup':>8}")
+    
+    populated = 0
+    for size in sizes:
+        populate(engine, populated, size - populated)
+        populated = size
+        
+        for term in terms:
+            scanned, scan_time = timed(scan_search, session, term)
+            indexed, index_time = timed(repo.search, term)
+            
+            assert {p.id for p in scanned} == {p.id for p in indexed}, "index and scan results differ"
+            session.expunge_all()
+            
+            print(f"{size:>9} {term:>10} {len(indexed):>8} {scan_time * 1000:>10.1f} "
+                  f"{index_time * 1000:>11.2f} {scan_time / index_time:>7.0f}x")
+    
+    session.close()
+
+if __name__ == "__main__":
+    main()
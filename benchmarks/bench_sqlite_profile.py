@@ -0,0 +1,100 @@
+"""
+Benchmark for the SQLite tuning profile in config.apply_sqlite_profile
+
+Runs the same workload against a file-backed SQLite database with
+SQLite's default settings (rollback journal, synchronous=FULL, 2 MB page
+cache) and with the MediTrack profile (WAL, synchronous=NORMAL, larger
+cache, mmap):
+
+- inserts: patients created one PatientRepository.create at a time, each
+  committing
+- reads: get_by_id lookups, each in its own transaction, while a second
+  thread keeps committing inserts (with a rollback journal readers wait
+  for every commit; with WAL they do not)
+  
+Usage:
+    python benchmarks/bench_sqlite_profile.py [number of patients, default 2000]
+"""
+import os
+import sys
+import random
+import tempfile
+import threading
+import time
+from datetime import date
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from config import apply_sqlite_profile
+from db.models import Base, Patient
+from db.repository import PatientRepository
+
+def insert_patients(Session, start, count):
+    """Create count patients, committing after each one"""
+    session = Session()
+    repo = PatientRepository(session)
+    for i in range(start, start + count):
+        repo.create(Patient(
+            first_name=f"First{i}", last_name="Profile", dob=date(1980, 1, 1),
+            email=f"profile{i}@example.com", patient_id=f"P{i:08d}"
+        ))
+    session.close()
+
+def run_workload(profile, count):
+    """Run the insert and read workload on a fresh database file"""
+    handle, path = tempfile.mkstemp(suffix=".db")
+    os.close(handle)
+    engine = create_engine(f"sqlite:///{path}")
+    if profile:
+        apply_sqlite_profile(engine)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    
+    try:
+        started = time.perf_counter()
+        insert_patients(Session, 0, count)
+        insert_time = time.perf_counter() - started
+        
+        # Reads racing a writer that commits count // 4 more patients
+        writer = threading.Thread(target=insert_patients, args=(Session, count, count // 4))
+        session = Session()
+        repo = PatientRepository(session)
+        rng = random.Random(0)
+        reads = 0
+        
+        started = time.perf_counter()
+        writer.start()
+        while writer.is_alive():
+            repo.get_by_id(rng.randint(1, count))
+            session.commit()
+            session.expunge_all()
+            reads += 1
+        writer.join()
+        read_time = time.perf_counter() - started
+        session.close()
+        
+        return count / insert_time, reads / read_time
+    finally:
+        engine.dispose()
+        for suffix in ("", "-wal", "-shm", "-journal"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    
+    default_inserts, default_reads = run_workload(False, count)
+    tuned_inserts, tuned_reads = run_workload(True, count)
+    
+    print(f"{count} patients, one commit per insert")
+    print(f"{'':>20} {'default':>9} {'profile':>9} {'speedup':>8}")
+    print(f"{'inserts/s':>20} {default_inserts:>9.0f} {tuned_inserts:>9.0f} "
+          f"{tuned_inserts / default_inserts:>7.1f}x")
+    print(f"{'reads/s during writes':>20} {default_reads:>9.0f} {tuned_reads:>9.0f} "
+          f"{tuned_reads / default_reads:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
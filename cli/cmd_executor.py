@@ -3,12 +3,21 @@ Command executor for the CLI
 Executes commands based on the parsed input
 """
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta
+from itertools import chain
 
 logger = logging.getLogger(__name__)
 
+def _model_row(model):
+    """Column values of a database model as a dictionary"""
+    from sqlalchemy import inspect
+    
+    return {attr.key: getattr(model, attr.key) for attr in inspect(type(model)).column_attrs}
+
 def execute_command(entity, action, args_with_options, config):
     """Execute a command based on entity, action, and arguments"""
+    from db.repository import UnitOfWork
+    
     try:
         # Extract args and options
         args = args_with_options.get("args", [])
@@ -17,23 +26,27 @@ def execute_command(entity, action, args_with_options, config):
         # Create a session
         session = config["db_session"]()
         
-        # Execute the appropriate command
-        if entity == "patient":
-            execute_patient_command(action, args, options, session)
-        elif entity == "doctor":
-            execute_doctor_command(action, args, options, session)
-        elif entity == "appointment":
-            execute_appointment_command(action, args, options, session)
-        elif entity == "medicalrecord":
-            execute_medical_record_command(action, args, options, session)
-        elif entity == "prescription":
-            execute_prescription_command(action, args, options, session)
-        elif entity == "labtest":
-            execute_lab_test_command(action, args, options, session)
-        elif entity == "report":
-            execute_report_command(action, args, options, session, config)
-        else:
-            print(f"Unknown entity: {entity}")
+        # Execute the appropriate command; its writes are committed together.
+        # Reports only read, so they may run on a read replica
+        with UnitOfWork(session, primary=entity != "report"):
+            if entity == "patient":
+                execute_patient_command(action, args, options, session)
+            elif entity == "doctor":
+                execute_doctor_command(action, args, options, session)
+            elif entity == "appointment":
+                execute_appointment_command(action, args, options, session)
+            elif entity == "medicalrecord":
+                execute_medical_record_command(action, args, options, session)
+            elif entity == "prescription":
+                execute_prescription_command(action, args, options, session)
+            elif entity == "labtest":
+                execute_lab_test_command(action, args, options, session)
+            elif entity == "report":
+                execute_report_command(action, args, options, session, config)
+            elif entity == "system":
+                execute_system_command(action, args, options, session, config)
+            else:
+                print(f"Unknown entity: {entity}")
         
         # Close the session
         session.close()
@@ -98,15 +111,28 @@ def execute_patient_command(action, args, options, session):
     elif action == "list":
         # Extract options
         limit = int(options.get("limit", 10))
-        offset = int(options.get("offset", 0))
+        offset = options.get("offset")
+        after = options.get("after")
         
-        # Get all patients
-        patients = patient_repo.get_all(limit=limit, offset=offset)
+        # Get one page of patients; --offset keeps the old OFFSET paging
+        cursor = None
+        if offset is not None:
+            patients = patient_repo.get_all(limit=limit, offset=int(offset))
+        else:
+            try:
+                patients, cursor = patient_repo.get_page(
+                    limit=limit, after=after, columns=patient_repo.listing_columns
+                )
+            except ValueError as e:
+                print(f"Error: {e}")
+                return
         
         if patients:
             print(f"Listing {len(patients)} patients:")
             for patient in patients:
                 print(f"ID: {patient.patient_id}, Name: {patient.first_name} {patient.last_name}, DOB: {patient.dob}, Email: {patient.email}")
+            if cursor:
+                print(f"Next page: --after={cursor}")
         else:
             print("No patients found")
     
@@ -219,12 +245,31 @@ def execute_doctor_command(action, args, options, session):
             print("No doctors found matching the search term")
     
     elif action == "list":
+        from db.models import Doctor
+        
         # Extract options
         department = options.get("department")
         specialisation = options.get("specialisation")
+        limit = options.get("limit")
+        after = options.get("after")
         
         # Get doctors based on filters
-        if specialisation:
+        cursor = None
+        if limit is not None or after is not None:
+            criteria = []
+            if specialisation:
+                criteria.append(Doctor.specialisation == specialisation)
+            if department:
+                criteria.append(Doctor.department == department)
+            try:
+                doctors, cursor = doctor_repo.get_page(
+                    limit=int(limit or 10), after=after, criteria=criteria,
+                    columns=doctor_repo.listing_columns
+                )
+            except ValueError as e:
+                print(f"Error: {e}")
+                return
+        elif specialisation:
             doctors = doctor_service.get_doctors_by_specialisation(specialisation)
         else:
             doctors = doctor_repo.get_all()
@@ -237,6 +282,8 @@ def execute_doctor_command(action, args, options, session):
             print(f"Listing {len(doctors)} doctors:")
             for doctor in doctors:
                 print(f"ID: {doctor.staff_id}, Name: {doctor.first_name} {doctor.last_name}, Specialisation: {doctor.specialisation}, Department: {doctor.department}")
+            if cursor:
+                print(f"Next page: --after={cursor}")
         else:
             print("No doctors found")
     
@@ -302,18 +349,91 @@ def execute_appointment_command(action, args, options, session):
                 print("Error: patient ID must be an integer")
                 return
         
-        # Get appointments based on filters
+        # Get appointments based on filters, one page at a time if asked
         from domain.services import SearchService
         search_service = SearchService(patient_repo, doctor_repo, appointment_repo, None)
-        appointments = search_service.search_appointments(doctor_id, patient_id, date, status)
+        limit = options.get("limit")
+        after = options.get("after")
+        
+        cursor = None
+        if limit is not None or after is not None:
+            try:
+                appointments, cursor = search_service.search_appointments_page(
+                    doctor_id, patient_id, date, status, limit=int(limit or 10), after=after
+                )
+            except ValueError as e:
+                print(f"Error: {e}")
+                return
+        else:
+            appointments = search_service.search_appointments(doctor_id, patient_id, date, status)
         
         if appointments:
             print(f"Listing {len(appointments)} appointments:")
             for appointment in appointments:
                 print(f"ID: {appointment.appointment_id}, Patient: {appointment.patient.get_full_name()}, Doctor: {appointment.doctor.get_full_name()}, Time: {appointment.schedule_time}, Status: {appointment.status}")
+            if cursor:
+                print(f"Next page: --after={cursor}")
         else:
             print("No appointments found")
     
+    elif action == "availability":
+        # Extract options
+        specialisation = options.get("specialisation")
+        start_date = options.get("from")
+        end_date = options.get("to")
+        duration = options.get("duration", 30)
+        
+        if not specialisation:
+            print("Error: Specialisation required")
+            print("Usage: appointment availability --specialisation=<spec> [--from=<date>] [--to=<date>] [--duration=<minutes>]")
+            return
+        
+        # Default to the coming week
+        try:
+            start_date = datetime.strptime(start_date, "%Y-%m-%d").date() if start_date else datetime.now().date()
+            end_date = datetime.strptime(end_date, "%Y-%m-%d").date() if end_date else start_date + timedelta(days=6)
+            duration = int(duration)
+        except ValueError as e:
+            print(f"Error: {e}")
+            return
+        
+        matrix = appointment_service.find_availability_matrix(specialisation, start_date, end_date, duration)
+        
+        if not matrix:
+            print(f"No doctors found with specialisation: {specialisation}")
+            return
+        
+        print(f"Availability for {specialisation} from {start_date} to {end_date} ({duration}-minute slots):")
+        for rank, entry in enumerate(matrix, 1):
+            doctor = entry["doctor"]
+            first_available = entry["first_available"].strftime("%Y-%m-%d %H:%M") if entry["first_available"] else "None"
+            print(f"{rank}. Doctor: {doctor.first_name} {doctor.last_name} (ID: {doctor.id}), First Available: {first_available}, Free Slots: {entry['free_slots']}")
+            for day, slots in entry["slots_by_day"].items():
+                if slots:
+                    print(f"   {day}: {len(slots)} free, first at {slots[0].strftime('%H:%M')}")
+    
+    elif action == "audit-conflicts":
+        # Extract options, defaulting to a year of bookings from today
+        start_date = options.get("from")
+        end_date = options.get("to")
+        by = options.get("by", "doctor")
+        
+        try:
+            start_date = datetime.strptime(start_date, "%Y-%m-%d").date() if start_date else datetime.now().date()
+            end_date = datetime.strptime(end_date, "%Y-%m-%d").date() if end_date else start_date + timedelta(days=365)
+            conflicts = appointment_service.audit_conflicts(start_date, end_date, by)
+        except ValueError as e:
+            print(f"Error: {e}")
+            return
+        
+        if conflicts:
+            print(f"Found {len(conflicts)} conflicts by {by} between {start_date} and {end_date}:")
+            for earlier, later in conflicts:
+                group_id = earlier.patient_id if by == "patient" else earlier.doctor_id
+                print(f"{by.capitalize()} {group_id}: Appointment {earlier.appointment_id} ({earlier.schedule_time}, {earlier.duration} min) overlaps Appointment {later.appointment_id} ({later.schedule_time}, {later.duration} min)")
+        else:
+            print(f"No conflicts found by {by} between {start_date} and {end_date}")
+    
     elif action == "reschedule":
         # Validate arguments
         if len(args) < 2:
@@ -731,8 +851,113 @@ def execute_lab_test_command(action, args, options, session):
     else:
         print(f"Unknown action: {action}")
 
+def _print_analysis(results, indent=""):
+    """Print an analysis result dictionary, one line per value"""
+    for key, value in results.items():
+        # Result names are made readable; data keys (statuses, diagnoses, ...) are shown as stored
+        label = key.replace("_", " ").capitalize() if not indent else key
+        if isinstance(value, dict):
+            print(f"{indent}{label}:")
+            _print_analysis(value, indent + "  ")
+        elif isinstance(value, float):
+            print(f"{indent}{label}: {value:.2f}")
+        else:
+            print(f"{indent}{label}: {value}")
+
+def execute_report_analysis(options, session, config=None):
+    """Run one of the data analysis reports and print its results"""
+    report_type = options.get("type")
+    engine = options.get("engine", "sql")
+    workers = int(options.get("workers", 0))
+    
+    if not report_type:
+        print("Error: Report type required")
+        print("Usage: report analyze --type=<patients|appointments|medical_records> [--engine=<sql|python|numpy|incremental>] [--workers=<n>] [--full]")
+        return
+    
+    if engine == "sql":
+        # Aggregated in the database; only the groups are loaded
+        from db.analytics import AnalyticsRepository
+        analytics_repo = AnalyticsRepository(session)
+        analyses = {
+            "patients": analytics_repo.patient_demographics,
+            "appointments": analytics_repo.appointment_patterns,
+            "medical_records": analytics_repo.medical_conditions,
+        }
+    elif engine == "python" and workers > 1 and config is not None:
+        # Primary key ranges streamed through the Python implementations by worker processes
+        from db.parallel_analytics import ANALYSES, analyze_in_parallel
+        analyses = {
+            name: (lambda name=name: analyze_in_parallel(name, config["database"], config["sqlite"], workers=workers))
+            for name in ANALYSES
+        }
+    elif engine == "python":
+        # Every row streamed through the Python implementations
+        from sqlalchemy.orm import selectinload
+        from algorithms.data_analysis import (
+            analyze_patient_demographics, analyze_appointment_patterns, analyze_medical_conditions
+        )
+        from db.models import Appointment
+        from db.repository import PatientRepository, AppointmentRepository, MedicalRecordRepository
+        analyses = {
+            "patients": lambda: analyze_patient_demographics(PatientRepository(session).iter_all()),
+            "appointments": lambda: analyze_appointment_patterns(
+                AppointmentRepository(session).iter_all(options=[selectinload(Appointment.doctor)])
+            ),
+            "medical_records": lambda: analyze_medical_conditions(
+                MedicalRecordRepository(session).iter_for_analysis()
+            ),
+        }
+    elif engine == "numpy":
+        # Only the columns the analysis reads, counted with vectorized NumPy
+        # (medical records are comma-separated text and are not vectorized)
+        from algorithms import numpy_analysis
+        from db.analytics import AnalyticsRepository
+        analytics_repo = AnalyticsRepository(session)
+        analyses = {
+            "patients": lambda: numpy_analysis.analyze_patient_demographics(
+                analytics_repo.load_patient_columns()
+            ),
+            "appointments": lambda: numpy_analysis.analyze_appointment_patterns(
+                analytics_repo.load_appointment_columns()
+            ),
+        }
+        if report_type == "medical_records":
+            print("The numpy engine does not analyse medical records; use --engine=sql")
+            return
+    elif engine == "incremental":
+        # Saved counts refreshed with the rows added or changed since (--full recounts)
+        from db.incremental_analytics import IncrementalAnalytics
+        incremental = IncrementalAnalytics(session)
+        full = options.get("full", False) is not False
+        analyses = {
+            "appointments": lambda: incremental.appointment_patterns(full=full),
+            "medical_records": lambda: incremental.medical_conditions(full=full),
+        }
+        if report_type == "patients":
+            print("Patient demographics change with the date and are not kept incrementally; use --engine=sql")
+            return
+    else:
+        print(f"Unknown analysis engine: {engine}")
+        return
+    
+    if report_type not in analyses:
+        print(f"Unknown report type: {report_type}")
+        return
+    
+    results = analyses[report_type]()
+    if "error" in results:
+        print(results["error"])
+        return
+    
+    _print_analysis(results)
+
 def execute_report_command(action, args, options, session, config):
     """Execute report-related commands"""
+    if action == "analyze":
+        execute_report_analysis(options, session, config)
+        return
+    
     if action != "export":
         print(f"Unknown action: {action}")
         return
@@ -758,75 +983,62 @@ def execute_report_command(action, args, options, session, config):
     output_dir = config["export"]["default_directory"]
     output_path = os.path.join(output_dir, output_file)
     
-    # Get the data based on report type
-    data = []
-    title = None
-    
+    # Stream the rows based on report type instead of loading the whole table
     if report_type == "patients":
         from db.repository import PatientRepository
-        patient_repo = PatientRepository(session)
-        patients = patient_repo.get_all()
-        data = [p for p in patients]
+        repository = PatientRepository(session)
         title = "Patient Report"
     
     elif report_type == "doctors":
         from db.repository import DoctorRepository
-        doctor_repo = DoctorRepository(session)
-        doctors = doctor_repo.get_all()
-        data = [d for d in doctors]
+        repository = DoctorRepository(session)
         title = "Doctor Report"
     
     elif report_type == "appointments":
         from db.repository import AppointmentRepository
-        appointment_repo = AppointmentRepository(session)
-        appointments = appointment_repo.get_all()
-        data = [a for a in appointments]
+        repository = AppointmentRepository(session)
         title = "Appointment Report"
     
     elif report_type == "medical_records":
         from db.repository import MedicalRecordRepository
-        medical_record_repo = MedicalRecordRepository(session)
-        records = medical_record_repo.get_all()
-        data = [r for r in records]
+        repository = MedicalRecordRepository(session)
         title = "Medical Record Report"
     
     else:
         print(f"Unknown report type: {report_type}")
         return
     
-    # Apply filters if provided
+    # Parse filters (format: field1=value1,field2=value2); they match exported column values
+    filter_dict = {}
     if filters:
-        # Parse filter string (format: field1=value1,field2=value2)
-        filter_dict = {}
-        filter_parts = filters.split(',')
-        for part in filter_parts:
+        for part in filters.split(','):
             if '=' in part:
                 key, value = part.split('=', 1)
                 filter_dict[key.strip()] = value.strip()
+    
+    from sqlalchemy import inspect
+    columns = [attr.key for attr in inspect(repository.model_class).column_attrs]
+    unknown = [field for field in filter_dict if field not in columns]
+    if unknown:
+        print(f"Error: Unknown filter field(s) for {report_type}: {', '.join(unknown)}")
+        print(f"Filterable fields: {', '.join(columns)}")
+        return
+    
+    # Export plain column values, one row at a time
+    data = (_model_row(item) for item in repository.iter_all())
+    
+    if filter_dict:
+        def matches_all(row):
+            return all(value in str(row[field]) for field, value in filter_dict.items())
         
-        # Apply filters
-        filtered_data = []
-        for item in data:
-            matches_all = True
-            for field, value in filter_dict.items():
-                if hasattr(item, field):
-                    item_value = str(getattr(item, field))
-                    if value not in item_value:
-                        matches_all = False
-                        break
-                else:
-                    matches_all = False
-                    break
-            
-            if matches_all:
-                filtered_data.append(item)
-        
-        data = filtered_data
+        data = (row for row in data if matches_all(row))
     
     # Generate the report
-    if not data:
+    first = next(data, None)
+    if first is None:
         print("No data found for the report")
         return
+    data = chain([first], data)
     
     try:
         from domain.services import FileExportService
@@ -843,3 +1055,26 @@ def execute_report_command(action, args, options, session, config):
     except Exception as e:
         print(f"Error generating report: {e}")
 
+def execute_system_command(action, args, options, session, config):
+    """Execute system status commands"""
+    from db.pool import pool_stats
+    
+    if action == "stats":
+        engine = config.get("db_engine") or session.get_bind()
+        
+        print("Connection pool:")
+        for name, value in pool_stats(engine).items():
+            print(f"  {name}: {value:.2f}" if isinstance(value, float) else f"  {name}: {value}")
+        
+        caches = config.get("entity_caches") or {}
+        if caches:
+            print("Entity cache:")
+            for repository, cache in caches.items():
+                stats = cache.stats()
+                print(f"  {repository}: {stats['size']} entries, {stats['hits']} hits, "
+                      f"{stats['misses']} misses, hit rate {stats['hit_rate']:.0%}")
+        else:
+            print("Entity cache: disabled")
+    
+    else:
+        print(f"Unknown action: {action}")
@@ -0,0 +1,256 @@
+"""
+SQL implementations of the data analysis reports
+
+AnalyticsRepository computes the same result dictionaries as
+analyze_patient_demographics, analyze_appointment_patterns and
+analyze_medical_conditions in algorithms.data_analysis, but with GROUP BY
+queries: only one row per group (age group, weekday and hour, status,
+doctor, ...) reaches Python, so memory use depends on the number of groups
+rather than the number of rows. Ties in the top-N lists are broken by key
+instead of by the order rows were read in.
+"""
+from collections import Counter
+from datetime import date
+
+from sqlalchemy import Integer, case, extract, func, select
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.expression import FunctionElement
+from sqlalchemy.types import String
+from algorithms.data_analysis import (
+    AGE_GROUPS, DAYS_OF_WEEK, appointment_patterns_result, demographics_result, medical_conditions_result
+)
+
+class day_of_week(FunctionElement):
+    """SQL expression for the weekday of a timestamp, 0 for Sunday to 6 for Saturday"""
+    type = Integer()
+    name = 'day_of_week'
+    inherit_cache = True
+
+@compiles(day_of_week)
+def _compile_day_of_week(element, compiler, **kw):
+    return f"CAST(EXTRACT(DOW FROM {compiler.process(element.clauses, **kw)}) AS INTEGER)"
+
+@compiles(day_of_week, 'sqlite')
+def _compile_day_of_week_sqlite(element, compiler, **kw):
+    return f"CAST(strftime('%w', {compiler.process(element.clauses, **kw)}) AS INTEGER)"
+
+@compiles(day_of_week, 'mysql')
+def _compile_day_of_week_mysql(element, compiler, **kw):
+    return f"(DAYOFWEEK({compiler.process(element.clauses, **kw)}) - 1)"
+
+class first_word(FunctionElement):
+    """SQL expression for the first space-separated word of a string"""
+    type = String()
+    name = 'first_word'
+    inherit_cache = True
+
+@compiles(first_word)
+def _compile_first_word(element, compiler, **kw):
+    return f"split_part(trim({compiler.process(element.clauses, **kw)}), ' ', 1)"
+
+@compiles(first_word, 'sqlite')
+def _compile_first_word_sqlite(element, compiler, **kw):
+    value = f"trim({compiler.process(element.clauses, **kw)})"
+    return f"substr({value}, 1, instr({value} || ' ', ' ') - 1)"
+
+@compiles(first_word, 'mysql')
+def _compile_first_word_mysql(element, compiler, **kw):
+    return f"substring_index(trim({compiler.process(element.clauses, **kw)}), ' ', 1)"
+
+# Weekday names in day_of_week order
+SQL_DAYS_OF_WEEK = DAYS_OF_WEEK[-1:] + DAYS_OF_WEEK[:-1]
+
+def years_before(today, years):
+    """The same calendar day years earlier (February 28 for February 29 in a non-leap year)"""
+    try:
+        return today.replace(year=today.year - years)
+    except ValueError:
+        return today.replace(year=today.year - years, day=28)
+
+class AnalyticsRepository:
+    """Repository computing the data analysis reports with aggregate queries"""
+    
+    def __init__(self, session: Session):
+        self.session = session
+    
+    def _load_columns(self, query, dtypes, batch_size=100000):
+        """Columns of a query's results as NumPy arrays, built batch_size rows at a time"""
+        from algorithms.numpy_analysis import to_columns, _numpy
+        np = _numpy()
+        
+        names = list(dtypes)
+        batches = []
+        result = self.session.execute(query.execution_options(yield_per=batch_size))
+        for rows in result.partitions():
+            batches.append(to_columns(dict(zip(names, zip(*rows))), dtypes))
+        if not batches:
+            return to_columns({name: [] for name in names}, dtypes)
+        return {name: np.concatenate([batch[name] for batch in batches]) for name in names}
+    
+    def load_patient_columns(self):
+        """
+        The patient columns used by the demographics analysis, as NumPy arrays
+        
+        Returns:
+            Dictionary of PATIENT_COLUMNS name to array, for
+            algorithms.numpy_analysis.analyze_patient_demographics
+        """
+        from algorithms.numpy_analysis import PATIENT_COLUMNS
+        from db.models import Patient
+        
+        query = select(*[getattr(Patient, name) for name in PATIENT_COLUMNS]).order_by(Patient.id)
+        return self._load_columns(query, PATIENT_COLUMNS)
+    
+    def load_appointment_columns(self):
+        """
+        The appointment columns used by the appointment patterns analysis, as NumPy arrays
+        
+        Returns:
+            Dictionary of APPOINTMENT_COLUMNS name to array, for
+            algorithms.numpy_analysis.analyze_appointment_patterns
+        """
+        from algorithms.numpy_analysis import APPOINTMENT_COLUMNS
+        from db.models import Appointment
+        
+        query = (
+            select(*[getattr(Appointment, name) for name in APPOINTMENT_COLUMNS])
+            .order_by(Appointment.appointment_id)
+        )
+        return self._load_columns(query, APPOINTMENT_COLUMNS)
+    
+    def _age_group_case(self, dob, today):
+        """CASE expression labelling a date of birth with its AGE_GROUPS group"""
+        # Someone is at most `oldest` years old if born after this day
+        # `oldest` + 1 years ago
+        whens = [
+            (dob > years_before(today, oldest + 1), label)
+            for label, oldest in AGE_GROUPS if oldest is not None
+        ]
+        return case(*whens, else_=AGE_GROUPS[-1][0])
+    
+    def patient_demographics(self, today=None):
+        """
+        SQL version of analyze_patient_demographics
+        
+        Args:
+            today: Date ages are computed at (defaults to today)
+            
+        Returns:
+            Dictionary with demographic analysis
+        """
+        from db.models import Patient
+        
+        today = today or date.today()
+        
+        # Age groups from the date of birth; every patient has one
+        group = self._age_group_case(Patient.dob, today).label("age_group")
+        age_groups = Counter(dict(self.session.execute(
+            select(group, func.count()).group_by(group)
+        ).all()))
+        total_patients = sum(age_groups.values())
+        
+        genders = Counter()
+        if hasattr(Patient, "gender"):
+            genders.update(dict(self.session.execute(
+                select(Patient.gender, func.count()).group_by(Patient.gender)
+            ).all()))
+        
+        # Insurance type is the first word of the insurance info
+        insurance_type = first_word(Patient.insurance_info).label("insurance_type")
+        insurance_types = Counter(dict(self.session.execute(
+            select(insurance_type, func.count())
+            .where(Patient.insurance_info.is_not(None), Patient.insurance_info != "")
+            .group_by(insurance_type)
+        ).all()))
+        
+        # Registrations per month
+        year = extract("year", Patient.reg_date).label("year")
+        month = extract("month", Patient.reg_date).label("month")
+        reg_months = Counter({
+            f"{int(y):04d}-{int(m):02d}": count
+            for y, m, count in self.session.execute(
+                select(year, month, func.count())
+                .where(Patient.reg_date.is_not(None))
+                .group_by(year, month)
+            )
+        })
+        
+        return demographics_result(total_patients, age_groups, genders, insurance_types, reg_months)
+    
+    def appointment_patterns(self):
+        """
+        SQL version of analyze_appointment_patterns
+        
+        Returns:
+            Dictionary with appointment analysis
+        """
+        from db.models import Appointment
+        
+        status_counts = Counter(dict(self.session.execute(
+            select(Appointment.status, func.count()).group_by(Appointment.status)
+        ).all()))
+        total_appointments = sum(status_counts.values())
+        
+        # Weekday and hour histograms from one (weekday, hour) grouping
+        weekday = day_of_week(Appointment.schedule_time).label("weekday")
+        hour = extract("hour", Appointment.schedule_time).label("hour")
+        days_of_week = Counter()
+        hours_of_day = Counter()
+        for day, hour_of_day, count in self.session.execute(
+            select(weekday, hour, func.count()).group_by(weekday, hour)
+        ):
+            days_of_week[SQL_DAYS_OF_WEEK[int(day)]] += count
+            hours_of_day[int(hour_of_day)] += count
+        
+        # Busiest doctors
+        appointment_count = func.count().label("appointment_count")
+        doctor_appointments = dict(self.session.execute(
+            select(Appointment.doctor_id, appointment_count)
+            .where(Appointment.doctor_id.is_not(None))
+            .group_by(Appointment.doctor_id)
+            .order_by(appointment_count.desc(), Appointment.doctor_id)
+            .limit(5)
+        ).all())
+        
+        return appointment_patterns_result(
+            total_appointments, days_of_week, hours_of_day, status_counts, doctor_appointments
+        )
+    
+    def medical_conditions(self):
+        """
+        SQL version of analyze_medical_conditions
+        
+        Diagnoses and treatment plans are comma-separated lists, so records
+        are grouped by the whole text and each distinct text is split once,
+        weighted by its count.
+        
+        Returns:
+            Dictionary with medical condition analysis
+        """
+        from db.models import LabTest, PatientMedicalRecord
+        
+        total_records = 0
+        diagnoses = Counter()
+        for diagnosis, count in self.session.execute(
+            select(PatientMedicalRecord.diagnosis, func.count()).group_by(PatientMedicalRecord.diagnosis)
+        ):
+            total_records += count
+            for name in diagnosis.split(','):
+                diagnoses[name.strip()] += count
+        
+        treatments = Counter()
+        for treatment_plan, count in self.session.execute(
+            select(PatientMedicalRecord.treatment_plan, func.count())
+            .group_by(PatientMedicalRecord.treatment_plan)
+        ):
+            for treatment in treatment_plan.split(','):
+                treatments[treatment.strip()] += count
+        
+        abnormal_tests = Counter(dict(self.session.execute(
+            select(LabTest.test_name, func.count())
+            .where(LabTest.is_abnormal == True)
+            .group_by(LabTest.test_name)
+        ).all()))
+        
+        return medical_conditions_result(total_records, diagnoses, treatments, abnormal_tests)
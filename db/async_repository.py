@@ -0,0 +1,211 @@
+"""
+Async twins of the repositories, for use with SQLAlchemy's AsyncSession
+
+Every async repository wraps the matching repository in db.repository and
+runs its methods through AsyncSession.run_sync, so queries, caching and
+commit rules are exactly those of the sync classes. While a call waits on
+the database the event loop is free to run other tasks.
+
+An AsyncSession, like a Session, must not be shared by concurrent tasks:
+give every task its own session from the async session factory
+(config.create_async_session_factory). Entities come back with their
+columns loaded; lazy relationships cannot be loaded outside run_sync, so
+load them eagerly or read them inside an async service method.
+"""
+import functools
+import logging
+
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from db.repository import (
+    UnitOfWork, BaseRepository, PatientRepository, DoctorRepository, AppointmentRepository,
+    MedicalRecordRepository, PrescriptionRepository, LabTestRepository
+)
+
+logger = logging.getLogger(__name__)
+
+# Rows fetched per run_sync call by the async generators
+ITER_BATCH_SIZE = 500
+
+def async_twin(method):
+    """Coroutine method running the sync repository method of the same name"""
+    @functools.wraps(method)
+    async def twin(self, *args, **kwargs):
+        return await self._run(method.__name__, *args, **kwargs)
+    return twin
+
+def async_iter_twin(method):
+    """Async generator method over the sync repository generator of the same name"""
+    @functools.wraps(method)
+    def twin(self, *args, **kwargs):
+        return self._iterate(method.__name__, *args, **kwargs)
+    return twin
+
+async def iterate_in_batches(session, start):
+    """
+    Drive a sync generator from async code, a batch of items per run_sync call
+    
+    Args:
+        session: AsyncSession
+        start: Function taking the sync session and returning the generator
+        
+    Yields:
+        The generator's items
+    """
+    generator = None
+    
+    def next_batch(sync_session):
+        nonlocal generator
+        if generator is None:
+            generator = start(sync_session)
+        batch = []
+        for item in generator:
+            batch.append(item)
+            if len(batch) >= ITER_BATCH_SIZE:
+                break
+        return batch
+    
+    try:
+        while True:
+            batch = await session.run_sync(next_batch)
+            for item in batch:
+                yield item
+            if len(batch) < ITER_BATCH_SIZE:
+                return
+    finally:
+        if generator is not None:
+            generator.close()
+
+class AsyncUnitOfWork(UnitOfWork):
+    """
+    UnitOfWork for an AsyncSession
+    
+    Shares its scope with UnitOfWork, so async and sync repository calls on
+    the same session join one transaction.
+    
+    Usage:
+        async with AsyncUnitOfWork(session):
+            record = await record_repo.create(record)
+            await prescription_repo.create(prescription)
+    """
+    
+    def __init__(self, session: AsyncSession):
+        super().__init__(session.sync_session)
+        self.async_session = session
+    
+    async def __aenter__(self):
+        return self._enter()
+    
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        outcome = self._leave(exc_type)
+        if outcome is None:
+            return False
+        if outcome == "rollback":
+            await self.async_session.rollback()
+            return False
+        
+        try:
+            await self.async_session.commit()
+        except SQLAlchemyError as e:
+            await self.async_session.rollback()
+            logger.error(f"Error committing unit of work: {e}")
+            raise
+        return False
+
+class AsyncBaseRepository:
+    """Async base repository running a sync repository on an AsyncSession"""
+    
+    repository_class = BaseRepository
+    
+    def __init__(self, session: AsyncSession, model_class=None):
+        self.session = session
+        self.model_class = model_class
+    
+    def sync(self, sync_session):
+        """The sync repository on the AsyncSession's underlying session"""
+        if self.repository_class is BaseRepository:
+            return BaseRepository(sync_session, self.model_class)
+        return self.repository_class(sync_session)
+    
+    async def _run(self, name, *args, **kwargs):
+        return await self.session.run_sync(
+            lambda sync_session: getattr(self.sync(sync_session), name)(*args, **kwargs)
+        )
+    
+    def _iterate(self, name, *args, **kwargs):
+        return iterate_in_batches(
+            self.session,
+            lambda sync_session: getattr(self.sync(sync_session), name)(*args, **kwargs)
+        )
+    
+    def unit_of_work(self):
+        """Transaction scope on this repository's session"""
+        return AsyncUnitOfWork(self.session)
+    
+    get_by_id = async_twin(BaseRepository.get_by_id)
+    get_by_ids = async_twin(BaseRepository.get_by_ids)
+    get_all = async_twin(BaseRepository.get_all)
+    get_page = async_twin(BaseRepository.get_page)
+    create = async_twin(BaseRepository.create)
+    update = async_twin(BaseRepository.update)
+    delete = async_twin(BaseRepository.delete)
+    delete_by_id = async_twin(BaseRepository.delete_by_id)
+    create_many = async_twin(BaseRepository.create_many)
+    bulk_upsert = async_twin(BaseRepository.bulk_upsert)
+    iter_all = async_iter_twin(BaseRepository.iter_all)
+    iter_regex_search = async_iter_twin(BaseRepository.iter_regex_search)
+
+class AsyncPatientRepository(AsyncBaseRepository):
+    """Async repository for Patient entities"""
+    
+    repository_class = PatientRepository
+    
+    search = async_twin(PatientRepository.search)
+    get_by_patient_id = async_twin(PatientRepository.get_by_patient_id)
+
+class AsyncDoctorRepository(AsyncBaseRepository):
+    """Async repository for Doctor entities"""
+    
+    repository_class = DoctorRepository
+    
+    search = async_twin(DoctorRepository.search)
+    get_by_specialisation = async_twin(DoctorRepository.get_by_specialisation)
+    get_by_department = async_twin(DoctorRepository.get_by_department)
+
+class AsyncAppointmentRepository(AsyncBaseRepository):
+    """Async repository for Appointment entities"""
+    
+    repository_class = AppointmentRepository
+    
+    get_by_doctor = async_twin(AppointmentRepository.get_by_doctor)
+    get_by_patient = async_twin(AppointmentRepository.get_by_patient)
+    get_by_date_range = async_twin(AppointmentRepository.get_by_date_range)
+    get_busy_intervals = async_twin(AppointmentRepository.get_busy_intervals)
+    has_conflict = async_twin(AppointmentRepository.has_conflict)
+    create_if_available = async_twin(AppointmentRepository.create_if_available)
+    iter_schedule_rows = async_iter_twin(AppointmentRepository.iter_schedule_rows)
+
+class AsyncMedicalRecordRepository(AsyncBaseRepository):
+    """Async repository for MedicalRecord entities"""
+    
+    repository_class = MedicalRecordRepository
+    
+    get_by_patient = async_twin(MedicalRecordRepository.get_by_patient)
+    search_by_diagnosis = async_twin(MedicalRecordRepository.search_by_diagnosis)
+    iter_for_analysis = async_iter_twin(MedicalRecordRepository.iter_for_analysis)
+
+class AsyncPrescriptionRepository(AsyncBaseRepository):
+    """Async repository for Prescription entities"""
+    
+    repository_class = PrescriptionRepository
+    
+    get_by_record = async_twin(PrescriptionRepository.get_by_record)
+    get_active_prescriptions = async_twin(PrescriptionRepository.get_active_prescriptions)
+
+class AsyncLabTestRepository(AsyncBaseRepository):
+    """Async repository for LabTest entities"""
+    
+    repository_class = LabTestRepository
+    
+    get_by_record = async_twin(LabTestRepository.get_by_record)
+    get_abnormal_tests = async_twin(LabTestRepository.get_abnormal_tests)
@@ -0,0 +1,145 @@
+"""
+Process-level read-through cache for frequently read entities
+
+Entries are plain snapshots of an entity's column values, never live ORM
+objects, so they can be shared between sessions. Repositories turn a
+snapshot back into a session-bound entity without running any SQL.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import make_transient_to_detached
+
+class EntityCache:
+    """
+    Thread-safe LRU cache with a time-to-live on every entry
+    
+    Usage:
+        cache = EntityCache(max_size=1024, ttl=300)
+        cache.put(key, value)
+        value = cache.get(key)  # None on a miss
+    """
+    
+    def __init__(self, max_size=1024, ttl=300):
+        """
+        Args:
+            max_size: Maximum number of entries; the least recently used go first
+            ttl: Seconds an entry stays valid, or None to keep it until evicted
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+    
+    def get(self, key):
+        """Value stored for key, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def put(self, key, value):
+        """Store value for key, evicting the least recently used entries if full"""
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def invalidate(self, key):
+        """Drop the entry for key if there is one"""
+        with self._lock:
+            self._entries.pop(key, None)
+    
+    def clear(self):
+        """Drop every entry and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = self.expirations = 0
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def stats(self):
+        """
+        Cache counters
+        
+        Returns:
+            Dictionary with size, hits, misses, evictions, expirations and hit_rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+def snapshot(entity):
+    """
+    Column values of a fully loaded entity, or None if some are not loaded
+    
+    Args:
+        entity: Persistent ORM instance
+        
+    Returns:
+        Tuple of (model class, dict of column values) or None
+    """
+    state = inspect(entity)
+    values = {}
+    for attr in state.mapper.column_attrs:
+        if attr.key not in state.dict:
+            return None
+        values[attr.key] = state.dict[attr.key]
+    return type(entity), values
+
+def restore(session, cached):
+    """
+    Entity in session built from a snapshot, without running any SQL
+    
+    If the session already holds the entity, that instance is returned.
+    
+    Args:
+        session: SQLAlchemy session
+        cached: Snapshot returned by snapshot()
+        
+    Returns:
+        Persistent ORM instance
+    """
+    model, values = cached
+    
+    # Merging the snapshot into a held instance would overwrite its unflushed changes
+    mapper = inspect(model)
+    key = mapper.identity_key_from_primary_key(
+        [values[mapper.get_property_by_column(column).key] for column in mapper.primary_key]
+    )
+    held = session.identity_map.get(key)
+    if held is not None:
+        return held
+    
+    entity = model(**values)
+    make_transient_to_detached(entity)
+    return session.merge(entity, load=False)
@@ -0,0 +1,190 @@
+"""
+Incrementally refreshed analysis reports
+
+Appointments and medical records are mostly appended, so rather than
+recounting the whole history on every call, IncrementalAnalytics keeps
+each report's accumulator (algorithms.data_analysis) in the
+analytics_state table together with watermarks: the highest
+appointment_id or record_id counted so far and the last appointment
+change applied. A refresh only reads what lies past the watermarks:
+
+- appointment patterns: new appointments are added with their current
+  values, and the changes logged in appointment_changes (status changes,
+  reschedules, deletions) of appointments counted earlier are applied by
+  taking out the old values and adding the new ones; applied changes are
+  then deleted from the log
+- medical conditions: new records add their diagnoses and treatments;
+  abnormal lab tests are recounted with one aggregate over the partial
+  index on abnormal results, as results arrive after the record
+  
+Patient demographics are not kept: age groups move with the date.
+Changes made with raw SQL or bulk UPDATEs other than bulk_upsert (which
+logs its appointment changes), edits of a record's diagnosis or treatment
+and rows committed after a row with a higher key was counted are not
+seen; refresh with full=True after them. Once counts have been taken out, ties
+in the top-N lists may be ordered differently from a full recount.
+
+Give a refresh a session of its own: it reads rows and change log in one
+transaction (REPEATABLE READ on PostgreSQL and MySQL) on the primary
+database, so no change is counted both through its row and its log entry.
+"""
+import logging
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+from algorithms.data_analysis import AppointmentPatternsAccumulator, MedicalConditionsAccumulator
+from db.repository import UnitOfWork
+
+logger = logging.getLogger(__name__)
+
+# Rows fetched at a time while folding in new rows
+REFRESH_BATCH_SIZE = 1000
+
+class IncrementalAnalytics:
+    """Analysis reports refreshed from the rows added or changed since the last refresh"""
+    
+    APPOINTMENT_PATTERNS = "appointment_patterns"
+    MEDICAL_CONDITIONS = "medical_conditions"
+    
+    def __init__(self, session: Session):
+        self.session = session
+    
+    def _begin(self):
+        """Start the refresh's transaction as one snapshot of the primary database"""
+        if hasattr(self.session, "use_primary"):
+            self.session.use_primary()
+        if not self.session.in_transaction() and self.session.get_bind().dialect.name in ("postgresql", "mysql"):
+            self.session.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+    
+    def _load(self, name, accumulator_class, watermarks, full):
+        """The saved accumulator and watermarks of a report, or empty ones"""
+        from db.models import AnalyticsState
+        
+        saved = None if full else self.session.get(AnalyticsState, name)
+        if saved is None:
+            return accumulator_class(), dict(watermarks)
+        return accumulator_class.from_state(saved.state), {**watermarks, **saved.watermarks}
+    
+    def _save(self, name, accumulator, watermarks):
+        """Save a report's accumulator and watermarks, committed with the refresh"""
+        from db.models import AnalyticsState
+        
+        saved = self.session.get(AnalyticsState, name)
+        if saved is None:
+            saved = AnalyticsState(name=name)
+            self.session.add(saved)
+        saved.state = accumulator.to_state()
+        saved.watermarks = watermarks
+    
+    def appointment_patterns(self, full=False):
+        """
+        Incrementally refreshed analyze_appointment_patterns
+        
+        Args:
+            full: Recount every appointment instead of starting from the saved state
+            
+        Returns:
+            Dictionary with appointment analysis
+        """
+        from db.models import Appointment, AppointmentChange
+        
+        with UnitOfWork(self.session):
+            self._begin()
+            accumulator, watermarks = self._load(
+                self.APPOINTMENT_PATTERNS, AppointmentPatternsAccumulator,
+                {"appointment_id": 0, "change_id": 0}, full
+            )
+            last_appointment, last_change = self.session.execute(select(
+                select(func.max(Appointment.appointment_id)).scalar_subquery(),
+                select(func.max(AppointmentChange.change_id)).scalar_subquery()
+            )).one()
+            last_appointment = last_appointment or watermarks["appointment_id"]
+            last_change = last_change or watermarks["change_id"]
+            
+            # Changes of appointments counted before: new values in, old values out
+            changes = self.session.execute(
+                select(
+                    AppointmentChange.old_schedule_time, AppointmentChange.old_status,
+                    AppointmentChange.old_doctor_id, AppointmentChange.new_schedule_time,
+                    AppointmentChange.new_status, AppointmentChange.new_doctor_id
+                )
+                .where(
+                    AppointmentChange.change_id > watermarks["change_id"],
+                    AppointmentChange.change_id <= last_change,
+                    AppointmentChange.appointment_id <= watermarks["appointment_id"]
+                )
+                .order_by(AppointmentChange.change_id)
+            ).all()
+            for change in changes:
+                if change.new_schedule_time is not None:
+                    accumulator.add(change.new_schedule_time, change.new_status, change.new_doctor_id)
+            accumulator.retract(change[:3] for change in changes)
+            
+            # Appointments added since, with their current values
+            new_appointments = 0
+            for schedule_time, status, doctor_id in self.session.execute(
+                select(Appointment.schedule_time, Appointment.status, Appointment.doctor_id)
+                .where(
+                    Appointment.appointment_id > watermarks["appointment_id"],
+                    Appointment.appointment_id <= last_appointment
+                )
+                .order_by(Appointment.appointment_id)
+                .execution_options(yield_per=REFRESH_BATCH_SIZE)
+            ):
+                accumulator.add(schedule_time, status, doctor_id)
+                new_appointments += 1
+            
+            logger.info(f"Appointment patterns refreshed with {new_appointments} new appointments "
+                        f"and {len(changes)} changes")
+            self._save(self.APPOINTMENT_PATTERNS, accumulator,
+                       {"appointment_id": last_appointment, "change_id": last_change})
+            # The saved state holds every change up to the watermark, so the log can let them go
+            self.session.execute(
+                delete(AppointmentChange).where(AppointmentChange.change_id <= last_change),
+                execution_options={"synchronize_session": False}
+            )
+        
+        return accumulator.finalize()
+    
+    def medical_conditions(self, full=False):
+        """
+        Incrementally refreshed analyze_medical_conditions
+        
+        Args:
+            full: Recount every medical record instead of starting from the saved state
+            
+        Returns:
+            Dictionary with medical condition analysis
+        """
+        from db.models import LabTest, PatientMedicalRecord
+        
+        with UnitOfWork(self.session):
+            self._begin()
+            accumulator, watermarks = self._load(
+                self.MEDICAL_CONDITIONS, MedicalConditionsAccumulator, {"record_id": 0}, full
+            )
+            last_record = self.session.execute(
+                select(func.max(PatientMedicalRecord.record_id))
+            ).scalar() or watermarks["record_id"]
+            
+            # Rows have diagnosis and treatment_plan attributes but no lab tests
+            accumulator.update(self.session.execute(
+                select(PatientMedicalRecord.diagnosis, PatientMedicalRecord.treatment_plan)
+                .where(
+                    PatientMedicalRecord.record_id > watermarks["record_id"],
+                    PatientMedicalRecord.record_id <= last_record
+                )
+                .order_by(PatientMedicalRecord.record_id)
+                .execution_options(yield_per=REFRESH_BATCH_SIZE)
+            ))
+            
+            accumulator.abnormal_tests.clear()
+            accumulator.abnormal_tests.update(dict(self.session.execute(
+                select(LabTest.test_name, func.count())
+                .where(LabTest.is_abnormal == True)
+                .group_by(LabTest.test_name)
+            ).all()))
+            
+            self._save(self.MEDICAL_CONDITIONS, accumulator, {"record_id": last_record})
+        
+        return accumulator.finalize()
@@ -10,7 +10,10 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import logging
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
-from db.models import Base, Person, Patient, Staff, Doctor, PatientMedicalRecord, Prescription, LabTest, Appointment
+from db.models import (
+    Base, Person, Patient, Staff, Doctor, PatientMedicalRecord, Prescription, LabTest, Appointment,
+    APPOINTMENT_OVERLAP_CONSTRAINT, APPOINTMENT_OVERLAP_DDL
+)
 import json
 from datetime import datetime, timedelta
 import random
@@ -35,10 +38,85 @@ def init_db(db_url, echo=False):
     # Create tables
     Base.metadata.create_all(engine)
     
+    # Databases created before an index was declared only get it from here
+    apply_indexes(engine)
+    
     logger.info(f"Database initialized at {db_url}")
     
     return engine, Session
 
+def apply_indexes(engine):
+    """
+    Create any declared index that is missing from an existing database
+    
+    On PostgreSQL this also adds the constraint against overlapping
+    appointments of a doctor, unless existing bookings already overlap.
+    
+    Args:
+        engine: SQLAlchemy engine
+    
+    Returns:
+        List of the names of the indexes and constraints that were created
+    """
+    from sqlalchemy import inspect
+    
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    created = []
+    
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        
+        existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            if index.name in existing_indexes:
+                continue
+            
+            index.create(bind=engine, checkfirst=True)
+            created.append(index.name)
+            logger.info(f"Created index {index.name} on {table.name}")
+    
+    if engine.dialect.name == "postgresql" and "appointments" in existing_tables:
+        if apply_appointment_overlap_constraint(engine):
+            created.append(APPOINTMENT_OVERLAP_CONSTRAINT)
+    
+    return created
+
+def apply_appointment_overlap_constraint(engine):
+    """
+    Add the exclusion constraint against overlapping appointments to an
+    existing PostgreSQL database that lacks it
+    
+    Args:
+        engine: SQLAlchemy engine of a PostgreSQL database
+    
+    Returns:
+        True if the constraint was added, False if it exists or existing
+        appointments overlap (logged as a warning)
+    """
+    from sqlalchemy import DDL, text
+    from sqlalchemy.exc import IntegrityError
+    
+    with engine.connect() as connection:
+        exists = connection.execute(
+            text("SELECT 1 FROM pg_constraint WHERE conrelid = 'appointments'::regclass AND conname = :name"),
+            {"name": APPOINTMENT_OVERLAP_CONSTRAINT}
+        ).first()
+    if exists:
+        return False
+    
+    try:
+        with engine.begin() as connection:
+            connection.execute(DDL(APPOINTMENT_OVERLAP_DDL))
+    except IntegrityError as e:
+        logger.warning(f"Could not add {APPOINTMENT_OVERLAP_CONSTRAINT}, existing appointments overlap: {e.orig}. "
+                       f"Resolve the double bookings and run apply_indexes again")
+        return False
+    
+    logger.info(f"Created constraint {APPOINTMENT_OVERLAP_CONSTRAINT} on appointments")
+    return True
+
 def load_sample_data(session):
     """
     Load sample data into the database
@@ -2,8 +2,12 @@
 Database models for MediTrack using SQLAlchemy ORM
 """
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Date, DateTime, Boolean, Text, ForeignKey, Float
+from sqlalchemy import (
+    Column, Integer, String, Date, DateTime, Boolean, Text, ForeignKey, Float, Index, DDL, JSON, event, insert, select
+)
+from sqlalchemy import inspect as sa_inspect
 from sqlalchemy.orm import relationship, declarative_base
+from db.search_index import install_search_index, drop_search_index
 
 Base = declarative_base()
 
@@ -40,8 +44,11 @@ class Patient(Person):
     medical_records = relationship("PatientMedicalRecord", back_populates="patient")
     appointments = relationship("Appointment", back_populates="patient")
     
+    # Person queries load patient columns with one extra SELECT ... IN for
+    # all patient rows, not one SELECT per row
     __mapper_args__ = {
         'polymorphic_identity': 'patient',
+        'polymorphic_load': 'selectin',
     }
 
 class Staff(Person):
@@ -51,12 +58,14 @@ class Staff(Person):
     id = Column(Integer, ForeignKey('persons.id'), primary_key=True)
     staff_id = Column(String(20), unique=True, nullable=False)
     role = Column(String(50), nullable=False)
-    department = Column(String(50))
+    department = Column(String(50), index=True)
     hire_date = Column(Date, default=datetime.now().date)
     qualification = Column(String(255))
     
+    # Loaded like patients from Person queries; doctor columns come inline
     __mapper_args__ = {
         'polymorphic_identity': 'staff',
+        'polymorphic_load': 'selectin',
     }
 
 class Doctor(Staff):
@@ -64,15 +73,17 @@ class Doctor(Staff):
     __tablename__ = 'doctors'
     
     id = Column(Integer, ForeignKey('staff.id'), primary_key=True)
-    specialisation = Column(String(100), nullable=False)
+    specialisation = Column(String(100), nullable=False, index=True)
     license_number = Column(String(50), unique=True, nullable=False)
     certifications = Column(Text)  # Stored as JSON string
     
     # Relationships
     appointments = relationship("Appointment", back_populates="doctor")
     
+    # Staff queries LEFT JOIN doctors, so doctor rows need no second query
     __mapper_args__ = {
         'polymorphic_identity': 'doctor',
+        'polymorphic_load': 'inline',
     }
 
 class PatientMedicalRecord(Base):
@@ -80,7 +91,7 @@ class PatientMedicalRecord(Base):
     __tablename__ = 'patient_medical_records'
     
     record_id = Column(Integer, primary_key=True)
-    patient_id = Column(Integer, ForeignKey('patients.id'), nullable=False)
+    patient_id = Column(Integer, ForeignKey('patients.id'), nullable=False, index=True)
     date_created = Column(DateTime, default=datetime.now)
     diagnosis = Column(Text, nullable=False)
     treatment_plan = Column(Text, nullable=False)
@@ -96,7 +107,7 @@ class Prescription(Base):
     __tablename__ = 'prescriptions'
     
     prescription_id = Column(Integer, primary_key=True)
-    record_id = Column(Integer, ForeignKey('patient_medical_records.record_id'), nullable=False)
+    record_id = Column(Integer, ForeignKey('patient_medical_records.record_id'), nullable=False, index=True)
     medication = Column(String(100), nullable=False)
     dosage = Column(String(50), nullable=False)
     frequency = Column(String(50), nullable=False)
@@ -107,13 +118,21 @@ class Prescription(Base):
     
     # Relationships
     medical_record = relationship("PatientMedicalRecord", back_populates="prescriptions")
+    
+    # Partial index holding only the active prescriptions of each record
+    __table_args__ = (
+        Index(
+            'ix_prescriptions_active_record', record_id,
+            postgresql_where=(is_active == True), sqlite_where=(is_active == True)
+        ),
+    )
 
 class LabTest(Base):
     """Lab test model"""
     __tablename__ = 'lab_tests'
     
     test_id = Column(Integer, primary_key=True)
-    record_id = Column(Integer, ForeignKey('patient_medical_records.record_id'), nullable=False)
+    record_id = Column(Integer, ForeignKey('patient_medical_records.record_id'), nullable=False, index=True)
     test_name = Column(String(100), nullable=False)
     test_type = Column(String(50), nullable=False)
     ordered_date = Column(Date, nullable=False)
@@ -124,6 +143,14 @@ class LabTest(Base):
     
     # Relationships
     medical_record = relationship("PatientMedicalRecord", back_populates="lab_tests")
+    
+    # Partial index holding only the abnormal results
+    __table_args__ = (
+        Index(
+            'ix_lab_tests_abnormal_record', record_id,
+            postgresql_where=(is_abnormal == True), sqlite_where=(is_abnormal == True)
+        ),
+    )
 
 class Appointment(Base):
     """Appointment model"""
@@ -132,12 +159,173 @@ class Appointment(Base):
     appointment_id = Column(Integer, primary_key=True)
     patient_id = Column(Integer, ForeignKey('patients.id'), nullable=False)
     doctor_id = Column(Integer, ForeignKey('doctors.id'), nullable=False)
-    schedule_time = Column(DateTime, nullable=False)
+    schedule_time = Column(DateTime, nullable=False, index=True)
     duration = Column(Integer, nullable=False)  # Duration in minutes
-    status = Column(String(20), default='scheduled')  # scheduled, completed, cancelled
+    status = Column(String(20), default='scheduled', index=True)  # scheduled, completed, cancelled
     notes = Column(Text)
     
     # Relationships
     patient = relationship("Patient", back_populates="appointments")
     doctor = relationship("Doctor", back_populates="appointments")
+    
+    # Composite indexes for the per-doctor and per-patient overlap checks
+    __table_args__ = (
+        Index('ix_appointments_doctor_schedule', 'doctor_id', 'schedule_time'),
+        Index('ix_appointments_patient_schedule', 'patient_id', 'schedule_time'),
+    )
+
+# On PostgreSQL the database itself rejects overlapping bookings for a doctor,
+# which closes the race between the overlap check and the insert (existing
+# databases get the constraint from db.init_db.apply_indexes)
+APPOINTMENT_OVERLAP_CONSTRAINT = "appointments_doctor_no_overlap"
+APPOINTMENT_OVERLAP_DDL = (
+    "CREATE EXTENSION IF NOT EXISTS btree_gist; "
+    f"ALTER TABLE appointments ADD CONSTRAINT {APPOINTMENT_OVERLAP_CONSTRAINT} "
+    "EXCLUDE USING gist (doctor_id WITH =, "
+    "tsrange(schedule_time, schedule_time + duration * interval '1 minute') WITH &&) "
+    "WHERE (status IS DISTINCT FROM 'cancelled')"
+)
+event.listen(
+    Appointment.__table__,
+    'after_create',
+    DDL(APPOINTMENT_OVERLAP_DDL).execute_if(dialect='postgresql')
+)
+
+class AppointmentChange(Base):
+    """
+    Change log of the appointment values the analysis reports count
+    
+    A row holds an appointment's schedule time, status and doctor before
+    and after an update (the new values are empty for a deletion). Written
+    in the same transaction as the change, by the listeners below (and by
+    log_appointment_updates for bulk UPDATEs).
+    """
+    __tablename__ = 'appointment_changes'
+    
+    change_id = Column(Integer, primary_key=True)
+    appointment_id = Column(Integer, nullable=False, index=True)  # no foreign key: deletions are logged too
+    old_schedule_time = Column(DateTime, nullable=False)
+    old_status = Column(String(20))
+    old_doctor_id = Column(Integer)
+    new_schedule_time = Column(DateTime)
+    new_status = Column(String(20))
+    new_doctor_id = Column(Integer)
+    changed_at = Column(DateTime, default=datetime.now)
+
+class AnalyticsState(Base):
+    """Saved state of an incrementally refreshed analysis report (see db.incremental_analytics)"""
+    __tablename__ = 'analytics_state'
+    
+    name = Column(String(50), primary_key=True)
+    state = Column(JSON, nullable=False)  # accumulator counts
+    watermarks = Column(JSON, nullable=False)  # highest keys folded in, e.g. {"appointment_id": 1200}
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+# Appointment columns whose changes are logged to appointment_changes
+LOGGED_APPOINTMENT_COLUMNS = ("schedule_time", "status", "doctor_id")
+
+def _stored_appointment_values(connection, appointment_id):
+    """The logged columns of an appointment as stored, before the flush changes them"""
+    table = Appointment.__table__
+    return connection.execute(
+        select(*[table.c[name] for name in LOGGED_APPOINTMENT_COLUMNS])
+        .where(table.c.appointment_id == appointment_id)
+    ).one_or_none()
+
+def _old_appointment_values(connection, target):
+    """The logged columns of an appointment before the flush, from its attribute history when loaded"""
+    state = sa_inspect(target)
+    old = []
+    for name in LOGGED_APPOINTMENT_COLUMNS:
+        history = state.attrs[name].history
+        if history.deleted:
+            old.append(history.deleted[0])
+        elif history.unchanged:
+            old.append(history.unchanged[0])
+        else:
+            # Set without the previous value loaded, or expired
+            return _stored_appointment_values(connection, target.appointment_id)
+    return tuple(old)
+
+@event.listens_for(Appointment, 'before_update')
+def _log_appointment_update(mapper, connection, target):
+    state = sa_inspect(target)
+    if not any(state.attrs[name].history.has_changes() for name in LOGGED_APPOINTMENT_COLUMNS):
+        return
+    old = _old_appointment_values(connection, target)
+    new = tuple(getattr(target, name) for name in LOGGED_APPOINTMENT_COLUMNS)
+    if old is None or tuple(old) == new:
+        return
+    connection.execute(insert(AppointmentChange.__table__).values(
+        appointment_id=target.appointment_id,
+        **{f"old_{name}": value for name, value in zip(LOGGED_APPOINTMENT_COLUMNS, old)},
+        **{f"new_{name}": value for name, value in zip(LOGGED_APPOINTMENT_COLUMNS, new)},
+        changed_at=datetime.now()
+    ))
+
+@event.listens_for(Appointment, 'before_delete')
+def _log_appointment_delete(mapper, connection, target):
+    old = _old_appointment_values(connection, target)
+    if old is None:
+        return
+    connection.execute(insert(AppointmentChange.__table__).values(
+        appointment_id=target.appointment_id,
+        **{f"old_{name}": value for name, value in zip(LOGGED_APPOINTMENT_COLUMNS, old)},
+        changed_at=datetime.now()
+    ))
+
+def log_appointment_updates(connection, rows):
+    """
+    Log the changes a bulk UPDATE of appointments is about to make
+    
+    ORM bulk UPDATEs by primary key do not run the mapper events above, so
+    BaseRepository.bulk_upsert calls this first, in the same transaction.
+    The stored values are read FOR UPDATE so they cannot change before the
+    UPDATE runs.
+    
+    Args:
+        connection: Connection of the transaction the UPDATE runs in
+        rows: Mappings of attribute names to new values, each with its appointment_id
+    """
+    rows = [row for row in rows if any(name in row for name in LOGGED_APPOINTMENT_COLUMNS)]
+    if not rows:
+        return
+    
+    table = Appointment.__table__
+    stored = {
+        row[0]: tuple(row[1:])
+        for row in connection.execute(
+            select(table.c.appointment_id, *[table.c[name] for name in LOGGED_APPOINTMENT_COLUMNS])
+            .where(table.c.appointment_id.in_([row["appointment_id"] for row in rows]))
+            .with_for_update()
+        )
+    }
+    
+    changes = []
+    changed_at = datetime.now()
+    for row in rows:
+        old = stored.get(row["appointment_id"])
+        if old is None:
+            continue
+        new = tuple(row.get(name, value) for name, value in zip(LOGGED_APPOINTMENT_COLUMNS, old))
+        if new != old:
+            changes.append({
+                "appointment_id": row["appointment_id"],
+                **{f"old_{name}": value for name, value in zip(LOGGED_APPOINTMENT_COLUMNS, old)},
+                **{f"new_{name}": value for name, value in zip(LOGGED_APPOINTMENT_COLUMNS, new)},
+                "changed_at": changed_at,
+            })
+    if changes:
+        connection.execute(insert(AppointmentChange.__table__), changes)
 
+# Indexed patient and doctor search: pg_trgm indexes on PostgreSQL, FTS5 tables on SQLite
+event.listen(
+    Base.metadata,
+    'after_create',
+    lambda target, connection, **kw: install_search_index(connection)
+)
+event.listen(
+    Base.metadata,
+    'before_drop',
+    lambda target, connection, **kw: drop_search_index(connection)
+)
@@ -0,0 +1,182 @@
+"""
+Full-history analysis in parallel over primary key ranges
+
+The table behind an analysis is split into primary key ranges, and a
+ProcessPoolExecutor streams each range through the analysis accumulator
+(algorithms.data_analysis) in a worker process with its own engine and
+session. The partial accumulators are merged in range order, so the result
+is the one a single pass would give, ties included.
+
+Workers open the database themselves from the "database" config section,
+so it has to be a file or a server: an in-memory SQLite database exists
+only in the process that created it.
+
+Usage:
+    config = load_config()
+    results = analyze_in_parallel("appointments", config["database"], config["sqlite"], workers=4)
+"""
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import selectinload, sessionmaker
+from algorithms.data_analysis import (
+    AppointmentPatternsAccumulator, DemographicsAccumulator, MedicalConditionsAccumulator
+)
+from config import apply_sqlite_profile, engine_options
+
+logger = logging.getLogger(__name__)
+
+def _patients(session):
+    """Primary key of the patients and a function streaming those matching criteria"""
+    from db.models import Patient
+    from db.repository import PatientRepository
+    
+    return Patient.id, lambda criteria: PatientRepository(session).iter_all(criteria=criteria)
+
+def _appointments(session):
+    """Primary key of the appointments and a function streaming those matching criteria"""
+    from db.models import Appointment
+    from db.repository import AppointmentRepository
+    
+    return Appointment.appointment_id, lambda criteria: AppointmentRepository(session).iter_all(
+        criteria=criteria, options=[selectinload(Appointment.doctor)]
+    )
+
+def _medical_records(session):
+    """Primary key of the medical records and a function streaming those matching criteria"""
+    from db.models import PatientMedicalRecord
+    from db.repository import MedicalRecordRepository
+    
+    return PatientMedicalRecord.record_id, lambda criteria: MedicalRecordRepository(session).iter_for_analysis(
+        criteria=criteria
+    )
+
+# Analysis name to (accumulator class, source of its rows)
+ANALYSES = {
+    "patients": (DemographicsAccumulator, _patients),
+    "appointments": (AppointmentPatternsAccumulator, _appointments),
+    "medical_records": (MedicalConditionsAccumulator, _medical_records),
+}
+
+def new_accumulator(analysis, today=None):
+    """
+    Empty accumulator of an analysis
+    
+    Args:
+        analysis: "patients", "appointments" or "medical_records"
+        today: Date ages are computed at for "patients" (defaults to today)
+        
+    Returns:
+        Accumulator with update, merge and finalize methods
+    """
+    accumulator_class, _ = ANALYSES[analysis]
+    if accumulator_class is DemographicsAccumulator:
+        return accumulator_class(today)
+    return accumulator_class()
+
+def create_analysis_engine(database, sqlite_profile=None):
+    """
+    Engine for the database config section, as used by the workers
+    
+    Args:
+        database: The "database" config section
+        sqlite_profile: The "sqlite" config section (None for no PRAGMAs)
+        
+    Returns:
+        SQLAlchemy engine
+    """
+    engine = create_engine(database["url"], **engine_options(database))
+    if sqlite_profile and sqlite_profile.get("enabled", True):
+        apply_sqlite_profile(engine, sqlite_profile)
+    return engine
+
+def key_ranges(low, high, count):
+    """
+    Split the primary keys low..high into at most count half-open ranges
+    
+    Args:
+        low: Smallest key
+        high: Largest key
+        count: Number of ranges wanted
+        
+    Returns:
+        List of (start, stop) pairs covering low..high in order
+    """
+    span = high - low + 1
+    count = max(1, min(count, span))
+    bounds = [low + span * i // count for i in range(count + 1)]
+    return list(zip(bounds, bounds[1:]))
+
+# The worker process's session, opened by _init_worker
+_worker_session = None
+
+def _init_worker(database, sqlite_profile):
+    """Open the worker process's engine and session"""
+    global _worker_session
+    engine = create_analysis_engine(database, sqlite_profile)
+    _worker_session = sessionmaker(bind=engine)()
+
+def _analyze_range(analysis, accumulator, start, stop):
+    """Fold the rows with start <= primary key < stop into accumulator and return it"""
+    _, source = ANALYSES[analysis]
+    try:
+        primary_key, iterate = source(_worker_session)
+        return accumulator.update(iterate([primary_key >= start, primary_key < stop]))
+    finally:
+        # Give the connection back between ranges; the session is reused
+        _worker_session.close()
+
+def analyze_in_parallel(analysis, database, sqlite_profile=None, workers=None, chunks_per_worker=4,
+                        today=None):
+    """
+    Run an analysis over the whole table in worker processes
+    
+    Args:
+        analysis: "patients", "appointments" or "medical_records"
+        database: The "database" config section (its url must not be an
+                  in-memory SQLite database)
+        sqlite_profile: The "sqlite" config section (None for no PRAGMAs)
+        workers: Number of worker processes (defaults to the CPU count)
+        chunks_per_worker: Key ranges per worker, so that a worker done
+                           early picks up another range
+        today: Date ages are computed at for "patients" (defaults to today)
+        
+    Returns:
+        The analysis result dictionary, as from the single-process function
+    """
+    if analysis not in ANALYSES:
+        raise ValueError(f"Unknown analysis: {analysis}")
+    url = make_url(database["url"])
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        raise ValueError("Parallel analysis needs a database the worker processes can open, not in-memory SQLite")
+    
+    _, source = ANALYSES[analysis]
+    accumulator = new_accumulator(analysis, today)
+    
+    engine = create_analysis_engine(database, sqlite_profile)
+    try:
+        with sessionmaker(bind=engine)() as session:
+            primary_key, _ = source(session)
+            low, high = session.execute(select(func.min(primary_key), func.max(primary_key))).one()
+    finally:
+        engine.dispose()
+    if low is None:
+        return accumulator.finalize()
+    
+    workers = workers or os.cpu_count() or 1
+    ranges = key_ranges(low, high, workers * chunks_per_worker)
+    logger.info(f"Analysing {analysis} in {len(ranges)} key ranges on {workers} processes")
+    
+    # Empty accumulators go out, filled ones come back in range order
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(database, sqlite_profile)) as executor:
+        starts, stops = zip(*ranges)
+        empty = new_accumulator(analysis, today)
+        for partial in executor.map(_analyze_range, repeat(analysis), repeat(empty), starts, stops):
+            accumulator.merge(partial)
+    
+    return accumulator.finalize()
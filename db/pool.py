@@ -0,0 +1,111 @@
+"""
+Connection pool with checkout telemetry
+
+MonitoredQueuePool is SQLAlchemy's QueuePool plus counters for checkouts,
+the time callers spent waiting for a connection and checkout timeouts.
+pool_stats() reports them together with the pool's own occupancy
+figures, and start_pool_stats_logger() samples them into the log.
+"""
+import logging
+import threading
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+
+logger = logging.getLogger(__name__)
+
+class MonitoredQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.connects = 0
+    
+    def _create_connection(self):
+        with self._stats_lock:
+            self.connects += 1
+        return super()._create_connection()
+    
+    def connect(self):
+        """Check out a connection, timing the wait (including pre-ping and connect)"""
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with self._stats_lock:
+                self.checkouts += 1
+                self.timeouts += timed_out
+                self.total_wait += waited
+                self.max_wait = max(self.max_wait, waited)
+
+def pool_stats(engine):
+    """
+    Current pool occupancy and, for a MonitoredQueuePool, checkout telemetry
+    
+    Args:
+        engine: SQLAlchemy engine
+        
+    Returns:
+        Dictionary of statistics; wait times are in milliseconds
+    """
+    pool = engine.pool
+    stats = {"pool": type(pool).__name__}
+    
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow,
+        })
+    
+    if isinstance(pool, MonitoredQueuePool):
+        with pool._stats_lock:
+            stats.update({
+                "checkouts": pool.checkouts,
+                "timeouts": pool.timeouts,
+                "connects": pool.connects,
+                "avg_wait_ms": pool.total_wait / pool.checkouts * 1000 if pool.checkouts else 0.0,
+                "max_wait_ms": pool.max_wait * 1000,
+            })
+    
+    return stats
+
+def format_pool_stats(stats):
+    """One-line summary of pool_stats() output"""
+    return ", ".join(
+        f"{name}={value:.2f}" if isinstance(value, float) else f"{name}={value}"
+        for name, value in stats.items()
+    )
+
+def start_pool_stats_logger(engine, interval):
+    """
+    Log pool_stats() every interval seconds from a daemon thread
+    
+    Args:
+        engine: SQLAlchemy engine
+        interval: Seconds between samples
+        
+    Returns:
+        threading.Event that stops the logger when set
+    """
+    stop = threading.Event()
+    
+    def sample():
+        while not stop.wait(interval):
+            logger.info(f"Connection pool: {format_pool_stats(pool_stats(engine))}")
+    
+    threading.Thread(target=sample, name="pool-stats", daemon=True).start()
+    return stop
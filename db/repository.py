@@ -1,26 +1,331 @@
 """
 Repository pattern implementation for database access
 """
-from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.orm import Session
+from collections import defaultdict
+from collections.abc import Mapping
+from datetime import date, datetime
+from itertools import chain, islice
+from sqlalchemy import (
+    DateTime, Float, Integer, String, and_, event, exists, func, insert, inspect, literal, or_, select, text, union, update
+)
+from sqlalchemy.exc import DBAPIError, IntegrityError, SQLAlchemyError
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session, raiseload, selectinload
+from sqlalchemy.sql.expression import FunctionElement
+from db.cache import EntityCache, restore, snapshot
+import base64
+import json
 import logging
+import re
 
 logger = logging.getLogger(__name__)
 
+# Longest appointment the overlap checks look back for, in minutes
+MAX_APPOINTMENT_MINUTES = 24 * 60
+
+class minutes_after(FunctionElement):
+    """SQL expression for a timestamp plus a number of minutes"""
+    type = DateTime()
+    name = 'minutes_after'
+    inherit_cache = True
+
+@compiles(minutes_after)
+def _compile_minutes_after(element, compiler, **kw):
+    timestamp, minutes = list(element.clauses)
+    return f"({compiler.process(timestamp, **kw)} + {compiler.process(minutes, **kw)} * INTERVAL '1 minute')"
+
+@compiles(minutes_after, 'sqlite')
+def _compile_minutes_after_sqlite(element, compiler, **kw):
+    timestamp, minutes = list(element.clauses)
+    return f"datetime({compiler.process(timestamp, **kw)}, '+' || {compiler.process(minutes, **kw)} || ' minutes')"
+
+@compiles(minutes_after, 'mysql')
+def _compile_minutes_after_mysql(element, compiler, **kw):
+    timestamp, minutes = list(element.clauses)
+    return f"DATE_ADD({compiler.process(timestamp, **kw)}, INTERVAL {compiler.process(minutes, **kw)} MINUTE)"
+
+# Regex syntax that means the same to Python's re and PostgreSQL's regex
+# flavour: literals, escaped punctuation, plain bracket expressions, plain
+# groups, alternation and repetition. Shorthand escapes (\b, \d, \w, ...),
+# (?...) extensions and $ (Python's also matches before a final newline)
+# differ, so patterns using them are not pushed down.
+_PORTABLE_REGEX = re.compile(r"""
+    (?:
+        \\[^0-9A-Za-z\s]                # escaped punctuation
+      | \[\^?\]?[^\]\[\\]*\]            # bracket expression without escapes or [: :] classes
+      | \{\d+(?:,\d*)?\}\??             # bounded repetition
+      | [*+?]\??                        # repetition
+      | \((?!\?)                        # plain group
+      | [)|.^]
+      | [^\\\[\]{}()*+?|.^$]            # literal character
+    )*
+""", re.VERBOSE)
+
+def _chunked(iterable, size):
+    """Yield lists of up to size items from iterable"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+class UnitOfWork:
+    """
+    Transaction scope shared by every repository on a session
+    
+    Inside the scope repository writes are not committed one by one: creates
+    are flushed so generated keys are available, updates and deletes are
+    left for the session to flush, and everything is committed once when the
+    outermost scope exits. Any error, raised out of the scope or reported by
+    a repository method and caught by the caller, rolls the whole scope
+    back. Outside a scope repositories keep committing each write.
+    
+    On a RoutingSession the scope's reads go to the primary as well, so a
+    check such as a booking conflict never reads a lagging replica before
+    writing. Pass primary=False for read-only scopes that may use the replica.
+    
+    Usage:
+        with UnitOfWork(session):
+            record = record_repo.create(record)
+            prescription_repo.create(prescription)
+    """
+    
+    DEPTH_KEY = "unit_of_work_depth"
+    FAILED_KEY = "unit_of_work_failed"
+    
+    def __init__(self, session: Session, primary=True):
+        self.session = session
+        self.primary = primary
+    
+    @classmethod
+    def active(cls, session):
+        """Whether a unit of work owns the session's transaction"""
+        return session.info.get(cls.DEPTH_KEY, 0) > 0
+    
+    @classmethod
+    def mark_failed(cls, session):
+        """Make the active unit of work roll back instead of committing"""
+        session.info[cls.FAILED_KEY] = True
+    
+    def _enter(self):
+        if self.primary and hasattr(self.session, "use_primary"):
+            self.session.use_primary()
+        info = self.session.info
+        info[self.DEPTH_KEY] = info.get(self.DEPTH_KEY, 0) + 1
+        return self
+    
+    def _leave(self, exc_type):
+        """
+        Close the scope's bookkeeping
+        
+        Returns:
+            None for a nested scope, otherwise "rollback" or "commit"
+        """
+        info = self.session.info
+        info[self.DEPTH_KEY] -= 1
+        if exc_type is not None:
+            info[self.FAILED_KEY] = True
+        if info[self.DEPTH_KEY] > 0:
+            # Nested scope: the outermost one commits or rolls back
+            return None
+        
+        failed = info.pop(self.FAILED_KEY, False)
+        del info[self.DEPTH_KEY]
+        return "rollback" if failed else "commit"
+    
+    def __enter__(self):
+        return self._enter()
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        outcome = self._leave(exc_type)
+        if outcome is None:
+            return False
+        if outcome == "rollback":
+            self.session.rollback()
+            return False
+        
+        try:
+            self.session.commit()
+        except SQLAlchemyError as e:
+            self.session.rollback()
+            logger.error(f"Error committing unit of work: {e}")
+            raise
+        return False
+
+STRICT_LOADING_KEY = "strict_loading"
+
+def strict_loading(session, enabled=True):
+    """
+    Make lazy relationship loads on a session raise instead of querying
+    
+    With strict loading every ORM query on the session gets
+    raiseload("*", sql_only=True): a relationship that is not loaded by
+    the query's own options (selectinload and friends) raises
+    InvalidRequestError when it would need SQL, so an N+1 loop fails on
+    its first iteration. Loads that the identity map can answer, such as a
+    many-to-one whose target is already in the session, still work.
+    
+    Args:
+        session: SQLAlchemy session
+        enabled: False turns strict loading back off for later queries
+    """
+    session.info[STRICT_LOADING_KEY] = enabled
+
+@event.listens_for(Session, "do_orm_execute")
+def _apply_strict_loading(orm_execute_state):
+    if (
+        orm_execute_state.is_select
+        and not orm_execute_state.is_column_load
+        and orm_execute_state.session.info.get(STRICT_LOADING_KEY)
+    ):
+        orm_execute_state.statement = orm_execute_state.statement.options(raiseload("*", sql_only=True))
+
+# session.info key of the cache entries read inside a UnitOfWork, put in
+# the cache once its transaction commits
+CACHE_PENDING_KEY = "entity_cache_pending"
+
+@event.listens_for(Session, "after_flush")
+def _drop_flushed_cache_entries(session, flush_context):
+    pending = session.info.get(CACHE_PENDING_KEY)
+    if pending:
+        written = {id(obj) for obj in chain(session.dirty, session.deleted)}
+        for key in [key for key, (_, _, entity) in pending.items() if id(entity) in written]:
+            del pending[key]
+
+@event.listens_for(Session, "after_commit")
+def _put_committed_cache_entries(session):
+    for key, (cache, value, _) in session.info.pop(CACHE_PENDING_KEY, {}).items():
+        cache.put(key, value)
+
+@event.listens_for(Session, "after_transaction_end")
+def _drop_uncommitted_cache_entries(session, transaction):
+    # Rolled back or closed without a commit
+    if transaction.parent is None:
+        session.info.pop(CACHE_PENDING_KEY, None)
+
 class BaseRepository:
     """Base repository with common CRUD operations"""
     
+    # Optional process-level EntityCache behind get_by_id and get_by_ids,
+    # set per repository class by configure_entity_cache
+    cache = None
+    
     def __init__(self, session: Session, model_class):
         self.session = session
         self.model_class = model_class
     
+    def unit_of_work(self):
+        """Start a UnitOfWork on this repository's session"""
+        return UnitOfWork(self.session)
+    
+    def _commit(self, flush=True):
+        """Commit, or only flush (if asked) when a UnitOfWork owns the transaction"""
+        if not UnitOfWork.active(self.session):
+            self.session.commit()
+        elif flush:
+            self.session.flush()
+    
+    def _rollback(self):
+        """Roll back, or leave it to the UnitOfWork that owns the transaction"""
+        if UnitOfWork.active(self.session):
+            UnitOfWork.mark_failed(self.session)
+        else:
+            self.session.rollback()
+    
+    def _cache_key(self, id):
+        """Cache key of an entity ID, scoped to the session's database"""
+        return (self.session.get_bind(), self.model_class, id)
+    
+    def _cache_store(self, key, value, entity):
+        """Put a value in the cache now, or when the UnitOfWork's transaction commits"""
+        if not UnitOfWork.active(self.session):
+            self.cache.put(key, value)
+            return
+        # Values read inside the scope may include its own uncommitted writes
+        self.session.info.setdefault(CACHE_PENDING_KEY, {})[key] = (self.cache, value, entity)
+    
+    def _cache_put(self, entity):
+        """
+        Store a snapshot of a freshly loaded entity in the cache
+        
+        Returns:
+            True if the entity was stored (or will be when the UnitOfWork commits)
+        """
+        # Uncommitted values must not leak to other sessions
+        state = inspect(entity)
+        if state.modified or state.pending or state.deleted:
+            return False
+        cached = snapshot(entity)
+        if cached is None:
+            return False
+        self._cache_store(self._cache_key(state.identity[0]), cached, entity)
+        return True
+    
+    def _cache_invalidate_key(self, key):
+        """Drop a cache entry, including one waiting for the UnitOfWork to commit"""
+        self.session.info.get(CACHE_PENDING_KEY, {}).pop(key, None)
+        self.cache.invalidate(key)
+    
+    def _cache_invalidate(self, entity):
+        """Drop a written entity from the cache"""
+        if self.cache is not None:
+            id = inspect(self.model_class).primary_key_from_instance(entity)[0]
+            self._cache_invalidate_key(self._cache_key(id))
+    
     def get_by_id(self, id):
-        """Get entity by ID"""
-        return self.session.query(self.model_class).get(id)
+        """Get entity by ID, through the entity cache when one is configured"""
+        if self.cache is None or id is None:
+            return self.session.query(self.model_class).get(id)
+        
+        cached = self.cache.get(self._cache_key(id))
+        if cached is not None:
+            return restore(self.session, cached)
+        
+        entity = self.session.query(self.model_class).get(id)
+        if entity is not None:
+            self._cache_put(entity)
+        return entity
+    
+    def get_by_ids(self, ids, chunk_size=500):
+        """
+        Get entities for a collection of IDs in as few queries as possible
+        
+        Args:
+            ids: Iterable of primary key values (duplicates and None are ignored)
+            chunk_size: Maximum number of IDs per IN-list query
+            
+        Returns:
+            Dictionary mapping each found ID to its entity
+        """
+        primary_key = inspect(self.model_class).primary_key[0]
+        unique_ids = list({id for id in ids if id is not None})
+        
+        entities = {}
+        if self.cache is not None:
+            # Only the IDs missing from the cache go to the database
+            missing = []
+            for id in unique_ids:
+                cached = self.cache.get(self._cache_key(id))
+                if cached is None:
+                    missing.append(id)
+                else:
+                    entities[id] = restore(self.session, cached)
+            unique_ids = missing
+        
+        for start in range(0, len(unique_ids), chunk_size):
+            chunk = unique_ids[start:start + chunk_size]
+            query = self.session.query(self.model_class).filter(primary_key.in_(chunk))
+            for entity in query:
+                entities[inspect(entity).identity[0]] = entity
+                if self.cache is not None:
+                    self._cache_put(entity)
+        
+        return entities
     
-    def get_all(self, limit=None, offset=None):
-        """Get all entities with optional pagination"""
-        query = self.session.query(self.model_class)
+    def get_all(self, limit=None, offset=None, options=()):
+        """Get all entities with optional pagination and loader options (e.g. selectinload)"""
+        query = self.session.query(self.model_class).options(*options)
         
         if offset is not None:
             query = query.offset(offset)
@@ -30,14 +335,146 @@ class BaseRepository:
             
         return query.all()
     
+    def iter_all(self, batch_size=1000, criteria=(), options=()):
+        """
+        Stream every entity in primary key order without holding them all
+        
+        Rows are fetched batch_size at a time (a server-side cursor on
+        PostgreSQL) and each batch is expunged from the session before it is
+        yielded, so memory use depends on the batch size rather than the
+        table size. The yielded entities are detached: their column values
+        are loaded, but lazy relationships cannot be followed. Relationships
+        needed while streaming are loaded per batch with options such as
+        selectinload, and the related objects are detached with the batch.
+        
+        Args:
+            batch_size: Number of rows fetched and held at a time
+            criteria: Optional SQL filter expressions
+            options: Optional loader options applied to the query
+            
+        Yields:
+            Detached entities
+        """
+        mapper = inspect(self.model_class)
+        primary_key = getattr(self.model_class, mapper.get_property_by_column(mapper.primary_key[0]).key)
+        query = (
+            select(self.model_class)
+            .where(*criteria)
+            .order_by(primary_key)
+            .options(*options)
+            .execution_options(yield_per=batch_size)
+        )
+        
+        for batch in self.session.execute(query).scalars().partitions():
+            for entity in batch:
+                self._expunge_loaded(entity)
+            yield from batch
+    
+    def _expunge_loaded(self, entity):
+        """Expunge an entity and the related objects already loaded into it"""
+        state = inspect(entity)
+        for relationship in state.mapper.relationships:
+            if relationship.key not in state.dict:
+                continue
+            related = state.dict[relationship.key]
+            for obj in (related if relationship.uselist else [related]):
+                if obj is not None and obj in self.session:
+                    self.session.expunge(obj)
+        self.session.expunge(entity)
+    
+    def get_page(self, limit=50, after=None, order_by=None, criteria=(), columns=None):
+        """
+        Get one page of entities using keyset (seek) pagination
+        
+        Each page continues after the sort key of the previous page's last
+        row instead of skipping rows with OFFSET, so a deep page costs the
+        same index seek as the first one and rows inserted in the meantime
+        do not shift the pages.
+        
+        Args:
+            limit: Maximum number of entities on the page
+            after: Cursor returned with the previous page, or None for the first page
+            order_by: Name of a non-null sortable column attribute (defaults to
+                      the primary key); ties are broken by the primary key
+            criteria: Optional SQL filter expressions applied to every page
+            columns: Optional attribute names to select instead of whole
+                     entities (e.g. the repository's listing_columns); they
+                     must include the primary key and order_by
+            
+        Returns:
+            Tuple of (list of entities, or rows with the requested columns,
+            cursor for the next page or None if this is the last page)
+            
+        Raises:
+            ValueError: If the cursor is malformed or was issued for another
+                        ordering, or columns leave out a sort key
+        """
+        mapper = inspect(self.model_class)
+        primary_key = getattr(self.model_class, mapper.get_property_by_column(mapper.primary_key[0]).key)
+        order_by = order_by or primary_key.key
+        keys = [primary_key] if order_by == primary_key.key else [getattr(self.model_class, order_by), primary_key]
+        
+        if columns:
+            missing = [key.key for key in keys if key.key not in columns]
+            if missing:
+                raise ValueError(f"Paged columns must include the sort keys: {', '.join(missing)}")
+            # Projection: plain rows, no entity construction or identity map
+            query = select(*[getattr(self.model_class, name) for name in columns]).where(*criteria)
+        else:
+            query = select(self.model_class).where(*criteria)
+        
+        if after is not None:
+            values = self._decode_cursor(after, order_by, keys)
+            if len(keys) == 1:
+                query = query.where(primary_key > values[0])
+            else:
+                query = query.where(or_(
+                    keys[0] > values[0],
+                    and_(keys[0] == values[0], primary_key > values[1])
+                ))
+        
+        # One extra row tells whether another page follows
+        result = self.session.execute(query.order_by(*keys).limit(limit + 1))
+        entities = list(result if columns else result.scalars())
+        if len(entities) <= limit:
+            return entities, None
+        
+        entities = entities[:limit]
+        return entities, self._encode_cursor(order_by, [getattr(entities[-1], key.key) for key in keys])
+    
+    def _encode_cursor(self, order_by, values):
+        """Opaque URL-safe token for a page position"""
+        values = [value.isoformat() if isinstance(value, (date, datetime)) else value for value in values]
+        payload = json.dumps({"by": order_by, "key": values}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+    
+    def _decode_cursor(self, cursor, order_by, keys):
+        """Sort key values stored in a cursor from _encode_cursor"""
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+            values = payload["key"]
+            if payload["by"] != order_by or len(values) != len(keys):
+                raise ValueError("cursor was issued for another ordering")
+            
+            decoded = []
+            for key, value in zip(keys, values):
+                if isinstance(key.type, DateTime):
+                    value = datetime.fromisoformat(value)
+                elif key.type.python_type is date:
+                    value = date.fromisoformat(value)
+                decoded.append(value)
+            return decoded
+        except (ValueError, TypeError, KeyError, NotImplementedError) as e:
+            raise ValueError(f"Invalid cursor: {cursor}") from e
+    
     def create(self, entity):
         """Create a new entity"""
         try:
             self.session.add(entity)
-            self.session.commit()
+            self._commit()
             return entity
         except SQLAlchemyError as e:
-            self.session.rollback()
+            self._rollback()
             logger.error(f"Error creating entity: {e}")
             raise
     
@@ -45,23 +482,27 @@ class BaseRepository:
         """Update an existing entity"""
         try:
             self.session.merge(entity)
-            self.session.commit()
+            self._commit(flush=False)
             return entity
         except SQLAlchemyError as e:
-            self.session.rollback()
+            self._rollback()
             logger.error(f"Error updating entity: {e}")
             raise
+        finally:
+            self._cache_invalidate(entity)
     
     def delete(self, entity):
         """Delete an entity"""
         try:
             self.session.delete(entity)
-            self.session.commit()
+            self._commit(flush=False)
             return True
         except SQLAlchemyError as e:
-            self.session.rollback()
+            self._rollback()
             logger.error(f"Error deleting entity: {e}")
             raise
+        finally:
+            self._cache_invalidate(entity)
     
     def delete_by_id(self, id):
         """Delete entity by ID"""
@@ -69,19 +510,330 @@ class BaseRepository:
         if entity:
             return self.delete(entity)
         return False
+    
+    def _to_mapping(self, entity):
+        """Split a mapping or model instance into (model class, column values)"""
+        if isinstance(entity, Mapping):
+            return self.model_class, dict(entity)
+        
+        model = type(entity)
+        if not issubclass(model, self.model_class):
+            raise TypeError(f"Expected {self.model_class.__name__}, got {model.__name__}")
+        
+        # Only the attributes that were set, so column defaults still apply
+        state = inspect(entity)
+        return model, {
+            attr.key: state.dict[attr.key]
+            for attr in inspect(model).column_attrs if attr.key in state.dict
+        }
+    
+    def _insert_rows(self, model, rows):
+        """Insert column value mappings of one model class and return their keys in order"""
+        mapper = inspect(model)
+        key_name = mapper.get_property_by_column(mapper.primary_key[0]).key
+        key_attr = getattr(model, key_name)
+        
+        if self.session.get_bind().dialect.insert_executemany_returning:
+            # ORM bulk INSERT: executemany batches per table, base table first
+            result = self.session.execute(
+                insert(model).returning(key_attr, sort_by_parameter_order=True), rows
+            )
+            return list(result.scalars())
+        
+        # Without RETURNING the unit of work fetches each generated key itself
+        entities = [model(**values) for values in rows]
+        self.session.add_all(entities)
+        self.session.flush()
+        return [getattr(entity, key_name) for entity in entities]
+    
+    def create_many(self, entities, chunk_size=1000):
+        """
+        Insert many entities with one transaction per chunk
+        
+        Under joined inheritance the rows go into every table of the
+        hierarchy (e.g. persons then patients), and mixed subclasses such as
+        Staff and Doctor instances are inserted into their own tables.
+        
+        Args:
+            entities: Iterable of model instances or mappings of attribute
+                      names to values (mappings use this repository's model)
+            chunk_size: Number of entities per insert batch and transaction
+                        (inside a UnitOfWork all chunks share its transaction)
+            
+        Returns:
+            List of the generated primary keys, in input order. Model
+            instances are not added to the session.
+        """
+        keys = []
+        
+        for chunk in _chunked(entities, chunk_size):
+            groups = {}
+            for position, entity in enumerate(chunk):
+                model, values = self._to_mapping(entity)
+                groups.setdefault(model, []).append((position, values))
+            
+            chunk_keys = [None] * len(chunk)
+            try:
+                for model, rows in groups.items():
+                    new_keys = self._insert_rows(model, [values for _, values in rows])
+                    for (position, _), key in zip(rows, new_keys):
+                        chunk_keys[position] = key
+                self._commit()
+            except SQLAlchemyError as e:
+                self._rollback()
+                logger.error(f"Error creating entities: {e}")
+                raise
+            
+            keys.extend(chunk_keys)
+        
+        return keys
+    
+    def bulk_upsert(self, entities, key=None, chunk_size=1000):
+        """
+        Insert or update many entities with one transaction per chunk
+        
+        Entities whose key matches an existing row update that row (only the
+        given attributes change); the rest are inserted as in create_many.
+        
+        Args:
+            entities: Iterable of model instances or mappings of attribute
+                      names to values
+            key: Unique attribute identifying existing rows, e.g. "patient_id"
+                 (defaults to the primary key)
+            chunk_size: Number of entities per batch and transaction
+                        (inside a UnitOfWork all chunks share its transaction)
+            
+        Returns:
+            List of the primary keys of the upserted rows, in input order
+        """
+        from db.models import Appointment, log_appointment_updates
+        
+        mapper = inspect(self.model_class)
+        primary_key = mapper.get_property_by_column(mapper.primary_key[0]).key
+        key = key or primary_key
+        key_column = getattr(self.model_class, key)
+        keys = []
+        
+        for chunk in _chunked(entities, chunk_size):
+            rows = [self._to_mapping(entity) for entity in chunk]
+            
+            # Primary keys of the rows that already exist, by key value
+            lookup = list({values[key] for _, values in rows if values.get(key) is not None})
+            existing = {}
+            for batch in _chunked(lookup, 500):
+                existing.update(self.session.execute(
+                    select(key_column, getattr(self.model_class, primary_key)).where(key_column.in_(batch))
+                ).all())
+            
+            # Later entries for the same key are merged into the first
+            updates, inserts, positions = {}, {}, []
+            for model, values in rows:
+                value = values.get(key)
+                if value in existing:
+                    values[primary_key] = existing[value]
+                    merged = updates.setdefault((model, value), {})
+                elif value is not None:
+                    merged = inserts.setdefault((model, value), {})
+                else:
+                    merged = inserts.setdefault((model, len(positions)), {})
+                merged.update(values)
+                positions.append(merged)
+            
+            try:
+                by_model = defaultdict(list)
+                for (model, _), values in updates.items():
+                    by_model[model].append(values)
+                for model, values in by_model.items():
+                    if model is Appointment:
+                        # The bulk UPDATE skips the mapper events that log appointment changes
+                        log_appointment_updates(self.session.connection(), values)
+                    # ORM bulk UPDATE by primary key, per table of the hierarchy
+                    self.session.execute(update(model), values)
+                    if self.cache is not None:
+                        for row in values:
+                            self._cache_invalidate_key(self._cache_key(row[primary_key]))
+                
+                by_model = defaultdict(list)
+                for (model, _), values in inserts.items():
+                    by_model[model].append(values)
+                for model, values in by_model.items():
+                    for row, new_key in zip(values, self._insert_rows(model, values)):
+                        row[primary_key] = new_key
+                
+                self._commit()
+            except SQLAlchemyError as e:
+                self._rollback()
+                logger.error(f"Error upserting entities: {e}")
+                raise
+            
+            keys.extend(values[primary_key] for values in positions)
+        
+        return keys
+    
+    def iter_regex_search(self, pattern, fields, batch_size=500):
+        """
+        Stream the entities with a field matching a regular expression
+        
+        When every field is a text column the pattern is pushed into the
+        query first, so only candidate rows leave the database: SQLite's
+        REGEXP is Python's re, and PostgreSQL's ~* is used for ASCII patterns
+        whose syntax means the same in both flavours (anything else is
+        scanned). Every candidate is then rechecked with Python's re, which
+        keeps the results identical to algorithms.search.search_by_regex.
+        Invalid patterns are searched as plain substrings, through ILIKE for
+        ASCII patterns (LIKE only folds ASCII case).
+        
+        Args:
+            pattern: Regular expression pattern, matched case-insensitively
+            fields: List of field names to search in
+            batch_size: Number of rows fetched from the database at a time
+            
+        Yields:
+            Matching entities in primary key order
+        """
+        from algorithms.search import iter_regex_matches
+        
+        model = self.model_class
+        columns = [
+            getattr(model, field).property.columns[0]
+            for field in fields if hasattr(model, field)
+        ]
+        primary_key = inspect(model).primary_key[0]
+        query = self.session.query(model).order_by(primary_key)
+        
+        try:
+            re.compile(pattern)
+            is_regex = True
+        except re.error:
+            is_regex = False
+        
+        dialect = self.session.get_bind().dialect.name
+        condition = None
+        # Pushing down is only safe when no field needs str() of a non-text value
+        if columns and all(isinstance(column.type, String) for column in columns):
+            if not is_regex:
+                if pattern.isascii():
+                    condition = or_(*[column.icontains(pattern, autoescape=True) for column in columns])
+            elif dialect == "sqlite":
+                # SQLite's REGEXP is Python's re, so inline flags behave the same
+                condition = or_(*[column.regexp_match(f"(?i){pattern}") for column in columns])
+            elif dialect == "postgresql" and pattern.isascii() and _PORTABLE_REGEX.fullmatch(pattern):
+                condition = or_(*[column.regexp_match(pattern, flags="i") for column in columns])
+        
+        if condition is None:
+            rows = query.yield_per(batch_size)
+        elif dialect == "postgresql" and is_regex:
+            rows = self._iter_pushed_down(query, condition, primary_key, batch_size)
+        else:
+            rows = query.filter(condition).yield_per(batch_size)
+        
+        yield from iter_regex_matches(rows, pattern, fields)
+    
+    def _iter_pushed_down(self, query, condition, primary_key, batch_size):
+        """
+        Rows of a query narrowed by a database regex, scanning instead if the database rejects it
+        
+        Pages are fetched by primary key, each inside a savepoint, so a regex
+        error (raised when rows are read) leaves the caller's transaction
+        usable and the scan resumes after the last row already returned.
+        """
+        key = inspect(self.model_class).get_property_by_column(primary_key).key
+        last = None
+        while True:
+            page = query.filter(condition)
+            if last is not None:
+                page = page.filter(primary_key > last)
+            try:
+                with self.session.begin_nested():
+                    rows = page.limit(batch_size).all()
+            except DBAPIError as e:
+                logger.warning(f"Regex pushdown failed, scanning instead: {e}")
+                if last is not None:
+                    query = query.filter(primary_key > last)
+                yield from query.yield_per(batch_size)
+                return
+            
+            yield from rows
+            if len(rows) < batch_size:
+                return
+            last = getattr(rows[-1], key)
+    
+    def _ranked_search(self, search_term, search_table):
+        """
+        Search the model through its indexed search backend, best matches first
+        
+        Args:
+            search_term: Text to look for as a substring of any searched field
+            search_table: Name of the search index in db.search_index
+            
+        Returns:
+            List of matching entities, or None when no index can serve the term
+        """
+        from db.search_index import MIN_SEARCH_TERM_LENGTH, SEARCH_INDEXES, search_backend
+        
+        if len(search_term) < MIN_SEARCH_TERM_LENGTH:
+            return None
+        
+        # Ask the connection the query will run on (a replica under RoutingSession)
+        connection = self.session.connection(bind_arguments={"mapper": inspect(self.model_class)})
+        backend = search_backend(connection, search_table)
+        model = self.model_class
+        
+        if backend == "sqlite":
+            # FTS5 phrase query: the trigram tokenizer matches it as a case-insensitive substring
+            phrase = '"' + search_term.replace('"', '""') + '"'
+            matches = text(
+                f"SELECT rowid AS id, rank FROM {search_table} WHERE {search_table} MATCH :phrase"
+            ).columns(id=Integer, rank=Float).bindparams(phrase=phrase).subquery()
+            
+            return self.session.query(model).join(
+                matches, matches.c.id == model.id
+            ).order_by(matches.c.rank, model.id).all()
+        
+        if backend == "postgresql":
+            search_pattern = f"%{search_term}%"
+            columns = [
+                getattr(model, column).property.columns[0]
+                for column in SEARCH_INDEXES[search_table]["columns"]
+            ]
+            
+            # One ILIKE branch per table, so each can use its trigram indexes
+            columns_by_table = defaultdict(list)
+            for column in columns:
+                columns_by_table[column.table].append(column)
+            matching_ids = union(*[
+                select(table.c.id).where(or_(*[column.ilike(search_pattern) for column in table_columns]))
+                for table, table_columns in columns_by_table.items()
+            ])
+            similarity = func.greatest(*[
+                func.coalesce(func.similarity(column, search_term), 0) for column in columns
+            ])
+            
+            return self.session.query(model).filter(
+                model.id.in_(matching_ids)
+            ).order_by(similarity.desc(), model.id).all()
+        
+        return None
 
 class PatientRepository(BaseRepository):
     """Repository for Patient entity"""
     
+    # Columns shown in patient listings, for get_page(columns=...)
+    listing_columns = ("id", "patient_id", "first_name", "last_name", "dob", "email")
+    
     def __init__(self, session):
         from db.models import Patient
         super().__init__(session, Patient)
     
     def search(self, search_term):
-        """Search patients by name, email, or patient ID"""
+        """Search patients by name, email, or patient ID, best matches first"""
         from db.models import Patient
-        search_pattern = f"%{search_term}%"
         
+        results = self._ranked_search(search_term, "patient_search")
+        if results is not None:
+            return results
+        
+        search_pattern = f"%{search_term}%"
         return self.session.query(Patient).filter(
             (Patient.first_name.ilike(search_pattern)) |
             (Patient.last_name.ilike(search_pattern)) |
@@ -90,22 +842,42 @@ class PatientRepository(BaseRepository):
         ).all()
     
     def get_by_patient_id(self, patient_id):
-        """Get patient by patient_id field"""
+        """Get patient by patient_id field, through the entity cache when one is configured"""
         from db.models import Patient
-        return self.session.query(Patient).filter(Patient.patient_id == patient_id).first()
+        
+        if self.cache is not None:
+            # The cache maps the patient_id to the primary key of the cached entity
+            id = self.cache.get(self._cache_key(("patient_id", patient_id)))
+            if id is not None:
+                patient = self.get_by_id(id)
+                if patient is not None and patient.patient_id == patient_id:
+                    return patient
+        
+        patient = self.session.query(Patient).filter(Patient.patient_id == patient_id).first()
+        # The mapping is only useful while the entity itself is cached
+        if patient is not None and self.cache is not None and self._cache_put(patient):
+            self._cache_store(self._cache_key(("patient_id", patient_id)), patient.id, patient)
+        return patient
 
 class DoctorRepository(BaseRepository):
     """Repository for Doctor entity"""
     
+    # Columns shown in doctor listings, for get_page(columns=...)
+    listing_columns = ("id", "staff_id", "first_name", "last_name", "email", "specialisation", "department")
+    
     def __init__(self, session):
         from db.models import Doctor
         super().__init__(session, Doctor)
     
     def search(self, search_term):
-        """Search doctors by name, email, specialisation, or license number"""
+        """Search doctors by name, email, specialisation, or license number, best matches first"""
         from db.models import Doctor
-        search_pattern = f"%{search_term}%"
         
+        results = self._ranked_search(search_term, "doctor_search")
+        if results is not None:
+            return results
+        
+        search_pattern = f"%{search_term}%"
         return self.session.query(Doctor).filter(
             (Doctor.first_name.ilike(search_pattern)) |
             (Doctor.last_name.ilike(search_pattern)) |
@@ -171,8 +943,8 @@ class AppointmentRepository(BaseRepository):
         
         return query.all()
     
-    def get_by_date_range(self, start_date, end_date):
-        """Get appointments within a date range"""
+    def get_by_date_range(self, start_date, end_date, doctor_ids=None):
+        """Get appointments within a date range, optionally for a set of doctors"""
         from db.models import Appointment
         from datetime import datetime
         
@@ -182,10 +954,197 @@ class AppointmentRepository(BaseRepository):
         if isinstance(end_date, str):
             end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
         
-        return self.session.query(Appointment).filter(
+        query = self.session.query(Appointment).filter(
             Appointment.schedule_time >= datetime.combine(start_date, datetime.min.time()),
             Appointment.schedule_time < datetime.combine(end_date, datetime.max.time())
-        ).all()
+        )
+        
+        if doctor_ids is not None:
+            query = query.filter(Appointment.doctor_id.in_(list(doctor_ids)))
+        
+        return query.all()
+    
+    def get_busy_intervals(self, doctor_id, date, exclude_appointment_id=None):
+        """
+        Get the busy time intervals of a doctor on a specific date
+        
+        Only the schedule columns of non-cancelled appointments are fetched,
+        in a single query, so callers can check conflicts in memory.
+        
+        Args:
+            doctor_id: Doctor ID
+            date: Date to fetch (date or "YYYY-MM-DD" string)
+            exclude_appointment_id: Appointment to leave out (e.g. when rescheduling it)
+            
+        Returns:
+            List of (start, end) tuples sorted by start time
+        """
+        from db.models import Appointment
+        from datetime import datetime, timedelta
+        
+        # If date is a string, convert it to datetime
+        if isinstance(date, str):
+            date = datetime.strptime(date, "%Y-%m-%d").date()
+        
+        query = self.session.query(Appointment.schedule_time, Appointment.duration).filter(
+            Appointment.doctor_id == doctor_id,
+            Appointment.schedule_time >= datetime.combine(date, datetime.min.time()),
+            Appointment.schedule_time < datetime.combine(date, datetime.max.time()),
+            (Appointment.status != "cancelled") | (Appointment.status.is_(None))
+        )
+        
+        if exclude_appointment_id is not None:
+            query = query.filter(Appointment.appointment_id != exclude_appointment_id)
+        
+        return [
+            (schedule_time, schedule_time + timedelta(minutes=duration))
+            for schedule_time, duration in query.order_by(Appointment.schedule_time)
+        ]
+    
+    def overlap_condition(self, doctor_id, start_time, end_time, exclude_appointment_id=None):
+        """
+        Build the SQL condition matching a doctor's bookings that overlap a time range
+        
+        The schedule_time bounds let the (doctor_id, schedule_time) index narrow
+        the scan to appointments that start within MAX_APPOINTMENT_MINUTES of
+        the range; the end time is then computed in SQL for those rows only.
+        """
+        from db.models import Appointment
+        from datetime import timedelta
+        
+        condition = and_(
+            Appointment.doctor_id == doctor_id,
+            Appointment.schedule_time < end_time,
+            Appointment.schedule_time > start_time - timedelta(minutes=MAX_APPOINTMENT_MINUTES),
+            minutes_after(Appointment.schedule_time, Appointment.duration) > start_time,
+            (Appointment.status != "cancelled") | (Appointment.status.is_(None))
+        )
+        
+        if exclude_appointment_id is not None:
+            condition = and_(condition, Appointment.appointment_id != exclude_appointment_id)
+        
+        return condition
+    
+    def has_conflict(self, doctor_id, start_time, duration, exclude_appointment_id=None):
+        """Check with one indexed query whether a doctor has a booking overlapping a slot"""
+        from db.models import Appointment
+        from datetime import timedelta
+        
+        end_time = start_time + timedelta(minutes=duration)
+        condition = self.overlap_condition(doctor_id, start_time, end_time, exclude_appointment_id)
+        
+        return self.session.execute(select(exists().where(condition))).scalar()
+    
+    def create_if_available(self, appointment):
+        """
+        Insert an appointment only if the doctor has no overlapping booking
+        
+        The overlap check and the insert run as a single INSERT ... SELECT
+        WHERE NOT EXISTS statement. On SQLite the write lock is taken before
+        the statement runs so concurrent bookings are serialised; on
+        PostgreSQL the exclusion constraint rejects any booking that races
+        past the check.
+        
+        Args:
+            appointment: Appointment model to insert
+            
+        Returns:
+            The stored appointment, or None if the slot is already taken
+        """
+        from db.models import Appointment
+        from datetime import timedelta
+        
+        columns = ["patient_id", "doctor_id", "schedule_time", "duration", "status", "notes"]
+        if appointment.status is None:
+            appointment.status = "scheduled"
+        
+        end_time = appointment.schedule_time + timedelta(minutes=appointment.duration)
+        condition = self.overlap_condition(appointment.doctor_id, appointment.schedule_time, end_time)
+        
+        values = select(*[
+            literal(getattr(appointment, column), Appointment.__table__.c[column].type).label(column)
+            for column in columns
+        ]).where(~exists().where(condition))
+        
+        statement = insert(Appointment).from_select(columns, values)
+        
+        try:
+            connection = self.session.connection()
+            dialect = connection.dialect
+            
+            # driver_connection is the sqlite3 or aiosqlite connection, which knows if SQLite began a transaction
+            if dialect.name == "sqlite" and not connection.connection.driver_connection.in_transaction:
+                # Take the write lock up front so the check cannot go stale
+                connection.exec_driver_sql("BEGIN IMMEDIATE")
+            
+            if dialect.insert_returning:
+                result = self.session.execute(statement.returning(Appointment.appointment_id))
+                appointment_id = result.scalar()
+            else:
+                result = self.session.execute(statement)
+                appointment_id = result.lastrowid if result.rowcount == 1 else None
+            
+            self._commit()
+        except IntegrityError as e:
+            self._rollback()
+            if getattr(e.orig, "pgcode", None) == "23P01":
+                # Exclusion constraint violation: another booking won the race
+                return None
+            logger.error(f"Error creating entity: {e}")
+            raise
+        except SQLAlchemyError as e:
+            self._rollback()
+            logger.error(f"Error creating entity: {e}")
+            raise
+        
+        if appointment_id is None:
+            return None
+        
+        return self.get_by_id(appointment_id)
+    
+    def iter_schedule_rows(self, start_date, end_date, by="doctor", batch_size=1000):
+        """
+        Stream the schedule of non-cancelled appointments in a date range
+        
+        Rows are ordered by (doctor_id or patient_id, schedule_time) and fetched
+        in batches without loading ORM objects, so a full year of bookings can
+        be scanned in constant memory.
+        
+        Args:
+            start_date: First day of the range (inclusive)
+            end_date: Last day of the range (inclusive)
+            by: Column to order by first, "doctor" or "patient"
+            batch_size: Number of rows fetched per round trip
+            
+        Yields:
+            Rows with appointment_id, patient_id, doctor_id, schedule_time,
+            duration and status attributes
+        """
+        from db.models import Appointment
+        from datetime import datetime
+        
+        # Convert string dates to datetime if needed
+        if isinstance(start_date, str):
+            start_date = datetime.strptime(start_date, "%Y-%m-%d").date()
+        if isinstance(end_date, str):
+            end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
+        
+        group_column = Appointment.patient_id if by == "patient" else Appointment.doctor_id
+        
+        query = self.session.query(
+            Appointment.appointment_id,
+            Appointment.patient_id,
+            Appointment.doctor_id,
+            Appointment.schedule_time,
+            Appointment.duration,
+            Appointment.status
+        ).filter(
+            Appointment.schedule_time >= datetime.combine(start_date, datetime.min.time()),
+            Appointment.schedule_time < datetime.combine(end_date, datetime.max.time()),
+            (Appointment.status != "cancelled") | (Appointment.status.is_(None))
+        ).order_by(group_column, Appointment.schedule_time)
+        
+        yield from query.yield_per(batch_size)
 
 class MedicalRecordRepository(BaseRepository):
     """Repository for PatientMedicalRecord entity"""
@@ -209,6 +1168,26 @@ class MedicalRecordRepository(BaseRepository):
         return self.session.query(PatientMedicalRecord).filter(
             PatientMedicalRecord.diagnosis.ilike(search_pattern)
         ).all()
+    
+    def iter_for_analysis(self, batch_size=1000, criteria=()):
+        """
+        Stream medical records with their lab tests for analysis
+        
+        Lab tests are loaded with one SELECT ... IN per batch of records
+        (selectinload) instead of one lazy SELECT per record.
+        
+        Args:
+            batch_size: Number of records fetched and held at a time
+            criteria: Optional SQL filter expressions
+            
+        Yields:
+            Detached PatientMedicalRecord entities with lab_tests loaded
+        """
+        from db.models import PatientMedicalRecord
+        return self.iter_all(
+            batch_size=batch_size, criteria=criteria,
+            options=[selectinload(PatientMedicalRecord.lab_tests)]
+        )
 
 class PrescriptionRepository(BaseRepository):
     """Repository for Prescription entity"""
@@ -224,13 +1203,16 @@ class PrescriptionRepository(BaseRepository):
             Prescription.record_id == record_id
         ).all()
     
-    def get_active_prescriptions(self, record_id):
-        """Get active prescriptions for a medical record"""
+    def get_active_prescriptions(self, record_id=None):
+        """Get active prescriptions, optionally filtered by record"""
         from db.models import Prescription
-        return self.session.query(Prescription).filter(
-            Prescription.record_id == record_id,
-            Prescription.is_active == True
-        ).all()
+        
+        query = self.session.query(Prescription).filter(Prescription.is_active == True)
+        
+        if record_id:
+            query = query.filter(Prescription.record_id == record_id)
+            
+        return query.all()
 
 class LabTestRepository(BaseRepository):
     """Repository for LabTest entity"""
@@ -257,3 +1239,27 @@ class LabTestRepository(BaseRepository):
             
         return query.all()
 
+def configure_entity_cache(max_size=1024, ttl=300, enabled=True):
+    """
+    Turn the process-level read-through cache for patients and doctors on or off
+    
+    The cache serves PatientRepository.get_by_id / get_by_ids /
+    get_by_patient_id and DoctorRepository.get_by_id / get_by_ids. Entries
+    are dropped by the repositories' update, delete and bulk_upsert paths
+    and expire after ttl seconds, which bounds staleness from writes made
+    by other processes.
+    
+    Args:
+        max_size: Maximum number of entries per repository class
+        ttl: Seconds an entry stays valid, or None for no expiry
+        enabled: False removes the caches
+        
+    Returns:
+        Dictionary mapping repository class names to their EntityCache (empty if disabled)
+    """
+    caches = {}
+    for repository in (PatientRepository, DoctorRepository):
+        repository.cache = EntityCache(max_size=max_size, ttl=ttl) if enabled else None
+        if enabled:
+            caches[repository.__name__] = repository.cache
+    return caches
@@ -0,0 +1,59 @@
+"""
+Session routing reads to a read replica and writes to the primary database
+"""
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import TextClause
+
+def is_write(clause):
+    """Whether a statement may write, so it has to run on the primary"""
+    if clause is None:
+        return False
+    if getattr(clause, "is_dml", False) or isinstance(clause, TextClause):
+        # Textual SQL could be anything
+        return True
+    return getattr(clause, "_for_update_arg", None) is not None
+
+class RoutingSession(Session):
+    """
+    Session that sends ORM reads to a replica engine and writes to the primary
+    
+    Flushes, INSERT/UPDATE/DELETE statements, SELECT ... FOR UPDATE, textual
+    SQL and connection() calls without a mapper go to the primary. Once the
+    session has written anything, or entered a UnitOfWork, it sticks to the
+    primary until it is closed, so reads inside a UnitOfWork (or after a
+    repository write) see the latest data and the session's own writes,
+    whatever the replica lag.
+    
+    Usage:
+        Session = sessionmaker(class_=RoutingSession, primary=engine, replica=replica_engine)
+    """
+    
+    def __init__(self, primary=None, replica=None, **kwargs):
+        bind = kwargs.pop("bind", None)
+        primary = primary or bind
+        super().__init__(bind=primary, **kwargs)
+        self.primary = primary
+        self.replica = replica
+        self.sticky = False
+    
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        """Engine for a statement: the replica for plain reads, the primary otherwise"""
+        if self.primary is None or self.replica is None:
+            return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+        
+        if self._flushing or is_write(clause):
+            self.sticky = True
+            return self.primary
+        
+        if self.sticky or (mapper is None and clause is None):
+            return self.primary
+        
+        return self.replica
+    
+    def use_primary(self):
+        """Send every following statement to the primary until the session is closed"""
+        self.sticky = True
+    
+    def close(self):
+        super().close()
+        self.sticky = False
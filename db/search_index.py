@@ -0,0 +1,208 @@
+"""
+Indexed text search backends for the patient and doctor search
+
+PostgreSQL gets pg_trgm GIN indexes on every searched column. SQLite gets
+an FTS5 trigram table per entity that triggers keep in sync with the
+persons table and the entity's own table. Other databases, or SQLite
+builds without FTS5, fall back to plain ILIKE scans in the repositories.
+"""
+import logging
+import weakref
+
+from sqlalchemy.exc import OperationalError
+
+logger = logging.getLogger(__name__)
+
+# Trigram indexes cannot serve terms shorter than this
+MIN_SEARCH_TERM_LENGTH = 3
+
+# Search table name -> entity table and searched columns (column -> owning table)
+SEARCH_INDEXES = {
+    "patient_search": {
+        "table": "patients",
+        "columns": {
+            "first_name": "persons",
+            "last_name": "persons",
+            "email": "persons",
+            "patient_id": "patients",
+        },
+    },
+    "doctor_search": {
+        "table": "doctors",
+        "columns": {
+            "first_name": "persons",
+            "last_name": "persons",
+            "email": "persons",
+            "specialisation": "doctors",
+            "license_number": "doctors",
+        },
+    },
+}
+
+# Engines already known to have a search backend, with the backend name
+_available_backends = weakref.WeakKeyDictionary()
+
+def _source_select(search_table, where=None):
+    """SELECT producing the search rows of an entity from its source tables"""
+    spec = SEARCH_INDEXES[search_table]
+    columns = ", ".join(f"{table}.{column}" for column, table in spec["columns"].items())
+    statement = (
+        f"SELECT persons.id, {columns} FROM persons "
+        f"JOIN {spec['table']} ON {spec['table']}.id = persons.id"
+    )
+    if where:
+        statement += f" WHERE {where}"
+    return statement
+
+def _insert_rows(search_table, where=None):
+    """INSERT copying the source rows of an entity into its search table"""
+    columns = ", ".join(SEARCH_INDEXES[search_table]["columns"])
+    return f"INSERT INTO {search_table}(rowid, {columns}) {_source_select(search_table, where)}"
+
+def sqlite_search_ddl(search_table):
+    """
+    DDL statements for an FTS5 search table and its sync triggers
+    
+    Args:
+        search_table: Name of the search table
+    
+    Returns:
+        List of SQL statements
+    """
+    spec = SEARCH_INDEXES[search_table]
+    columns = ", ".join(spec["columns"])
+    refresh = (
+        f"DELETE FROM {search_table} WHERE rowid = old.id; "
+        f"{_insert_rows(search_table, 'persons.id = new.id')};"
+    )
+    remove = f"DELETE FROM {search_table} WHERE rowid = old.id;"
+    
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {search_table} "
+        f"USING fts5({columns}, tokenize='trigram')",
+        f"CREATE TRIGGER IF NOT EXISTS {search_table}_insert AFTER INSERT ON {spec['table']} "
+        f"BEGIN {_insert_rows(search_table, 'persons.id = new.id')}; END",
+        f"CREATE TRIGGER IF NOT EXISTS {search_table}_update AFTER UPDATE ON {spec['table']} "
+        f"BEGIN {refresh} END",
+        f"CREATE TRIGGER IF NOT EXISTS {search_table}_update_person AFTER UPDATE ON persons "
+        f"BEGIN {refresh} END",
+        f"CREATE TRIGGER IF NOT EXISTS {search_table}_delete AFTER DELETE ON {spec['table']} "
+        f"BEGIN {remove} END",
+        f"CREATE TRIGGER IF NOT EXISTS {search_table}_delete_person AFTER DELETE ON persons "
+        f"BEGIN {remove} END",
+    ]
+
+def postgresql_search_ddl():
+    """
+    DDL statements for the pg_trgm indexes on every searched column
+    
+    Returns:
+        List of SQL statements
+    """
+    statements = ["CREATE EXTENSION IF NOT EXISTS pg_trgm"]
+    indexed = set()
+    
+    for spec in SEARCH_INDEXES.values():
+        for column, table in spec["columns"].items():
+            if (table, column) in indexed:
+                continue
+            indexed.add((table, column))
+            statements.append(
+                f"CREATE INDEX IF NOT EXISTS ix_{table}_{column}_trgm "
+                f"ON {table} USING gin ({column} gin_trgm_ops)"
+            )
+    
+    return statements
+
+def install_search_index(connection):
+    """
+    Create the search backend for the connection's database if it is missing
+    
+    New SQLite search tables are filled from the existing rows, so this also
+    upgrades databases created before the search index existed.
+    
+    Args:
+        connection: SQLAlchemy connection
+    
+    Returns:
+        True if an indexed search backend is installed, False otherwise
+    """
+    dialect = connection.dialect.name
+    
+    if dialect == "postgresql":
+        for statement in postgresql_search_ddl():
+            connection.exec_driver_sql(statement)
+        return True
+    
+    if dialect != "sqlite":
+        return False
+    
+    for search_table in SEARCH_INDEXES:
+        exists = connection.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (search_table,)
+        ).first()
+        try:
+            for statement in sqlite_search_ddl(search_table):
+                connection.exec_driver_sql(statement)
+        except OperationalError as e:
+            logger.warning(f"SQLite full-text search unavailable, using LIKE scans: {e}")
+            return False
+        if not exists:
+            rebuild_search_index(connection, search_table)
+    
+    return True
+
+def rebuild_search_index(connection, search_table):
+    """
+    Refill a SQLite search table from its source tables
+    
+    Args:
+        connection: SQLAlchemy connection
+        search_table: Name of the search table
+    """
+    connection.exec_driver_sql(f"DELETE FROM {search_table}")
+    connection.exec_driver_sql(_insert_rows(search_table))
+
+def drop_search_index(connection):
+    """
+    Drop the SQLite search tables, which are not part of the ORM metadata
+    
+    Args:
+        connection: SQLAlchemy connection
+    """
+    if connection.dialect.name == "sqlite":
+        for search_table in SEARCH_INDEXES:
+            connection.exec_driver_sql(f"DROP TABLE IF EXISTS {search_table}")
+
+def search_backend(connection, search_table):
+    """
+    Name of the indexed search backend usable for a search table
+    
+    Args:
+        connection: SQLAlchemy connection
+        search_table: Name of the search table
+    
+    Returns:
+        "postgresql", "sqlite", or None when searches must scan
+    """
+    engine = connection.engine
+    cached = _available_backends.get(engine, {})
+    if search_table in cached:
+        return cached[search_table]
+    
+    dialect = connection.dialect.name
+    if dialect == "postgresql":
+        query = "SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'"
+        found = connection.exec_driver_sql(query).first()
+    elif dialect == "sqlite":
+        query = "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?"
+        found = connection.exec_driver_sql(query, (search_table,)).first()
+    else:
+        return None
+    
+    if not found:
+        # Not cached, so a backend installed later is picked up
+        return None
+    
+    _available_backends.setdefault(engine, {})[search_table] = dialect
+    return dialect
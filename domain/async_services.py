@@ -0,0 +1,122 @@
+"""
+Async twins of the domain services, for use with SQLAlchemy's AsyncSession
+
+An async service is built from async repositories (db.async_repository)
+and runs the matching service in domain.services on the repositories'
+AsyncSession through run_sync, so the business logic is shared with the
+sync services. FileExportService does not touch the database and has no
+async twin.
+
+Usage:
+    Session = create_async_session_factory(config)
+    async with Session() as session:
+        service = AsyncAppointmentService(
+            AsyncAppointmentRepository(session),
+            AsyncPatientRepository(session),
+            AsyncDoctorRepository(session)
+        )
+        slots = await service.find_available_slots(doctor_id, "2025-03-01")
+"""
+from db.async_repository import async_twin, async_iter_twin, iterate_in_batches
+from domain.services import (
+    PatientService, DoctorService, AppointmentService, MedicalRecordService, SearchService
+)
+
+class AsyncService:
+    """Base class running a sync service on the AsyncSession of its repositories"""
+    
+    service_class = None
+    
+    def __init__(self, *repositories, **named_repositories):
+        self.repositories = repositories
+        self.named_repositories = named_repositories
+        
+        sessions = [
+            r.session for r in (*repositories, *named_repositories.values()) if r is not None
+        ]
+        if not sessions:
+            raise ValueError("An async service needs at least one repository")
+        self.session = sessions[0]
+    
+    def sync(self, sync_session):
+        """The sync service over sync repositories on the AsyncSession's underlying session"""
+        def sync_repository(repository):
+            return repository.sync(sync_session) if repository is not None else None
+        
+        return self.service_class(
+            *(sync_repository(r) for r in self.repositories),
+            **{name: sync_repository(r) for name, r in self.named_repositories.items()}
+        )
+    
+    async def _run(self, name, *args, **kwargs):
+        return await self.session.run_sync(
+            lambda sync_session: getattr(self.sync(sync_session), name)(*args, **kwargs)
+        )
+    
+    def _iterate(self, name, *args, **kwargs):
+        return iterate_in_batches(
+            self.session,
+            lambda sync_session: getattr(self.sync(sync_session), name)(*args, **kwargs)
+        )
+
+class AsyncPatientService(AsyncService):
+    """Async service for patient-related operations"""
+    
+    service_class = PatientService
+    
+    create_patient = async_twin(PatientService.create_patient)
+    get_patient = async_twin(PatientService.get_patient)
+    search_patients = async_twin(PatientService.search_patients)
+    update_patient = async_twin(PatientService.update_patient)
+
+class AsyncDoctorService(AsyncService):
+    """Async service for doctor-related operations"""
+    
+    service_class = DoctorService
+    
+    create_doctor = async_twin(DoctorService.create_doctor)
+    get_doctor = async_twin(DoctorService.get_doctor)
+    search_doctors = async_twin(DoctorService.search_doctors)
+    get_doctors_by_specialisation = async_twin(DoctorService.get_doctors_by_specialisation)
+
+class AsyncAppointmentService(AsyncService):
+    """Async service for appointment-related operations"""
+    
+    service_class = AppointmentService
+    
+    create_appointment = async_twin(AppointmentService.create_appointment)
+    get_appointment = async_twin(AppointmentService.get_appointment)
+    get_appointments_for_doctor = async_twin(AppointmentService.get_appointments_for_doctor)
+    get_appointments_for_patient = async_twin(AppointmentService.get_appointments_for_patient)
+    find_available_slots = async_twin(AppointmentService.find_available_slots)
+    find_availability_matrix = async_twin(AppointmentService.find_availability_matrix)
+    audit_conflicts = async_twin(AppointmentService.audit_conflicts)
+    is_time_available = async_twin(AppointmentService.is_time_available)
+    reschedule_appointment = async_twin(AppointmentService.reschedule_appointment)
+    cancel_appointment = async_twin(AppointmentService.cancel_appointment)
+
+class AsyncMedicalRecordService(AsyncService):
+    """Async service for medical record-related operations"""
+    
+    service_class = MedicalRecordService
+    
+    create_medical_record = async_twin(MedicalRecordService.create_medical_record)
+    get_medical_record = async_twin(MedicalRecordService.get_medical_record)
+    get_medical_records_for_patient = async_twin(MedicalRecordService.get_medical_records_for_patient)
+    update_medical_record = async_twin(MedicalRecordService.update_medical_record)
+
+class AsyncSearchService(AsyncService):
+    """Async service for search operations"""
+    
+    service_class = SearchService
+    
+    search_patients = async_twin(SearchService.search_patients)
+    search_doctors = async_twin(SearchService.search_doctors)
+    search_appointments = async_twin(SearchService.search_appointments)
+    search_appointments_page = async_twin(SearchService.search_appointments_page)
+    search_patient_medical_records = async_twin(SearchService.search_patient_medical_records)
+    iter_medical_records_by_regex = async_iter_twin(SearchService.iter_medical_records_by_regex)
+    
+    def filter_results(self, results, filter_criteria):
+        """Apply additional filtering to search results (in memory, so not a coroutine)"""
+        return SearchService.filter_results(self, results, filter_criteria)
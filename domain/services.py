@@ -9,6 +9,43 @@ import re
 
 logger = logging.getLogger(__name__)
 
+def build_appointments(appointment_models, patient_repository, doctor_repository):
+    """
+    Convert appointment models into domain entities
+    
+    Patients and doctors are fetched with one batched lookup per entity type
+    instead of one lookup per appointment row, so the number of queries stays
+    constant regardless of how many appointments are converted.
+    
+    Args:
+        appointment_models: Iterable of appointment models
+        patient_repository: Repository used to load the patients
+        doctor_repository: Repository used to load the doctors
+        
+    Returns:
+        List of Appointment domain entities
+    """
+    from domain.entities import Appointment
+    
+    appointment_models = list(appointment_models)
+    if not appointment_models:
+        return []
+    
+    patients = patient_repository.get_by_ids(a.patient_id for a in appointment_models)
+    doctors = doctor_repository.get_by_ids(a.doctor_id for a in appointment_models)
+    
+    return [
+        Appointment(
+            patient=patients.get(a.patient_id),
+            doctor=doctors.get(a.doctor_id),
+            schedule_time=a.schedule_time,
+            duration=a.duration,
+            status=a.status,
+            notes=a.notes,
+            appointment_id=a.appointment_id
+        ) for a in appointment_models
+    ]
+
 class PatientService:
     """Service for patient-related operations"""
     
@@ -291,10 +328,15 @@ class AppointmentService:
         self.patient_repository = patient_repository
         self.doctor_repository = doctor_repository
     
+    def _build_appointments(self, appointment_models):
+        """Convert appointment models to domain entities with batched lookups"""
+        return build_appointments(appointment_models, self.patient_repository, self.doctor_repository)
+    
     def create_appointment(self, patient_id, doctor_id, schedule_time, duration, notes=None):
         """Create a new appointment"""
         from domain.entities import Appointment
         from db.models import Appointment as AppointmentModel
+        from db.repository import MAX_APPOINTMENT_MINUTES
         
         # Get patient and doctor
         patient_model = self.patient_repository.get_by_id(patient_id)
@@ -303,21 +345,27 @@ class AppointmentService:
         if not patient_model or not doctor_model:
             raise ValueError("Patient or doctor not found")
         
-        # Check for scheduling conflicts
-        if not self.is_time_available(doctor_id, schedule_time, duration):
-            raise ValueError("The selected time conflicts with an existing appointment")
+        if not isinstance(schedule_time, datetime):
+            schedule_time = datetime.strptime(schedule_time, "%Y-%m-%d %H:%M")
+        
+        if not 0 < duration <= MAX_APPOINTMENT_MINUTES:
+            raise ValueError(f"Duration must be between 1 and {MAX_APPOINTMENT_MINUTES} minutes")
         
         # Create the appointment model
         appointment_model = AppointmentModel(
             patient_id=patient_id,
             doctor_id=doctor_id,
-            schedule_time=schedule_time if isinstance(schedule_time, datetime) else datetime.strptime(schedule_time, "%Y-%m-%d %H:%M"),
+            schedule_time=schedule_time,
             duration=duration,
+            status="scheduled",
             notes=notes
         )
         
-        # Save to database
-        created_appointment = self.appointment_repository.create(appointment_model)
+        # Check for scheduling conflicts and save in one atomic statement
+        created_appointment = self.appointment_repository.create_if_available(appointment_model)
+        
+        if created_appointment is None:
+            raise ValueError("The selected time conflicts with an existing appointment")
         
         # Create and return domain entity
         return Appointment(
@@ -332,135 +380,156 @@ class AppointmentService:
     
     def get_appointment(self, appointment_id):
         """Get an appointment by ID"""
-        from domain.entities import Appointment
-        
         # Get the appointment
         appointment_model = self.appointment_repository.get_by_id(appointment_id)
         
         if not appointment_model:
             return None
         
-        # Get patient and doctor
-        patient_model = self.patient_repository.get_by_id(appointment_model.patient_id)
-        doctor_model = self.doctor_repository.get_by_id(appointment_model.doctor_id)
-        
         # Convert to domain entity
-        return Appointment(
-            patient=patient_model,
-            doctor=doctor_model,
-            schedule_time=appointment_model.schedule_time,
-            duration=appointment_model.duration,
-            status=appointment_model.status,
-            notes=appointment_model.notes,
-            appointment_id=appointment_model.appointment_id
-        )
+        return self._build_appointments([appointment_model])[0]
     
     def get_appointments_for_doctor(self, doctor_id, date=None):
         """Get appointments for a doctor"""
-        from domain.entities import Appointment
-        
         # Get the appointments
         appointment_models = self.appointment_repository.get_by_doctor(doctor_id, date)
         
         # Convert to domain entities
-        appointments = []
-        for a in appointment_models:
-            patient_model = self.patient_repository.get_by_id(a.patient_id)
-            doctor_model = self.doctor_repository.get_by_id(a.doctor_id)
-            
-            appointments.append(Appointment(
-                patient=patient_model,
-                doctor=doctor_model,
-                schedule_time=a.schedule_time,
-                duration=a.duration,
-                status=a.status,
-                notes=a.notes,
-                appointment_id=a.appointment_id
-            ))
-        
-        return appointments
+        return self._build_appointments(appointment_models)
     
     def get_appointments_for_patient(self, patient_id, date=None):
         """Get appointments for a patient"""
-        from domain.entities import Appointment
-        
         # Get the appointments
         appointment_models = self.appointment_repository.get_by_patient(patient_id, date)
         
         # Convert to domain entities
-        appointments = []
-        for a in appointment_models:
-            patient_model = self.patient_repository.get_by_id(a.patient_id)
-            doctor_model = self.doctor_repository.get_by_id(a.doctor_id)
-            
-            appointments.append(Appointment(
-                patient=patient_model,
-                doctor=doctor_model,
-                schedule_time=a.schedule_time,
-                duration=a.duration,
-                status=a.status,
-                notes=a.notes,
-                appointment_id=a.appointment_id
-            ))
-        
-        return appointments
+        return self._build_appointments(appointment_models)
     
     def find_available_slots(self, doctor_id, date, duration=30):
         """Find available appointment slots for a doctor on a specific date"""
+        from algorithms.scheduling import iter_free_slots, merge_intervals
+        
         # Get the doctor's working hours (assuming 9 AM to 5 PM)
         working_start = 9  # 9 AM
         working_end = 17   # 5 PM
         
-        # Get all appointments for the doctor on the specified date
-        appointments = self.get_appointments_for_doctor(doctor_id, date)
-        
         # Convert date string to datetime if needed
         if isinstance(date, str):
             date = datetime.strptime(date, "%Y-%m-%d").date()
         
-        # Create a list of all possible time slots
-        all_slots = []
-        current_time = datetime.combine(date, datetime.min.time().replace(hour=working_start))
+        # Get the doctor's busy intervals for the day in one query
+        busy_intervals = merge_intervals(self.appointment_repository.get_busy_intervals(doctor_id, date))
+        
+        # Sweep the free gaps of the working day
+        start_time = datetime.combine(date, datetime.min.time().replace(hour=working_start))
         end_time = datetime.combine(date, datetime.min.time().replace(hour=working_end))
         
-        while current_time < end_time:
-            all_slots.append(current_time)
-            current_time += timedelta(minutes=duration)
+        return list(iter_free_slots(busy_intervals, start_time, end_time, duration, interval=duration))
+    
+    def find_availability_matrix(self, specialisation, start_date, end_date, duration=30,
+                                 working_start=9, working_end=17):
+        """
+        Find free slots for every doctor of a specialisation across a date range
+        
+        All appointments for the doctors and range are fetched with a single
+        range query and swept per doctor in memory.
+        
+        Args:
+            specialisation: Doctor specialisation (e.g. "Cardiology")
+            start_date: First day of the range (inclusive)
+            end_date: Last day of the range (inclusive)
+            duration: Slot duration in minutes
+            working_start: Hour the working day starts
+            working_end: Hour the working day ends
+            
+        Returns:
+            List of dictionaries with the doctor, first available slot, number of
+            free slots and free slots per day, ranked by earliest availability
+        """
+        from algorithms.scheduling import find_available_slots_by_day
+        
+        # Convert date strings to dates if needed
+        if isinstance(start_date, str):
+            start_date = datetime.strptime(start_date, "%Y-%m-%d").date()
+        if isinstance(end_date, str):
+            end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
+        
+        doctors = self.doctor_repository.get_by_specialisation(specialisation)
+        if not doctors:
+            return []
+        
+        # One range query for the whole doctor set, grouped by doctor in memory
+        appointments_by_doctor = {doctor.id: [] for doctor in doctors}
+        for appointment in self.appointment_repository.get_by_date_range(
+                start_date, end_date, doctor_ids=list(appointments_by_doctor)):
+            appointments_by_doctor[appointment.doctor_id].append(appointment)
+        
+        matrix = []
+        for doctor in doctors:
+            slots_by_day = find_available_slots_by_day(
+                appointments_by_doctor[doctor.id], start_date, end_date, duration,
+                interval=duration, working_start=working_start, working_end=working_end
+            )
+            first_available = next((slots[0] for slots in slots_by_day.values() if slots), None)
+            
+            matrix.append({
+                "doctor": doctor,
+                "first_available": first_available,
+                "free_slots": sum(len(slots) for slots in slots_by_day.values()),
+                "slots_by_day": slots_by_day
+            })
+        
+        # Earliest availability first, then the doctor with the most free time
+        matrix.sort(key=lambda entry: (
+            entry["first_available"] is None,
+            entry["first_available"] or datetime.max,
+            -entry["free_slots"]
+        ))
+        
+        return matrix
+    
+    def audit_conflicts(self, start_date, end_date, by="doctor"):
+        """
+        Find overlapping bookings for the same doctor or patient in a date range
+        
+        Args:
+            start_date: First day of the range (inclusive)
+            end_date: Last day of the range (inclusive)
+            by: "doctor" or "patient"
+            
+        Returns:
+            List of (earlier, later) pairs of overlapping appointment rows
+        """
+        from algorithms.scheduling import iter_scheduling_conflicts
         
-        # Remove slots that conflict with existing appointments
-        available_slots = []
-        for slot in all_slots:
-            if self.is_time_available(doctor_id, slot, duration):
-                available_slots.append(slot)
+        if by not in ("doctor", "patient"):
+            raise ValueError("Conflicts can only be audited by doctor or patient")
         
-        return available_slots
+        rows = self.appointment_repository.iter_schedule_rows(start_date, end_date, by=by)
+        return list(iter_scheduling_conflicts(rows, by=by))
     
-    def is_time_available(self, doctor_id, schedule_time, duration):
-        """Check if a time slot is available for a doctor"""
-        # Get all appointments for the doctor on the same day
+    def is_time_available(self, doctor_id, schedule_time, duration, busy_intervals=None):
+        """
+        Check if a time slot is available for a doctor
+        
+        Args:
+            doctor_id: Doctor ID
+            schedule_time: Proposed start time
+            duration: Proposed duration in minutes
+            busy_intervals: Pre-fetched (start, end) intervals for the doctor on that
+                day; fetched from the repository when not provided
+        """
+        from algorithms.scheduling import is_interval_free
+        
         if isinstance(schedule_time, str):
             schedule_time = datetime.strptime(schedule_time, "%Y-%m-%d %H:%M")
         
-        date = schedule_time.date()
-        appointments = self.appointment_repository.get_by_doctor(doctor_id, date)
+        # Get the doctor's busy intervals for the same day
+        if busy_intervals is None:
+            busy_intervals = self.appointment_repository.get_busy_intervals(doctor_id, schedule_time.date())
         
-        # Calculate the end time of the proposed appointment
-        end_time = schedule_time + timedelta(minutes=duration)
-        
-        # Check for conflicts with existing appointments
-        for appointment in appointments:
-            # Skip cancelled appointments
-            if appointment.status == "cancelled":
-                continue
-                
-            # Calculate the end time of the existing appointment
-            existing_end_time = appointment.schedule_time + timedelta(minutes=appointment.duration)
-            
-            # Check for overlap
-            if (schedule_time < existing_end_time and end_time > appointment.schedule_time):
-                return False
-        
-        return True
+        # Check for conflicts in memory
+        return is_interval_free(busy_intervals, schedule_time, duration)
     
     def reschedule_appointment(self, appointment_id, new_schedule_time):
         """Reschedule an appointment"""
@@ -470,32 +539,27 @@ class AppointmentService:
         if not appointment_model:
             raise ValueError("Appointment not found")
         
-        # Check if the new time is available
-        if not self.is_time_available(appointment_model.doctor_id, new_schedule_time, appointment_model.duration):
+        if not isinstance(new_schedule_time, datetime):
+            new_schedule_time = datetime.strptime(new_schedule_time, "%Y-%m-%d %H:%M")
+        
+        # Check if the new time is available, ignoring the appointment being moved
+        busy_intervals = self.appointment_repository.get_busy_intervals(
+            appointment_model.doctor_id, new_schedule_time.date(),
+            exclude_appointment_id=appointment_model.appointment_id
+        )
+        if not self.is_time_available(appointment_model.doctor_id, new_schedule_time,
+                                      appointment_model.duration, busy_intervals):
             raise ValueError("The selected time conflicts with an existing appointment")
         
         # Update the appointment
-        appointment_model.schedule_time = new_schedule_time if isinstance(new_schedule_time, datetime) else datetime.strptime(new_schedule_time, "%Y-%m-%d %H:%M")
+        appointment_model.schedule_time = new_schedule_time
         appointment_model.status = "rescheduled"
         
         # Save to database
         updated_appointment = self.appointment_repository.update(appointment_model)
         
-        # Get patient and doctor
-        patient_model = self.patient_repository.get_by_id(updated_appointment.patient_id)
-        doctor_model = self.doctor_repository.get_by_id(updated_appointment.doctor_id)
-        
         # Create and return domain entity
-        from domain.entities import Appointment
-        return Appointment(
-            patient=patient_model,
-            doctor=doctor_model,
-            schedule_time=updated_appointment.schedule_time,
-            duration=updated_appointment.duration,
-            status=updated_appointment.status,
-            notes=updated_appointment.notes,
-            appointment_id=updated_appointment.appointment_id
-        )
+        return self._build_appointments([updated_appointment])[0]
     
     def cancel_appointment(self, appointment_id):
         """Cancel an appointment"""
@@ -511,33 +575,44 @@ class AppointmentService:
         # Save to database
         updated_appointment = self.appointment_repository.update(appointment_model)
         
-        # Get patient and doctor
-        patient_model = self.patient_repository.get_by_id(updated_appointment.patient_id)
-        doctor_model = self.doctor_repository.get_by_id(updated_appointment.doctor_id)
-        
         # Create and return domain entity
-        from domain.entities import Appointment
-        return Appointment(
-            patient=patient_model,
-            doctor=doctor_model,
-            schedule_time=updated_appointment.schedule_time,
-            duration=updated_appointment.duration,
-            status=updated_appointment.status,
-            notes=updated_appointment.notes,
-            appointment_id=updated_appointment.appointment_id
-        )
+        return self._build_appointments([updated_appointment])[0]
 
 class MedicalRecordService:
     """Service for medical record-related operations"""
     
-    def __init__(self, medical_record_repository, patient_repository):
+    def __init__(self, medical_record_repository, patient_repository,
+                 prescription_repository=None, lab_test_repository=None):
         self.medical_record_repository = medical_record_repository
         self.patient_repository = patient_repository
+        self.prescription_repository = prescription_repository
+        self.lab_test_repository = lab_test_repository
     
-    def create_medical_record(self, patient_id, diagnosis, treatment_plan, notes=None):
-        """Create a new medical record"""
-        from domain.entities import PatientMedicalRecord
+    def create_medical_record(self, patient_id, diagnosis, treatment_plan, notes=None,
+                              prescriptions=None, lab_tests=None):
+        """
+        Create a new medical record, optionally with its prescriptions and lab tests
+        
+        The record and everything ordered with it are stored in one
+        transaction, so either all of them are saved or none is.
+        
+        Args:
+            patient_id: Database ID of the patient
+            diagnosis: Diagnosis text
+            treatment_plan: Treatment plan text
+            notes: Optional notes
+            prescriptions: Optional list of dicts of Prescription arguments
+                           (medication, dosage, frequency, start_date, end_date, ...)
+            lab_tests: Optional list of dicts of LabTest arguments
+                       (test_name, test_type, ordered_date, ...)
+            
+        Returns:
+            PatientMedicalRecord entity holding the created prescriptions and lab tests
+        """
+        from domain.entities import PatientMedicalRecord, Prescription, LabTest
         from db.models import PatientMedicalRecord as MedicalRecordModel
+        from db.models import Prescription as PrescriptionModel, LabTest as LabTestModel
+        from db.repository import PrescriptionRepository, LabTestRepository
         
         # Get the patient
         patient_model = self.patient_repository.get_by_id(patient_id)
@@ -553,18 +628,68 @@ class MedicalRecordService:
             notes=notes
         )
         
-        # Save to database
-        created_record = self.medical_record_repository.create(medical_record_model)
+        if not prescriptions and not lab_tests:
+            # Save to database
+            created_record = self.medical_record_repository.create(medical_record_model)
+            
+            # Create and return domain entity
+            return PatientMedicalRecord(
+                patient=patient_model,
+                diagnosis=created_record.diagnosis,
+                treatment_plan=created_record.treatment_plan,
+                notes=created_record.notes,
+                date_created=created_record.date_created,
+                record_id=created_record.record_id
+            )
         
-        # Create and return domain entity
-        return PatientMedicalRecord(
-            patient=patient_model,
-            diagnosis=created_record.diagnosis,
-            treatment_plan=created_record.treatment_plan,
-            notes=created_record.notes,
-            date_created=created_record.date_created,
-            record_id=created_record.record_id
-        )
+        session = self.medical_record_repository.session
+        prescription_repository = self.prescription_repository or PrescriptionRepository(session)
+        lab_test_repository = self.lab_test_repository or LabTestRepository(session)
+        
+        # One commit for the record and all its orders
+        with self.medical_record_repository.unit_of_work():
+            created_record = self.medical_record_repository.create(medical_record_model)
+            
+            record = PatientMedicalRecord(
+                patient=patient_model,
+                diagnosis=created_record.diagnosis,
+                treatment_plan=created_record.treatment_plan,
+                notes=created_record.notes,
+                date_created=created_record.date_created,
+                record_id=created_record.record_id
+            )
+            
+            for fields in prescriptions or []:
+                prescription = Prescription(record, **fields)
+                created_prescription = prescription_repository.create(PrescriptionModel(
+                    record_id=record.record_id,
+                    medication=prescription.medication,
+                    dosage=prescription.dosage,
+                    frequency=prescription.frequency,
+                    start_date=prescription.start_date,
+                    end_date=prescription.end_date,
+                    instructions=prescription.instructions,
+                    is_active=prescription.is_active
+                ))
+                prescription.prescription_id = created_prescription.prescription_id
+                record.add_prescription(prescription)
+            
+            for fields in lab_tests or []:
+                lab_test = LabTest(record, **fields)
+                created_lab_test = lab_test_repository.create(LabTestModel(
+                    record_id=record.record_id,
+                    test_name=lab_test.test_name,
+                    test_type=lab_test.test_type,
+                    ordered_date=lab_test.ordered_date,
+                    result_date=lab_test.result_date,
+                    result=lab_test.result,
+                    reference_range=lab_test.reference_range,
+                    is_abnormal=lab_test.is_abnormal
+                ))
+                lab_test.test_id = created_lab_test.test_id
+                record.add_lab_test(lab_test)
+        
+        return record
     
     def get_medical_record(self, record_id):
         """Get a medical record by ID"""
@@ -701,20 +826,17 @@ class SearchService:
             ) for d in doctor_models
         ]
     
-    def search_appointments(self, doctor_id=None, patient_id=None, date=None, status=None):
-        """Search for appointments with various filters"""
-        from domain.entities import Appointment
+    def _appointment_criteria(self, doctor_id=None, patient_id=None, date=None, status=None):
+        """SQL filter expressions for the appointment search filters"""
         from db.models import Appointment as AppointmentModel
         
-        # Start with a base query
-        query = self.appointment_repository.session.query(AppointmentModel)
+        criteria = []
         
-        # Apply filters
         if doctor_id:
-            query = query.filter(AppointmentModel.doctor_id == doctor_id)
+            criteria.append(AppointmentModel.doctor_id == doctor_id)
         
         if patient_id:
-            query = query.filter(AppointmentModel.patient_id == patient_id)
+            criteria.append(AppointmentModel.patient_id == patient_id)
         
         if date:
             # If date is a string, convert it to datetime
@@ -722,34 +844,51 @@ class SearchService:
                 date = datetime.strptime(date, "%Y-%m-%d").date()
             
             # Filter appointments for the specified date
-            query = query.filter(
-                AppointmentModel.schedule_time >= datetime.combine(date, datetime.min.time()),
-                AppointmentModel.schedule_time < datetime.combine(date, datetime.max.time())
-            )
+            criteria.append(AppointmentModel.schedule_time >= datetime.combine(date, datetime.min.time()))
+            criteria.append(AppointmentModel.schedule_time < datetime.combine(date, datetime.max.time()))
         
         if status:
-            query = query.filter(AppointmentModel.status == status)
+            criteria.append(AppointmentModel.status == status)
+        
+        return criteria
+    
+    def search_appointments(self, doctor_id=None, patient_id=None, date=None, status=None):
+        """Search for appointments with various filters"""
+        from db.models import Appointment as AppointmentModel
+        
+        # Start with a base query and apply the filters
+        query = self.appointment_repository.session.query(AppointmentModel).filter(
+            *self._appointment_criteria(doctor_id, patient_id, date, status)
+        )
         
         # Execute the query
         appointment_models = query.all()
         
         # Convert to domain entities
-        appointments = []
-        for a in appointment_models:
-            patient_model = self.patient_repository.get_by_id(a.patient_id)
-            doctor_model = self.doctor_repository.get_by_id(a.doctor_id)
+        return build_appointments(appointment_models, self.patient_repository, self.doctor_repository)
+    
+    def search_appointments_page(self, doctor_id=None, patient_id=None, date=None, status=None,
+                                 limit=50, after=None):
+        """
+        Search for appointments one page at a time, in schedule order
+        
+        Args:
+            doctor_id: Optional doctor filter
+            patient_id: Optional patient filter
+            date: Optional date filter (date or YYYY-MM-DD string)
+            status: Optional status filter
+            limit: Maximum number of appointments on the page
+            after: Cursor returned with the previous page
             
-            appointments.append(Appointment(
-                patient=patient_model,
-                doctor=doctor_model,
-                schedule_time=a.schedule_time,
-                duration=a.duration,
-                status=a.status,
-                notes=a.notes,
-                appointment_id=a.appointment_id
-            ))
-        
-        return appointments
+        Returns:
+            Tuple of (list of Appointment entities, cursor for the next page or None)
+        """
+        appointment_models, cursor = self.appointment_repository.get_page(
+            limit, after, order_by="schedule_time",
+            criteria=self._appointment_criteria(doctor_id, patient_id, date, status)
+        )
+        appointments = build_appointments(appointment_models, self.patient_repository, self.doctor_repository)
+        return appointments, cursor
     
     def search_patient_medical_records(self, patient_id=None, diagnosis_term=None):
         """Search for medical records"""
@@ -769,13 +908,14 @@ class SearchService:
         # Execute the query
         record_models = query.all()
         
+        # Load all referenced patients in one batch
+        patients = self.patient_repository.get_by_ids(r.patient_id for r in record_models)
+        
         # Convert to domain entities
         records = []
         for r in record_models:
-            patient_model = self.patient_repository.get_by_id(r.patient_id)
-            
             records.append(PatientMedicalRecord(
-                patient=patient_model,
+                patient=patients.get(r.patient_id),
                 diagnosis=r.diagnosis,
                 treatment_plan=r.treatment_plan,
                 notes=r.notes,
@@ -785,6 +925,41 @@ class SearchService:
         
         return records
     
+    def iter_medical_records_by_regex(self, pattern, fields=("diagnosis", "treatment_plan", "notes"),
+                                      batch_size=500):
+        """
+        Stream the medical records with a field matching a regular expression
+        
+        Args:
+            pattern: Regular expression pattern, matched case-insensitively
+            fields: Medical record fields to search in
+            batch_size: Number of records loaded and converted at a time
+            
+        Yields:
+            PatientMedicalRecord domain entities
+        """
+        from itertools import islice
+        from domain.entities import PatientMedicalRecord
+        
+        record_models = self.medical_record_repository.iter_regex_search(pattern, fields, batch_size)
+        
+        while True:
+            batch = list(islice(record_models, batch_size))
+            if not batch:
+                return
+            
+            # One patient lookup per batch
+            patients = self.patient_repository.get_by_ids(r.patient_id for r in batch)
+            for r in batch:
+                yield PatientMedicalRecord(
+                    patient=patients.get(r.patient_id),
+                    diagnosis=r.diagnosis,
+                    treatment_plan=r.treatment_plan,
+                    notes=r.notes,
+                    date_created=r.date_created,
+                    record_id=r.record_id
+                )
+    
     def filter_results(self, results, filter_criteria):
         """Apply additional filtering to search results"""
         filtered_results = []
@@ -829,25 +1004,29 @@ class FileExportService:
         if output_dir and not os.path.exists(output_dir):
             os.makedirs(output_dir)
         
-        # Check if data is a list of dictionaries
-        if not data or not isinstance(data, list):
-            raise ValueError("Data must be a non-empty list")
+        # Data may be a list or a lazy iterable such as BaseRepository.iter_all
+        items = iter(data) if data is not None else iter(())
+        first = next(items, None)
+        if first is None:
+            raise ValueError("Data must be a non-empty list or iterable")
         
         # Get the fieldnames from the first item
-        if hasattr(data[0], 'to_dict'):
-            fieldnames = data[0].to_dict().keys()
-            # Convert all items to dictionaries
-            data = [item.to_dict() for item in data]
-        elif isinstance(data[0], dict):
-            fieldnames = data[0].keys()
+        if hasattr(first, 'to_dict'):
+            first = first.to_dict()
+            # Convert the items to dictionaries as they are written
+            rows = (item.to_dict() for item in items)
+        elif isinstance(first, dict):
+            rows = items
         else:
             raise ValueError("Data items must be dictionaries or have a to_dict method")
         
-        # Write to CSV
+        # Write to CSV one row at a time
         with open(output_file, 'w', newline='') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+            writer = csv.DictWriter(csvfile, fieldnames=first.keys())
             writer.writeheader()
-            writer.writerows(data)
+            writer.writerow(first)
+            for row in rows:
+                writer.writerow(row)
         
         return output_file
     
@@ -865,9 +1044,10 @@ class FileExportService:
             if output_dir and not os.path.exists(output_dir):
                 os.makedirs(output_dir)
             
-            # Check if data is a list
-            if not data or not isinstance(data, list):
-                raise ValueError("Data must be a non-empty list")
+            # The PDF table needs every row, so lazy iterables are materialised here
+            data = list(data) if data is not None else []
+            if not data:
+                raise ValueError("Data must be a non-empty list or iterable")
             
             # Convert data to list of dictionaries if needed
             if hasattr(data[0], 'to_dict'):
@@ -66,18 +66,20 @@ def show_help():
     print("patient add <firstName> <lastName> <dob> <email> <phone> [address] [insuranceInfo]")
     print("patient search <searchTerm>")
     print("patient update <patientId> <field> <value>")
-    print("patient list [--limit=<n>] [--offset=<n>]")
+    print("patient list [--limit=<n>] [--after=<cursor>] [--offset=<n>]")
     print("patient view <patientId>")
     
     print("\ndoctor add <firstName> <lastName> <dob> <email> <phone> <specialisation> <licenseNumber>")
     print("doctor search <searchTerm>")
-    print("doctor list [--department=<dept>] [--specialisation=<spec>]")
+    print("doctor list [--department=<dept>] [--specialisation=<spec>] [--limit=<n>] [--after=<cursor>]")
     
     print("\nappointment add <patientId> <doctorId> <dateTime> <duration> [notes]")
-    print("appointment list [--doctor=<doctorId>] [--patient=<patientId>] [--date=<date>] [--status=<status>]")
+    print("appointment list [--doctor=<doctorId>] [--patient=<patientId>] [--date=<date>] [--status=<status>] [--limit=<n>] [--after=<cursor>]")
     print("appointment update <appointmentId> <field> <value>")
     print("appointment cancel <appointmentId> [reason]")
     print("appointment reschedule <appointmentId> <newDateTime>")
+    print("appointment availability --specialisation=<spec> [--from=<date>] [--to=<date>] [--duration=<minutes>]")
+    print("appointment audit-conflicts [--from=<date>] [--to=<date>] [--by=<doctor|patient>]")
     
     print("\nmedicalrecord add <patientId> <diagnosis> <treatmentPlan> [notes]")
     print("medicalrecord view <recordId>")
@@ -94,6 +96,9 @@ def show_help():
     print("labtest list <recordId>")
     
     print("\nreport export --type=<entityType> --format=<formatType> --output=<fileName> [--filters=<filterString>]")
+    print("report analyze --type=<patients|appointments|medical_records> [--engine=<sql|python|numpy|incremental>] [--workers=<n>] [--full]")
+    
+    print("\nsystem stats")
     print("\nexit - Exit the application")
     print("help - Display this help message")
 
@@ -11,7 +11,8 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from algorithms.data_analysis import (
     analyze_patient_demographics, analyze_appointment_patterns,
-    analyze_medical_conditions, predict_appointment_demand
+    analyze_medical_conditions, predict_appointment_demand,
+    DemographicsAccumulator, AppointmentPatternsAccumulator, MedicalConditionsAccumulator
 )
 
 class TestDataAnalysisAlgorithms(unittest.TestCase):
@@ -175,6 +176,63 @@ class TestDataAnalysisAlgorithms(unittest.TestCase):
         self.assertEqual(results["top_abnormal_tests"]["HbA1c"], 1)
         self.assertEqual(results["top_abnormal_tests"]["BMI"], 1)
     
+    def test_merged_accumulators(self):
+        """Test that accumulators over chunks, merged in order, match one pass"""
+        class Doctor:
+            def __init__(self, id):
+                self.id = id
+        
+        class Appointment:
+            def __init__(self, schedule_time, status, doctor):
+                self.schedule_time = schedule_time
+                self.status = status
+                self.doctor = doctor
+        
+        class Patient:
+            def __init__(self, dob, insurance_info, reg_date):
+                self.dob = dob
+                self.insurance_info = insurance_info
+                self.reg_date = reg_date
+        
+        class MedicalRecord:
+            def __init__(self, diagnosis, treatment_plan):
+                self.diagnosis = diagnosis
+                self.treatment_plan = treatment_plan
+                self.lab_tests = []
+        
+        # Doctors 3, 1 and 2 tie; the order they first appear in decides the ranking
+        base_time = datetime(2023, 1, 2, 9, 0)
+        doctors = [Doctor(3), Doctor(1), Doctor(2), Doctor(4), Doctor(5), Doctor(6), Doctor(7)]
+        appointments = [
+            Appointment(base_time + timedelta(days=i % 6, hours=i % 5), ["scheduled", "cancelled"][i % 2],
+                        doctors[i % 7])
+            for i in range(21)
+        ]
+        today = datetime(2024, 3, 15).date()
+        patients = [
+            Patient(today - timedelta(days=900 * i), ["Aetna Plan", "Medicare", ""][i % 3], today - timedelta(days=40 * i))
+            for i in range(1, 30)
+        ]
+        records = [MedicalRecord(["Asthma", "Flu, Asthma"][i % 2], "Rest") for i in range(9)]
+        
+        cases = [
+            (lambda: AppointmentPatternsAccumulator(), appointments),
+            (lambda: DemographicsAccumulator(today), patients),
+            (lambda: MedicalConditionsAccumulator(), records),
+        ]
+        for new_accumulator, rows in cases:
+            expected = new_accumulator().update(rows).finalize()
+            merged = new_accumulator()
+            for start in range(0, len(rows), 4):
+                merged.merge(new_accumulator().update(rows[start:start + 4]))
+            self.assertEqual(merged.finalize(), expected)
+        
+        self.assertEqual(
+            list(AppointmentPatternsAccumulator().update(appointments).finalize()["top_doctors_by_workload"]),
+            [3, 1, 2, 4, 5]
+        )
+        self.assertIn("error", AppointmentPatternsAccumulator().finalize())
+    
     def test_predict_appointment_demand(self):
         """Test predicting appointment demand"""
         # Create test data
@@ -0,0 +1,128 @@
+"""
+Tests for the vectorized NumPy analysis functions
+"""
+import unittest
+import csv
+import importlib.util
+import os
+import sys
+import tempfile
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import patch
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import algorithms.data_analysis as data_analysis
+from algorithms.data_analysis import analyze_patient_demographics, analyze_appointment_patterns
+
+NUMPY_AVAILABLE = importlib.util.find_spec("numpy") is not None
+
+@unittest.skipUnless(NUMPY_AVAILABLE, "NumPy is required for the vectorized analysis")
+class TestNumpyAnalysis(unittest.TestCase):
+    """Test that the NumPy analysis matches the Python implementations"""
+    
+    TODAY = date(2024, 3, 15)
+    
+    def setUp(self):
+        """Set up patients and appointments as objects and as columns"""
+        from algorithms.numpy_analysis import PATIENT_COLUMNS, APPOINTMENT_COLUMNS, to_columns
+        
+        # Birthdays on both sides of each age group boundary, and a leap day
+        dobs = [
+            date(2010, 6, 1), date(2005, 3, 16), date(2005, 3, 15), date(1988, 3, 16),
+            date(1988, 3, 15), date(1973, 1, 1), date(1958, 3, 16), date(1958, 3, 15), date(1940, 2, 29),
+        ]
+        insurance = ["BlueCross #1", "BlueCross #2", "Aetna #3", None, "", "  Cigna #4", "Aetna", None, "Kaiser"]
+        self.patients = [
+            SimpleNamespace(dob=dob, insurance_info=insurance[i], reg_date=date(2023, 1 + i % 3, 10))
+            for i, dob in enumerate(dobs)
+        ]
+        
+        # Doctors 3, 1 and 5 tie on workload; the first seen ranks first
+        statuses = ["scheduled", "completed", "cancelled", "no-show"]
+        start = datetime(2024, 1, 1, 8, 0)  # a Monday
+        doctor_ids = [3, 1, 5, 2, 4, 6, 7]
+        self.appointments = [
+            SimpleNamespace(
+                schedule_time=start + timedelta(days=i % 9, hours=i % 10, minutes=15 * (i % 4)),
+                status=statuses[i % 7 % 4], doctor=SimpleNamespace(id=doctor_ids[i * i % 7])
+            )
+            for i in range(60)
+        ]
+        
+        self.patient_columns = to_columns(
+            {name: [getattr(p, name) for p in self.patients] for name in PATIENT_COLUMNS}, PATIENT_COLUMNS
+        )
+        self.appointment_columns = to_columns({
+            "schedule_time": [a.schedule_time for a in self.appointments],
+            "status": [a.status for a in self.appointments],
+            "doctor_id": [a.doctor.id for a in self.appointments],
+        }, APPOINTMENT_COLUMNS)
+    
+    def expected_demographics(self):
+        """The Python demographics with today fixed at TODAY"""
+        with patch.object(data_analysis, "datetime") as mock_datetime:
+            mock_datetime.now.return_value = datetime.combine(self.TODAY, datetime.min.time())
+            return analyze_patient_demographics(self.patients)
+    
+    def test_patient_demographics(self):
+        """Test age groups, insurance types and registration months"""
+        from algorithms.numpy_analysis import analyze_patient_demographics as numpy_demographics
+        
+        results = numpy_demographics(self.patient_columns, today=self.TODAY)
+        
+        self.assertEqual(results, self.expected_demographics())
+        self.assertEqual(
+            [group["count"] for group in results["age_distribution"].values()], [2, 2, 1, 2, 2]
+        )
+    
+    def test_appointment_patterns(self):
+        """Test weekday, hour, status and doctor workload counts, including tie order"""
+        from algorithms.numpy_analysis import analyze_appointment_patterns as numpy_patterns
+        
+        results = numpy_patterns(self.appointment_columns)
+        
+        self.assertEqual(results, analyze_appointment_patterns(self.appointments))
+        self.assertEqual(list(results["top_doctors_by_workload"]), list(
+            analyze_appointment_patterns(self.appointments)["top_doctors_by_workload"]
+        ))
+    
+    def test_csv_columns(self):
+        """Test reading only the needed columns from a CSV export"""
+        from algorithms.numpy_analysis import (
+            APPOINTMENT_COLUMNS, analyze_appointment_patterns as numpy_patterns, read_csv_columns
+        )
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "appointments.csv")
+            with open(path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["appointment_id", "doctor_id", "schedule_time", "status", "notes"])
+                for i, a in enumerate(self.appointments):
+                    writer.writerow([i, a.doctor.id, a.schedule_time.isoformat(sep=" "), a.status, "note"])
+            
+            columns = read_csv_columns(path, APPOINTMENT_COLUMNS)
+        
+        self.assertEqual(set(columns), set(APPOINTMENT_COLUMNS))
+        self.assertEqual(numpy_patterns(columns), analyze_appointment_patterns(self.appointments))
+    
+    def test_missing_values(self):
+        """Test missing doctor IDs and empty inputs"""
+        from algorithms.numpy_analysis import (
+            APPOINTMENT_COLUMNS, PATIENT_COLUMNS, to_columns,
+            analyze_appointment_patterns as numpy_patterns, analyze_patient_demographics as numpy_demographics
+        )
+        
+        columns = to_columns({
+            "schedule_time": [datetime(2024, 1, 1, 9, 0)] * 2, "status": ["completed"] * 2, "doctor_id": [None, 4],
+        }, APPOINTMENT_COLUMNS)
+        self.assertEqual(columns["doctor_id"].tolist(), [-1, 4])
+        self.assertEqual(numpy_patterns(columns)["top_doctors_by_workload"], {4: 1})
+        
+        self.assertIn("error", numpy_patterns(to_columns({name: [] for name in APPOINTMENT_COLUMNS}, APPOINTMENT_COLUMNS)))
+        self.assertIn("error", numpy_demographics(to_columns({name: [] for name in PATIENT_COLUMNS}, PATIENT_COLUMNS)))
+
+if __name__ == '__main__':
+    unittest.main()
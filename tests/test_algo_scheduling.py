@@ -10,8 +10,9 @@ from datetime import datetime, timedelta
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from algorithms.scheduling import (
-    find_available_slots, optimize_doctor_schedule,
-    detect_scheduling_conflicts, suggest_appointment_slots
+    find_available_slots, find_available_slots_by_day, merge_intervals,
+    optimize_doctor_schedule, detect_scheduling_conflicts, iter_scheduling_conflicts,
+    suggest_appointment_slots
 )
 
 class TestSchedulingAlgorithms(unittest.TestCase):
@@ -51,6 +52,89 @@ class TestSchedulingAlgorithms(unittest.TestCase):
         self.assertNotIn(base_time + timedelta(hours=3), slots)  # 12:00
         self.assertNotIn(base_time + timedelta(hours=3, minutes=30), slots)  # 12:30
     
+    def test_merge_intervals(self):
+        """Test merging overlapping and touching intervals"""
+        base_time = datetime(2023, 1, 1, 9, 0)
+        intervals = [
+            (base_time + timedelta(hours=2), base_time + timedelta(hours=3)),
+            (base_time, base_time + timedelta(minutes=30)),
+            (base_time + timedelta(minutes=15), base_time + timedelta(minutes=45)),
+            (base_time + timedelta(minutes=45), base_time + timedelta(hours=1)),
+            (base_time + timedelta(hours=2, minutes=10), base_time + timedelta(hours=2, minutes=20))
+        ]
+        
+        merged = merge_intervals(intervals)
+        
+        self.assertEqual(merged, [
+            (base_time, base_time + timedelta(hours=1)),
+            (base_time + timedelta(hours=2), base_time + timedelta(hours=3))
+        ])
+    
+    def test_find_available_slots_by_day(self):
+        """Test finding available slots across several days"""
+        class Appointment:
+            def __init__(self, schedule_time, duration, status="scheduled"):
+                self.schedule_time = schedule_time
+                self.duration = duration
+                self.status = status
+        
+        base_time = datetime(2023, 1, 2, 9, 0)  # Monday, 9 AM
+        appointments = [
+            Appointment(base_time, 90),  # Monday 9:00 - 10:30
+            Appointment(base_time + timedelta(days=1, hours=7), 60),  # Tuesday 16:00 - 17:00
+            Appointment(base_time + timedelta(days=1, hours=7, minutes=15), 15),  # Nested in the above
+            Appointment(base_time + timedelta(days=2), 480, "cancelled")  # Wednesday (cancelled)
+        ]
+        
+        slots = find_available_slots_by_day(appointments, "2023-01-02", "2023-01-04", 30, 30)
+        
+        self.assertEqual(len(slots), 3)
+        monday, tuesday, wednesday = (slots[day] for day in sorted(slots))
+        
+        self.assertEqual(len(monday), 13)
+        self.assertEqual(monday[0], base_time + timedelta(hours=1, minutes=30))
+        self.assertEqual(len(tuesday), 14)
+        self.assertEqual(tuesday[-1], base_time + timedelta(days=1, hours=6, minutes=30))
+        self.assertEqual(len(wednesday), 16)
+    
+    def test_find_available_slots_matches_brute_force(self):
+        """Test the sweep against a brute force scan on random data"""
+        import random
+        
+        class Appointment:
+            def __init__(self, schedule_time, duration, status="scheduled"):
+                self.schedule_time = schedule_time
+                self.duration = duration
+                self.status = status
+        
+        rng = random.Random(42)
+        base_time = datetime(2023, 1, 1, 8, 0)
+        appointments = [
+            Appointment(
+                base_time + timedelta(minutes=rng.randrange(0, 600, 5)),
+                rng.choice([10, 15, 30, 45, 60, 90]),
+                rng.choice(["scheduled", "scheduled", "completed", "cancelled"])
+            ) for _ in range(40)
+        ]
+        
+        for duration, interval in [(30, 30), (45, 15), (20, 25)]:
+            start_time = base_time
+            end_time = base_time + timedelta(hours=10)
+            
+            expected = []
+            slot = start_time
+            while slot + timedelta(minutes=duration) <= end_time:
+                slot_end = slot + timedelta(minutes=duration)
+                if not any(
+                    a.status != "cancelled" and slot < a.schedule_time + timedelta(minutes=a.duration)
+                    and slot_end > a.schedule_time
+                    for a in appointments
+                ):
+                    expected.append(slot)
+                slot += timedelta(minutes=interval)
+            
+            self.assertEqual(find_available_slots(appointments, start_time, end_time, duration, interval), expected)
+    
     def test_optimize_doctor_schedule(self):
         """Test optimizing a doctor's schedule"""
         # Create test data
@@ -114,6 +198,58 @@ class TestSchedulingAlgorithms(unittest.TestCase):
         self.assertEqual(conflicts[0][0].id, 1)
         self.assertEqual(conflicts[0][1].id, 2)
     
+    def test_detect_scheduling_conflicts_by_doctor(self):
+        """Test that conflicts are only reported within the same doctor"""
+        class Appointment:
+            def __init__(self, id, doctor_id, patient_id, schedule_time, duration, status="scheduled"):
+                self.id = id
+                self.doctor_id = doctor_id
+                self.patient_id = patient_id
+                self.schedule_time = schedule_time
+                self.duration = duration
+                self.status = status
+        
+        base_time = datetime(2023, 1, 1, 9, 0)
+        appointments = [
+            Appointment(1, 1, 10, base_time, 180),  # 9:00 - 12:00, contains the next two
+            Appointment(2, 1, 11, base_time + timedelta(minutes=30), 30),  # 9:30 - 10:00
+            Appointment(3, 1, 12, base_time + timedelta(hours=1), 30),  # 10:00 - 10:30
+            Appointment(4, 2, 10, base_time + timedelta(minutes=30), 30),  # Other doctor, same time
+            Appointment(5, 2, 13, base_time + timedelta(hours=2), 30)  # Other doctor, no overlap
+        ]
+        
+        conflicts = detect_scheduling_conflicts(appointments)
+        self.assertEqual(sorted((a.id, b.id) for a, b in conflicts), [(1, 2), (1, 3)])
+        
+        # Patient 10 is booked with both doctors at 9:30
+        conflicts = detect_scheduling_conflicts(appointments, by="patient")
+        self.assertEqual([(a.id, b.id) for a, b in conflicts], [(1, 4)])
+        
+        # Without grouping every overlap is reported
+        conflicts = detect_scheduling_conflicts(appointments, by=None)
+        self.assertEqual(len(conflicts), 5)
+    
+    def test_iter_scheduling_conflicts_streams_sorted_input(self):
+        """Test the sweep over input already sorted by doctor and time"""
+        class Appointment:
+            def __init__(self, id, doctor_id, schedule_time, duration):
+                self.id = id
+                self.doctor_id = doctor_id
+                self.schedule_time = schedule_time
+                self.duration = duration
+                self.status = "scheduled"
+        
+        base_time = datetime(2023, 1, 1, 9, 0)
+        rows = iter([
+            Appointment(1, 1, base_time, 60),
+            Appointment(2, 1, base_time + timedelta(minutes=60), 30),  # Touches, no conflict
+            Appointment(3, 2, base_time, 30),
+            Appointment(4, 2, base_time + timedelta(minutes=20), 30)
+        ])
+        
+        conflicts = list(iter_scheduling_conflicts(rows))
+        self.assertEqual([(a.id, b.id) for a, b in conflicts], [(3, 4)])
+    
     def test_suggest_appointment_slots(self):
         """Test suggesting appointment slots based on preferences"""
         # Create test data
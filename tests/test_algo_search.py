@@ -3,6 +3,8 @@ Tests for search algorithms
 """
 import unittest
 import os
+import random
+import re
 import sys
 from datetime import datetime, timedelta
 
@@ -10,6 +12,7 @@ from datetime import datetime, timedelta
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from algorithms.search import (
+    FuzzyIndex, bounded_edit_distance, word_similarity,
     fuzzy_search, binary_search, search_by_regex,
     search_appointments_by_date_range, search_patients_by_age_range
 )
@@ -52,6 +55,82 @@ class TestSearchAlgorithms(unittest.TestCase):
         self.assertEqual(len(results), 1)
         self.assertEqual(results[0].name, "John Smith")
     
+    def test_bounded_edit_distance(self):
+        """Test the bounded Levenshtein distance"""
+        self.assertEqual(bounded_edit_distance("kitten", "sitting", 5), 3)
+        self.assertEqual(bounded_edit_distance("kitten", "sitting", 2), 3)
+        self.assertEqual(bounded_edit_distance("", "abc", 5), 3)
+        self.assertEqual(bounded_edit_distance("same", "same", 0), 0)
+        self.assertEqual(word_similarity("jon", "john"), 1 - 2 / 7)
+    
+    def test_fuzzy_index_matches_brute_force(self):
+        """Test that trigram pruning never drops a match"""
+        class Person:
+            def __init__(self, name, email):
+                self.name = name
+                self.email = email
+        
+        rng = random.Random(7)
+        alphabet = "abcdeghijlmnorstu"
+        
+        def word():
+            return "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 9)))
+        
+        people = [Person(f"{word()} {word()}", f"{word()}@{word()}.com") for _ in range(150)]
+        index = FuzzyIndex(["name", "email"], people)
+        
+        def brute_force(term, threshold):
+            term = term.lower()
+            matches = {}
+            for position, person in enumerate(people):
+                best = 0
+                for value in (person.name.lower(), person.email.lower()):
+                    if term in value:
+                        score = 1.0
+                    else:
+                        words = re.findall(r"\w+", value)
+                        score = min(
+                            max((word_similarity(q, w) for w in words), default=0)
+                            for q in re.findall(r"\w+", term)
+                        )
+                    best = max(best, score)
+                if best >= threshold:
+                    matches[position] = best
+            return matches
+        
+        for _ in range(40):
+            term = rng.choice([word(), f"{word()} {word()}", people[rng.randrange(150)].name[:5]])
+            threshold = rng.choice([0.3, 0.5, 0.6, 0.8])
+            expected = brute_force(term, threshold)
+            self.assertEqual(index.scores(term, threshold), expected, (term, threshold))
+    
+    def test_fuzzy_index_add_remove(self):
+        """Test incremental updates of the fuzzy index"""
+        class Person:
+            def __init__(self, name):
+                self.name = name
+        
+        john, jane = Person("John Doe"), Person("Jane Doe")
+        index = FuzzyIndex(["name"], [john])
+        self.assertEqual(index.search("jon", threshold=0.5), [john])
+        
+        index.add(jane)
+        self.assertEqual(len(index), 2)
+        self.assertEqual(index.search("doe"), [john, jane])
+        
+        self.assertTrue(index.remove(john))
+        self.assertFalse(index.remove(john))
+        self.assertNotIn(john, index)
+        self.assertEqual(index.search("doe"), [jane])
+        self.assertEqual(index.search("jon", threshold=0.5), [])
+        
+        # Re-adding an item picks up its changed fields
+        jane.name = "Jane Smith"
+        index.add(jane)
+        self.assertEqual(len(index), 1)
+        self.assertEqual(index.search("doe"), [])
+        self.assertEqual(index.search("smyth"), [jane])
+    
     def test_binary_search(self):
         """Test binary search algorithm"""
         # Create sorted test data
@@ -0,0 +1,106 @@
+"""
+Tests for configuration loading
+"""
+import unittest
+import os
+import sys
+import json
+import tempfile
+from unittest.mock import patch
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from config import load_config, apply_sqlite_profile, engine_options
+from db.pool import MonitoredQueuePool
+
+class TestSQLiteProfile(unittest.TestCase):
+    """Test cases for the SQLite tuning profile"""
+    
+    def setUp(self):
+        """Set up a temporary working directory"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, "test.db")
+    
+    def tearDown(self):
+        """Clean up after tests"""
+        self.temp_dir.cleanup()
+    
+    def pragmas(self, engine, *names):
+        with engine.connect() as connection:
+            return [connection.exec_driver_sql(f"PRAGMA {name}").scalar() for name in names]
+    
+    def test_profile_applied_on_connect(self):
+        """Test that every new connection gets the profile"""
+        engine = create_engine(f"sqlite:///{self.db_path}")
+        self.assertTrue(apply_sqlite_profile(engine))
+        
+        self.assertEqual(
+            self.pragmas(engine, "journal_mode", "synchronous", "temp_store", "busy_timeout", "foreign_keys"),
+            ["wal", 1, 2, 5000, 1]
+        )
+        engine.dispose()
+    
+    def test_profile_from_config_file(self):
+        """Test overriding and disabling the profile from config.json"""
+        config_file = os.path.join(self.temp_dir.name, "config.json")
+        with open(config_file, "w") as f:
+            json.dump({"sqlite": {"synchronous": "FULL", "mmap_size": None}}, f)
+        
+        env = {
+            "DB_URL": f"sqlite:///{self.db_path}",
+            "CONFIG_FILE": config_file,
+            "EXPORT_DIR": os.path.join(self.temp_dir.name, "exports"),
+        }
+        with patch.dict(os.environ, env):
+            config = load_config()
+        
+        engine = config["db_engine"]
+        self.assertEqual(self.pragmas(engine, "journal_mode", "synchronous", "mmap_size"), ["wal", 2, 0])
+        engine.dispose()
+        
+        with open(config_file, "w") as f:
+            json.dump({"sqlite": {"enabled": False}}, f)
+        with patch.dict(os.environ, env):
+            config = load_config()
+        
+        engine = config["db_engine"]
+        self.assertEqual(self.pragmas(engine, "synchronous", "foreign_keys"), [2, 0])
+        engine.dispose()
+
+class TestEngineOptions(unittest.TestCase):
+    """Test cases for the pool and timeout engine options"""
+    
+    def database(self, url, **overrides):
+        settings = {
+            "url": url, "pool_size": 3, "max_overflow": 2, "pool_timeout": 5.0,
+            "pool_recycle": 600, "pool_pre_ping": True, "statement_timeout": 0,
+        }
+        settings.update(overrides)
+        return settings
+    
+    def test_pooled_engines(self):
+        """Test that server and file databases get a sized, monitored pool"""
+        options = engine_options(self.database("postgresql://localhost/meditrack", statement_timeout=15000))
+        self.assertIs(options["poolclass"], MonitoredQueuePool)
+        self.assertEqual((options["pool_size"], options["max_overflow"], options["pool_recycle"]), (3, 2, 600))
+        self.assertTrue(options["pool_pre_ping"])
+        self.assertEqual(options["connect_args"], {"options": "-c statement_timeout=15000"})
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            url = f"sqlite:///{os.path.join(temp_dir, 'test.db')}"
+            engine = create_engine(url, **engine_options(self.database(url)))
+            with engine.connect():
+                pass
+            self.assertIsInstance(engine.pool, MonitoredQueuePool)
+            self.assertEqual(engine.pool.size(), 3)
+            engine.dispose()
+    
+    def test_in_memory_sqlite(self):
+        """Test that in-memory SQLite keeps SQLAlchemy's default pool"""
+        self.assertEqual(engine_options(self.database("sqlite://")), {})
+        self.assertEqual(engine_options(self.database("sqlite:///:memory:")), {})
+
+if __name__ == '__main__':
+    unittest.main()
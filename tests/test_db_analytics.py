@@ -0,0 +1,172 @@
+"""
+Tests for the SQL analysis reports
+"""
+import unittest
+import importlib.util
+import os
+import sys
+from datetime import date, datetime, timedelta
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import selectinload, sessionmaker
+from db.models import Base, Patient, Doctor, PatientMedicalRecord, LabTest, Appointment
+from db.analytics import AnalyticsRepository, years_before
+from db.repository import PatientRepository, AppointmentRepository, MedicalRecordRepository
+from algorithms.data_analysis import (
+    analyze_patient_demographics, analyze_appointment_patterns, analyze_medical_conditions
+)
+
+class TestAnalyticsRepository(unittest.TestCase):
+    """Test that the SQL reports match the Python implementations"""
+    
+    TODAY = date(2024, 3, 15)
+    
+    def setUp(self):
+        """Set up test database"""
+        self.engine = create_engine('sqlite:///:memory:')
+        Base.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+        self.repo = AnalyticsRepository(self.session)
+        self.create_test_data()
+    
+    def tearDown(self):
+        """Clean up after tests"""
+        self.session.close()
+    
+    def create_test_data(self):
+        """Create patients of every age group, appointments and medical records"""
+        # Birthdays on both sides of each age group boundary
+        dobs = [
+            date(2010, 6, 1), date(2005, 3, 16), date(2005, 3, 15), date(1988, 3, 16),
+            date(1988, 3, 15), date(1973, 1, 1), date(1958, 3, 16), date(1958, 3, 15), date(1940, 2, 29),
+        ]
+        insurance = ["BlueCross #1", "BlueCross #2", "Aetna #3", None, "", "  Cigna #4", "Aetna", None, "Kaiser"]
+        patients = [
+            Patient(first_name=f"Patient{i}", last_name="Stats", dob=dob, email=f"stats{i}@example.com",
+                    patient_id=f"P{i:08d}", insurance_info=insurance[i], reg_date=date(2023, 1 + i % 3, 10))
+            for i, dob in enumerate(dobs)
+        ]
+        doctors = [
+            Doctor(first_name=f"Doctor{i}", last_name="Stats", dob=date(1970, 1, 1), email=f"doc{i}@example.com",
+                   staff_id=f"D{i:08d}", role="Doctor", specialisation="Cardiology", license_number=f"MD{i:05d}")
+            for i in range(7)
+        ]
+        self.session.add_all(patients + doctors)
+        self.session.flush()
+        
+        statuses = ["scheduled", "completed", "cancelled", "no-show"]
+        start = datetime(2024, 1, 1, 8, 0)  # a Monday
+        for i in range(60):
+            self.session.add(Appointment(
+                patient_id=patients[i % len(patients)].id, doctor_id=doctors[i * i % 7].id,
+                schedule_time=start + timedelta(days=i % 9, hours=i % 10), duration=30,
+                status=statuses[i % 7 % 4]
+            ))
+        
+        diagnoses = ["Hypertension", "Diabetes, Hypertension", "Asthma", "Diabetes,Asthma"]
+        for i in range(12):
+            record = PatientMedicalRecord(
+                patient_id=patients[i % len(patients)].id, diagnosis=diagnoses[i % 4],
+                treatment_plan="Rest, Fluids" if i % 3 else "Medication"
+            )
+            self.session.add(record)
+            self.session.flush()
+            for j in range(i % 3):
+                self.session.add(LabTest(
+                    record_id=record.record_id, test_name=f"Test{(i + j) % 4}", test_type="Blood",
+                    ordered_date=date(2024, 1, 1), is_abnormal=(i + j) % 2 == 0
+                ))
+        self.session.commit()
+    
+    def count_queries(self, func):
+        """Result of func and the number of statements it sent"""
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(self.engine, "before_cursor_execute", listener)
+        try:
+            return func(), len(statements)
+        finally:
+            event.remove(self.engine, "before_cursor_execute", listener)
+    
+    def test_patient_demographics(self):
+        """Test age groups, insurance types and registration months"""
+        from unittest.mock import patch
+        import algorithms.data_analysis as data_analysis
+        
+        with patch.object(data_analysis, "datetime") as mock_datetime:
+            mock_datetime.now.return_value = datetime.combine(self.TODAY, datetime.min.time())
+            expected = analyze_patient_demographics(PatientRepository(self.session).get_all())
+        
+        results, queries = self.count_queries(lambda: self.repo.patient_demographics(today=self.TODAY))
+        self.assertEqual(results, expected)
+        self.assertEqual(queries, 3)
+        self.assertEqual(
+            [group["count"] for group in results["age_distribution"].values()], [2, 2, 1, 2, 2]
+        )
+        self.assertEqual(
+            {name: value["count"] for name, value in results["insurance_distribution"].items()},
+            {"BlueCross": 2, "Aetna": 2, "Cigna": 1, "Kaiser": 1}
+        )
+    
+    def test_appointment_patterns(self):
+        """Test weekday, hour, status and doctor workload aggregates"""
+        expected = analyze_appointment_patterns(
+            AppointmentRepository(self.session).get_all(options=[selectinload(Appointment.doctor)])
+        )
+        results, queries = self.count_queries(self.repo.appointment_patterns)
+        
+        self.assertEqual(queries, 3)
+        self.assertEqual(
+            {key: value for key, value in results.items() if key != "top_doctors_by_workload"},
+            {key: value for key, value in expected.items() if key != "top_doctors_by_workload"}
+        )
+        # The same workloads, ties ordered by doctor ID
+        self.assertEqual(sorted(results["top_doctors_by_workload"].values(), reverse=True),
+                         list(expected["top_doctors_by_workload"].values()))
+        self.assertEqual(sum(results["days_of_week_distribution"].values()), 60)
+    
+    def test_medical_conditions(self):
+        """Test diagnosis, treatment and abnormal lab test aggregates"""
+        expected = analyze_medical_conditions(MedicalRecordRepository(self.session).iter_for_analysis())
+        results = self.repo.medical_conditions()
+        
+        self.assertEqual(results, expected)
+        self.assertEqual(results["top_diagnoses"], {"Hypertension": 6, "Diabetes": 6, "Asthma": 6})
+    
+    @unittest.skipUnless(importlib.util.find_spec("numpy"), "NumPy is required for the vectorized analysis")
+    def test_numpy_columns(self):
+        """Test that the loaded columns give the same reports through the NumPy functions"""
+        from algorithms import numpy_analysis
+        
+        self.assertEqual(
+            numpy_analysis.analyze_patient_demographics(self.repo.load_patient_columns(), today=self.TODAY),
+            self.repo.patient_demographics(today=self.TODAY)
+        )
+        
+        columns, queries = self.count_queries(self.repo.load_appointment_columns)
+        self.assertEqual(queries, 1)
+        self.assertEqual(set(columns), {"schedule_time", "status", "doctor_id"})
+        expected = analyze_appointment_patterns(
+            AppointmentRepository(self.session).get_all(options=[selectinload(Appointment.doctor)])
+        )
+        self.assertEqual(numpy_analysis.analyze_appointment_patterns(columns), expected)
+    
+    def test_empty_database(self):
+        """Test the error results when there is nothing to analyze"""
+        for table in reversed(Base.metadata.sorted_tables):
+            self.session.execute(table.delete())
+        
+        self.assertIn("error", self.repo.patient_demographics())
+        self.assertIn("error", self.repo.appointment_patterns())
+        self.assertIn("error", self.repo.medical_conditions())
+    
+    def test_years_before(self):
+        """Test the age group cutoff dates"""
+        self.assertEqual(years_before(date(2024, 3, 15), 19), date(2005, 3, 15))
+        self.assertEqual(years_before(date(2024, 2, 29), 1), date(2023, 2, 28))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+"""
+Tests for the async repositories and services
+"""
+import unittest
+import asyncio
+import importlib.util
+import os
+import sys
+import tempfile
+from datetime import date, datetime
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db.models import Base, Patient, Doctor, Appointment
+
+ASYNC_AVAILABLE = all(importlib.util.find_spec(name) for name in ("greenlet", "aiosqlite"))
+
+@unittest.skipUnless(ASYNC_AVAILABLE, "greenlet and aiosqlite are required for the async repositories")
+class TestAsyncRepositories(unittest.IsolatedAsyncioTestCase):
+    """Test cases for the async repositories and services"""
+    
+    async def asyncSetUp(self):
+        """Set up a file database with a patient and a doctor"""
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+        
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(self.temp_dir.name, 'test.db')}")
+        async with self.engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+        
+        self.Session = async_sessionmaker(self.engine, expire_on_commit=False)
+        doctor = Doctor(first_name="Jane", last_name="Smith", dob=date(1975, 5, 15),
+                        email="jane.smith@example.com", staff_id="D001", role="Doctor",
+                        department="Cardiology", specialisation="Cardiology", license_number="MD12345")
+        async with self.Session() as session:
+            session.add(Patient(first_name="John", last_name="Doe", dob=date(1980, 1, 1),
+                                email="john.doe@example.com", patient_id="P001"))
+            session.add(doctor)
+            await session.commit()
+        self.doctor_id = doctor.id
+    
+    async def asyncTearDown(self):
+        """Clean up after tests"""
+        await self.engine.dispose()
+        self.temp_dir.cleanup()
+    
+    async def test_repository_reads_and_writes(self):
+        """Test that async repositories share the sync repositories' behaviour"""
+        from db.async_repository import AsyncPatientRepository
+        
+        async with self.Session() as session:
+            repo = AsyncPatientRepository(session)
+            self.assertEqual((await repo.get_by_patient_id("P001")).first_name, "John")
+            self.assertEqual([p.last_name for p in await repo.search("John")], ["Doe"])
+            
+            async with repo.unit_of_work():
+                await repo.create(Patient(first_name="Ann", last_name="Lee", dob=date(1990, 2, 2),
+                                          email="ann.lee@example.com", patient_id="P002"))
+            
+            page, cursor = await repo.get_page(limit=1)
+            self.assertEqual([p.patient_id for p in page], ["P001"])
+            self.assertIsNotNone(cursor)
+            self.assertEqual([p.patient_id async for p in repo.iter_all()], ["P001", "P002"])
+    
+    async def test_unit_of_work_rollback(self):
+        """Test that an error inside an async unit of work rolls it back"""
+        from db.async_repository import AsyncPatientRepository
+        
+        async with self.Session() as session:
+            repo = AsyncPatientRepository(session)
+            with self.assertRaises(RuntimeError):
+                async with repo.unit_of_work():
+                    await repo.create(Patient(first_name="Ann", last_name="Lee", dob=date(1990, 2, 2),
+                                              email="ann.lee@example.com", patient_id="P002"))
+                    raise RuntimeError("abort")
+            
+            self.assertEqual(len(await repo.get_all()), 1)
+    
+    async def test_booking(self):
+        """Test booking appointments through the async service and repository"""
+        from db.async_repository import AsyncAppointmentRepository, AsyncDoctorRepository, AsyncPatientRepository
+        from domain.async_services import AsyncAppointmentService
+        
+        async with self.Session() as session:
+            patient_repo = AsyncPatientRepository(session)
+            patient_id = (await patient_repo.get_by_patient_id("P001")).id
+            appointment_repo = AsyncAppointmentRepository(session)
+            service = AsyncAppointmentService(appointment_repo, patient_repo, AsyncDoctorRepository(session))
+            
+            booked = await service.create_appointment(patient_id, self.doctor_id, datetime(2030, 1, 1, 9, 0), 30)
+            self.assertEqual(booked.status, "scheduled")
+            with self.assertRaises(ValueError):
+                await service.create_appointment(patient_id, self.doctor_id, datetime(2030, 1, 1, 9, 15), 30)
+            
+            # The repository call on its own, inside a unit of work
+            async with appointment_repo.unit_of_work():
+                created = await appointment_repo.create_if_available(Appointment(
+                    patient_id=patient_id, doctor_id=self.doctor_id,
+                    schedule_time=datetime(2030, 1, 1, 10, 0), duration=30
+                ))
+            self.assertIsNotNone(created)
+            self.assertIsNone(await appointment_repo.create_if_available(Appointment(
+                patient_id=patient_id, doctor_id=self.doctor_id, schedule_time=datetime(2030, 1, 1, 10, 15), duration=30
+            )))
+            self.assertEqual(len(await appointment_repo.get_all()), 2)
+    
+    async def test_concurrent_services(self):
+        """Test availability lookups and searches running concurrently, one session per task"""
+        from db.async_repository import AsyncAppointmentRepository, AsyncDoctorRepository, AsyncPatientRepository
+        from domain.async_services import AsyncAppointmentService, AsyncSearchService
+        
+        async def lookup(day):
+            async with self.Session() as session:
+                repos = (AsyncAppointmentRepository(session), AsyncPatientRepository(session),
+                         AsyncDoctorRepository(session))
+                return await AsyncAppointmentService(*repos).find_available_slots(self.doctor_id, date(2030, 1, day))
+        
+        async def search():
+            async with self.Session() as session:
+                service = AsyncSearchService(AsyncPatientRepository(session), AsyncDoctorRepository(session),
+                                             AsyncAppointmentRepository(session), None)
+                return await service.search_doctors("Smith")
+        
+        results = await asyncio.gather(*(lookup(day) for day in range(1, 6)), search())
+        self.assertEqual([len(slots) for slots in results[:5]], [16] * 5)
+        self.assertEqual([d.last_name for d in results[5]], ["Smith"])
+
+if __name__ == '__main__':
+    unittest.main()
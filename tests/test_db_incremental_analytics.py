@@ -0,0 +1,219 @@
+"""
+Tests for the incrementally refreshed analysis reports
+"""
+import unittest
+import os
+import sys
+from datetime import date, datetime, timedelta
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import selectinload, sessionmaker
+from db.models import (
+    Base, Patient, Doctor, PatientMedicalRecord, LabTest, Appointment, AppointmentChange, AnalyticsState
+)
+from db.incremental_analytics import IncrementalAnalytics
+from db.repository import AppointmentRepository, MedicalRecordRepository
+from algorithms.data_analysis import (
+    AppointmentPatternsAccumulator, analyze_appointment_patterns, analyze_medical_conditions
+)
+
+class TestIncrementalAnalytics(unittest.TestCase):
+    """Test that refreshed reports match a full recount"""
+    
+    def setUp(self):
+        """Set up test database"""
+        self.engine = create_engine('sqlite:///:memory:')
+        Base.metadata.create_all(self.engine)
+        self.Session = sessionmaker(bind=self.engine)
+        self.session = self.Session()
+        self.analytics = IncrementalAnalytics(self.session)
+        self.create_test_data()
+    
+    def tearDown(self):
+        """Clean up after tests"""
+        self.session.close()
+    
+    def create_test_data(self):
+        """Create a patient, doctors with different workloads, appointments and medical records"""
+        self.patient = Patient(first_name="Incremental", last_name="Stats", dob=date(1980, 1, 1),
+                               email="stats@example.com", patient_id="P00000001")
+        self.doctors = [
+            Doctor(first_name=f"Doctor{i}", last_name="Stats", dob=date(1970, 1, 1), email=f"doc{i}@example.com",
+                   staff_id=f"D{i:08d}", role="Doctor", specialisation="Cardiology", license_number=f"MD{i:05d}")
+            for i in range(4)
+        ]
+        self.session.add_all([self.patient] + self.doctors)
+        self.session.flush()
+        
+        for i in range(20):
+            self.add_appointment(i)
+        for i in range(6):
+            self.add_record(i)
+        self.session.commit()
+    
+    def add_appointment(self, i, status="scheduled"):
+        """Add the i-th appointment; lower-numbered doctors get more appointments"""
+        self.session.add(Appointment(
+            patient_id=self.patient.id, doctor_id=self.doctors[min(i % 7, 3)].id,
+            schedule_time=datetime(2024, 1, 1, 8, 0) + timedelta(days=i % 9, hours=i % 6),
+            duration=30, status=status
+        ))
+    
+    def add_record(self, i, abnormal=True):
+        """Add the i-th medical record with one lab test"""
+        record = PatientMedicalRecord(
+            patient_id=self.patient.id, diagnosis=["Asthma", "Flu, Asthma", "Diabetes"][i % 3],
+            treatment_plan=["Rest, Fluids", "Medication"][i % 2]
+        )
+        self.session.add(record)
+        self.session.flush()
+        self.session.add(LabTest(record_id=record.record_id, test_name=f"Test{i % 3}", test_type="Blood",
+                                 ordered_date=date(2024, 1, 1), is_abnormal=abnormal))
+    
+    def expected_appointment_patterns(self):
+        """Appointment patterns recounted from every appointment"""
+        return analyze_appointment_patterns(
+            AppointmentRepository(self.session).get_all(options=[selectinload(Appointment.doctor)])
+        )
+    
+    def count_queries(self, func):
+        """Result of func and the statements it sent"""
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(self.engine, "before_cursor_execute", listener)
+        try:
+            return func(), statements
+        finally:
+            event.remove(self.engine, "before_cursor_execute", listener)
+    
+    def test_change_log(self):
+        """Test that changes of the counted columns are logged with old and new values"""
+        appointment = self.session.get(Appointment, 1)
+        appointment.status = "cancelled"
+        _, statements = self.count_queries(self.session.commit)
+        # The old values come from the loaded attributes, not another SELECT
+        self.assertFalse([sql for sql in statements if sql.startswith("SELECT")])
+        appointment.notes = "Called to cancel"
+        self.session.commit()
+        self.session.delete(self.session.get(Appointment, 2))
+        self.session.commit()
+        
+        changes = self.session.query(AppointmentChange).order_by(AppointmentChange.change_id).all()
+        self.assertEqual(len(changes), 2)
+        self.assertEqual((changes[0].appointment_id, changes[0].old_status, changes[0].new_status),
+                         (1, "scheduled", "cancelled"))
+        self.assertEqual(changes[0].new_schedule_time, changes[0].old_schedule_time)
+        self.assertEqual((changes[1].appointment_id, changes[1].new_schedule_time), (2, None))
+        
+        # Values that are not loaded are read from the database
+        appointment = self.session.get(Appointment, 3)
+        old_doctor_id = appointment.doctor_id
+        self.session.expire(appointment, ["doctor_id", "status"])
+        appointment.doctor_id = self.doctors[3].id
+        self.session.commit()
+        change = self.session.query(AppointmentChange).order_by(AppointmentChange.change_id.desc()).first()
+        self.assertEqual((change.old_doctor_id, change.old_status, change.new_status),
+                         (old_doctor_id, "scheduled", "scheduled"))
+    
+    def test_appointment_patterns(self):
+        """Test refreshing with new, changed and deleted appointments"""
+        self.assertEqual(self.analytics.appointment_patterns(), self.expected_appointment_patterns())
+        saved = self.session.get(AnalyticsState, IncrementalAnalytics.APPOINTMENT_PATTERNS)
+        self.assertEqual(saved.watermarks, {"appointment_id": 20, "change_id": 0})
+        
+        # A cancellation, a reschedule to another doctor, a deletion and new bookings
+        self.session.get(Appointment, 1).status = "cancelled"
+        appointment = self.session.get(Appointment, 3)
+        appointment.schedule_time = datetime(2024, 2, 3, 15, 0)
+        appointment.doctor_id = self.doctors[3].id
+        self.session.delete(self.session.get(Appointment, 4))
+        for i in range(20, 25):
+            self.add_appointment(i, status="no-show")
+        self.session.commit()
+        
+        # The new appointments are changed before they are ever counted
+        self.session.get(Appointment, 21).status = "completed"
+        self.session.commit()
+        
+        results, statements = self.count_queries(self.analytics.appointment_patterns)
+        self.assertEqual(results, self.expected_appointment_patterns())
+        self.assertEqual(results["status_distribution"]["no-show"], 4)
+        self.assertEqual(self.session.get(AnalyticsState, IncrementalAnalytics.APPOINTMENT_PATTERNS).watermarks,
+                         {"appointment_id": 25, "change_id": 4})
+        # Applied changes are pruned from the log
+        self.assertEqual(self.session.query(AppointmentChange).count(), 0)
+        
+        # Only the rows past the watermark are read
+        reads = [sql for sql in statements if "FROM appointments" in sql and "max(" not in sql]
+        self.assertEqual(len(reads), 1)
+        self.assertIn("appointment_id >", reads[0])
+        
+        # Nothing new
+        self.assertEqual(self.analytics.appointment_patterns(), results)
+        self.assertEqual(self.analytics.appointment_patterns(full=True), results)
+    
+    def test_bulk_upsert(self):
+        """Test that appointment changes made with bulk_upsert are logged and refreshed"""
+        self.analytics.appointment_patterns()
+        
+        AppointmentRepository(self.session).bulk_upsert([
+            {"appointment_id": 1, "status": "cancelled"},
+            {"appointment_id": 2, "notes": "Bring test results"},
+            {"appointment_id": 3, "doctor_id": self.doctors[3].id, "schedule_time": datetime(2024, 2, 3, 15, 0)},
+            {"appointment_id": 5, "status": "scheduled"},
+        ])
+        
+        changes = self.session.query(AppointmentChange).order_by(AppointmentChange.change_id).all()
+        self.assertEqual([change.appointment_id for change in changes], [1, 3])
+        self.assertEqual((changes[0].old_status, changes[0].new_status), ("scheduled", "cancelled"))
+        self.assertEqual(changes[1].new_doctor_id, self.doctors[3].id)
+        self.assertEqual(changes[1].new_status, changes[1].old_status)
+        self.assertEqual(self.analytics.appointment_patterns(), self.expected_appointment_patterns())
+    
+    def test_saved_state(self):
+        """Test that the counts survive a new session with their key types"""
+        results = self.analytics.appointment_patterns()
+        
+        session = self.Session()
+        try:
+            saved = session.get(AnalyticsState, IncrementalAnalytics.APPOINTMENT_PATTERNS)
+            accumulator = AppointmentPatternsAccumulator.from_state(saved.state)
+            self.assertEqual(accumulator.finalize(), results)
+            self.assertTrue(all(isinstance(doctor_id, int) for doctor_id in accumulator.doctor_appointments))
+            self.assertEqual(IncrementalAnalytics(session).appointment_patterns(), results)
+        finally:
+            session.close()
+    
+    def test_medical_conditions(self):
+        """Test refreshing with new records and later lab results"""
+        expected = lambda: analyze_medical_conditions(MedicalRecordRepository(self.session).iter_for_analysis())
+        self.assertEqual(self.analytics.medical_conditions(), expected())
+        
+        for i in range(6, 9):
+            self.add_record(i, abnormal=False)
+        self.session.commit()
+        test = self.session.query(LabTest).filter(LabTest.is_abnormal == False).first()
+        test.is_abnormal = True
+        self.session.commit()
+        
+        results = self.analytics.medical_conditions()
+        self.assertEqual(results, expected())
+        self.assertEqual(results["total_records"], 9)
+        self.assertEqual(
+            self.session.get(AnalyticsState, IncrementalAnalytics.MEDICAL_CONDITIONS).watermarks, {"record_id": 9}
+        )
+    
+    def test_empty_database(self):
+        """Test the error results when there is nothing to analyze"""
+        for table in reversed(Base.metadata.sorted_tables):
+            self.session.execute(table.delete())
+        self.session.commit()
+        
+        self.assertIn("error", self.analytics.appointment_patterns())
+        self.assertIn("error", self.analytics.medical_conditions())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -9,7 +9,7 @@ from datetime import datetime, timedelta
 # Add parent directory to path to import modules
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, select
 from sqlalchemy.orm import sessionmaker
 from db.models import Base, Person, Patient, Staff, Doctor, PatientMedicalRecord, Prescription, LabTest, Appointment
 
@@ -291,6 +291,42 @@ class TestDatabaseModels(unittest.TestCase):
         self.assertEqual(queried_appointment.duration, 30)
         self.assertEqual(queried_appointment.status, "scheduled")
         self.assertEqual(queried_appointment.notes, "Follow-up appointment")
+    
+    def test_polymorphic_loading(self):
+        """Test that mixed Person and Staff queries load subclass columns without per-row queries"""
+        for i in range(3):
+            self.session.add(Patient(
+                first_name=f"Patient{i}", last_name="Poly", dob=datetime(1980, 1, 1).date(),
+                email=f"patient{i}@example.com", patient_id=f"P{i:08d}"
+            ))
+            self.session.add(Doctor(
+                first_name=f"Doctor{i}", last_name="Poly", dob=datetime(1970, 1, 1).date(),
+                email=f"doctor{i}@example.com", staff_id=f"D{i:08d}", role="Doctor",
+                specialisation="Cardiology", license_number=f"MD{i:05d}"
+            ))
+        self.session.add(Staff(
+            first_name="Nurse", last_name="Poly", dob=datetime(1990, 1, 1).date(),
+            email="nurse@example.com", staff_id="S00000001", role="Nurse"
+        ))
+        self.session.commit()
+        self.session.expunge_all()
+        
+        statements = []
+        event.listen(self.engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+        
+        # Base query plus one SELECT ... IN each for patients and staff (doctors inline)
+        persons = self.session.execute(select(Person)).scalars().all()
+        self.assertEqual(len(statements), 3)
+        self.assertEqual(
+            sorted(p.patient_id if isinstance(p, Patient) else p.staff_id for p in persons),
+            ["D00000000", "D00000001", "D00000002", "P00000000", "P00000001", "P00000002", "S00000001"]
+        )
+        self.assertEqual(len(statements), 3)
+        
+        self.session.expunge_all()
+        staff = self.session.execute(select(Staff)).scalars().all()
+        self.assertEqual(sorted(getattr(s, "specialisation", "-") for s in staff), ["-"] + ["Cardiology"] * 3)
+        self.assertEqual(len(statements), 4)
 
 if __name__ == '__main__':
     unittest.main()
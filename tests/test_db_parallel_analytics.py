@@ -0,0 +1,120 @@
+"""
+Tests for the parallel analysis over primary key ranges
+"""
+import unittest
+import os
+import sys
+import tempfile
+from datetime import date, datetime, timedelta
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import selectinload, sessionmaker
+from db.models import Base, Patient, Doctor, PatientMedicalRecord, LabTest, Appointment
+from db.parallel_analytics import analyze_in_parallel, key_ranges
+from db.repository import PatientRepository, AppointmentRepository, MedicalRecordRepository
+from algorithms.data_analysis import (
+    DemographicsAccumulator, analyze_appointment_patterns, analyze_medical_conditions
+)
+
+class TestParallelAnalytics(unittest.TestCase):
+    """Test that the parallel reports match the single-process ones"""
+    
+    TODAY = date(2024, 3, 15)
+    
+    def setUp(self):
+        """Set up a file database the worker processes can open"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.database = {
+            "url": f"sqlite:///{os.path.join(self.temp_dir.name, 'test.db')}",
+            "pool_size": 1, "max_overflow": 0, "pool_timeout": 30, "pool_recycle": 1800, "pool_pre_ping": False,
+        }
+        self.engine = create_engine(self.database["url"])
+        Base.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+        self.create_test_data()
+    
+    def tearDown(self):
+        """Clean up after tests"""
+        self.session.close()
+        self.engine.dispose()
+        self.temp_dir.cleanup()
+    
+    def create_test_data(self):
+        """Create patients, doctors with tied workloads, appointments and medical records"""
+        patients = [
+            Patient(first_name=f"Patient{i}", last_name="Stats", dob=date(1950 + 3 * i, 1 + i % 12, 1),
+                    email=f"stats{i}@example.com", patient_id=f"P{i:08d}",
+                    insurance_info=["Aetna #1", "Cigna #2", None][i % 3], reg_date=date(2023, 1 + i % 12, 5))
+            for i in range(20)
+        ]
+        doctors = [
+            Doctor(first_name=f"Doctor{i}", last_name="Stats", dob=date(1970, 1, 1), email=f"doc{i}@example.com",
+                   staff_id=f"D{i:08d}", role="Doctor", specialisation="Cardiology", license_number=f"MD{i:05d}")
+            for i in range(7)
+        ]
+        self.session.add_all(patients + doctors)
+        self.session.flush()
+        
+        statuses = ["scheduled", "completed", "cancelled", "no-show"]
+        start = datetime(2024, 1, 1, 8, 0)
+        for i in range(70):
+            self.session.add(Appointment(
+                patient_id=patients[i % len(patients)].id, doctor_id=doctors[(6 - i) % 7].id,
+                schedule_time=start + timedelta(days=i % 11, hours=i % 9), duration=30, status=statuses[i % 4]
+            ))
+        
+        for i in range(15):
+            record = PatientMedicalRecord(
+                patient_id=patients[i].id, diagnosis=["Asthma", "Flu, Asthma", "Diabetes"][i % 3],
+                treatment_plan="Rest, Fluids"
+            )
+            self.session.add(record)
+            self.session.flush()
+            self.session.add(LabTest(
+                record_id=record.record_id, test_name=f"Test{i % 4}", test_type="Blood",
+                ordered_date=date(2024, 1, 1), is_abnormal=i % 2 == 0
+            ))
+        self.session.commit()
+    
+    def test_matches_single_process(self):
+        """Test every analysis on two workers against one pass in this process"""
+        expected = {
+            "patients": DemographicsAccumulator(self.TODAY).update(PatientRepository(self.session).iter_all()).finalize(),
+            "appointments": analyze_appointment_patterns(
+                AppointmentRepository(self.session).iter_all(options=[selectinload(Appointment.doctor)])
+            ),
+            "medical_records": analyze_medical_conditions(MedicalRecordRepository(self.session).iter_for_analysis()),
+        }
+        
+        for analysis, result in expected.items():
+            with self.subTest(analysis=analysis):
+                self.assertEqual(
+                    analyze_in_parallel(analysis, self.database, workers=2, chunks_per_worker=3, today=self.TODAY),
+                    result
+                )
+    
+    def test_empty_table(self):
+        """Test the error result when the table is empty"""
+        self.session.query(Appointment).delete()
+        self.session.commit()
+        
+        self.assertIn("error", analyze_in_parallel("appointments", self.database, workers=2))
+    
+    def test_rejects_unusable_arguments(self):
+        """Test unknown analyses and in-memory databases"""
+        with self.assertRaises(ValueError):
+            analyze_in_parallel("prescriptions", self.database)
+        with self.assertRaises(ValueError):
+            analyze_in_parallel("appointments", {**self.database, "url": "sqlite://"})
+    
+    def test_key_ranges(self):
+        """Test splitting primary keys into consecutive ranges"""
+        self.assertEqual(key_ranges(1, 10, 3), [(1, 4), (4, 7), (7, 11)])
+        self.assertEqual(key_ranges(5, 6, 8), [(5, 6), (6, 7)])
+        self.assertEqual(key_ranges(3, 3, 4), [(3, 4)])
+
+if __name__ == '__main__':
+    unittest.main()
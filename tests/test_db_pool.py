@@ -0,0 +1,63 @@
+"""
+Tests for connection pool telemetry
+"""
+import unittest
+import os
+import sys
+import tempfile
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError
+from db.pool import MonitoredQueuePool, pool_stats, format_pool_stats
+
+class TestPoolStats(unittest.TestCase):
+    """Test cases for MonitoredQueuePool and pool_stats"""
+    
+    def setUp(self):
+        """Set up a pooled file database"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.engine = create_engine(
+            f"sqlite:///{os.path.join(self.temp_dir.name, 'test.db')}",
+            poolclass=MonitoredQueuePool, pool_size=1, max_overflow=1, pool_timeout=0.05
+        )
+    
+    def tearDown(self):
+        """Clean up after tests"""
+        self.engine.dispose()
+        self.temp_dir.cleanup()
+    
+    def test_occupancy_and_timeouts(self):
+        """Test checked-out, overflow and timeout counters"""
+        first = self.engine.connect()
+        second = self.engine.connect()
+        
+        stats = pool_stats(self.engine)
+        self.assertEqual(stats["pool"], "MonitoredQueuePool")
+        self.assertEqual((stats["checked_out"], stats["overflow"]), (2, 1))
+        
+        # Pool and overflow are exhausted, so the next checkout times out
+        with self.assertRaises(TimeoutError):
+            self.engine.connect()
+        
+        stats = pool_stats(self.engine)
+        self.assertEqual((stats["checkouts"], stats["timeouts"], stats["connects"]), (3, 1, 2))
+        self.assertGreaterEqual(stats["max_wait_ms"], 50)
+        
+        first.close()
+        second.close()
+        stats = pool_stats(self.engine)
+        self.assertEqual(stats["checked_out"], 0)
+        self.assertIn("timeouts=1", format_pool_stats(stats))
+    
+    def test_other_pools(self):
+        """Test that engines without a MonitoredQueuePool report what they can"""
+        engine = create_engine("sqlite://")
+        stats = pool_stats(engine)
+        self.assertEqual(stats["pool"], "SingletonThreadPool")
+        self.assertNotIn("checkouts", stats)
+
+if __name__ == '__main__':
+    unittest.main()
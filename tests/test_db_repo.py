@@ -2,20 +2,31 @@
 Tests for repository pattern implementation
 """
 import unittest
+import io
 import os
 import sys
+import tempfile
+import threading
+from contextlib import redirect_stdout
 from datetime import datetime, timedelta
 
 # Add parent directory to path to import modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, func, inspect
+from sqlalchemy.exc import IntegrityError, InvalidRequestError
 from sqlalchemy.orm import sessionmaker
-from db.models import Base, Patient, Doctor, PatientMedicalRecord, Appointment
+from db.models import Base, Patient, Doctor, PatientMedicalRecord, Appointment, LabTest
+from algorithms.data_analysis import analyze_medical_conditions
 from db.repository import (
     BaseRepository, PatientRepository, DoctorRepository, 
-    AppointmentRepository, MedicalRecordRepository
+    AppointmentRepository, MedicalRecordRepository,
+    PrescriptionRepository, LabTestRepository, UnitOfWork, configure_entity_cache, strict_loading
 )
+from db.cache import EntityCache
+from cli.cmd_executor import execute_command
+from db.init_db import apply_indexes
+from db.search_index import drop_search_index, install_search_index
 
 class TestRepositories(unittest.TestCase):
     """Test cases for repositories"""
@@ -190,6 +201,49 @@ class TestRepositories(unittest.TestCase):
         deleted_patient = repo.get_by_id(created_patient.id)
         self.assertIsNone(deleted_patient)
     
+    def test_indexed_search(self):
+        """Test ranked search through the SQLite full-text index"""
+        repo = PatientRepository(self.session)
+        johnny = repo.create(Patient(
+            first_name="Johnny", last_name="Johnson", email="johnny.johnson@example.com",
+            dob=datetime(1978, 3, 10).date(), patient_id="P23456789"
+        ))
+        
+        # Case-insensitive substring match; more matching fields rank higher
+        results = repo.search("JOHN")
+        self.assertEqual([p.first_name for p in results], ["Johnny", "John"])
+        
+        # Terms too short for trigrams fall back to a scan with the same matches
+        self.assertEqual(
+            sorted(p.first_name for p in repo.search("jo")), ["John", "Johnny"]
+        )
+        
+        # Triggers keep the index in sync with updates and deletes
+        patient = repo.get_by_id(self.patient1.id)
+        patient.last_name = "Hartley"
+        repo.update(patient)
+        self.assertEqual([p.id for p in repo.search("hartley")], [self.patient1.id])
+        
+        repo.delete(johnny)
+        self.assertEqual([p.first_name for p in repo.search("john")], ["John"])
+        
+        # Doctors are indexed separately, including specialisation
+        doctors = DoctorRepository(self.session).search("pediatric")
+        self.assertEqual([d.id for d in doctors], [self.doctor2.id])
+        self.assertEqual(repo.search("pediatric"), [])
+    
+    def test_search_index_backfill(self):
+        """Test that installing the index on an existing database indexes its rows"""
+        with self.engine.begin() as connection:
+            drop_search_index(connection)
+        self.assertEqual([p.last_name for p in PatientRepository(self.session).search("Smith")], ["Smith"])
+        
+        with self.engine.begin() as connection:
+            self.assertTrue(install_search_index(connection))
+            count = connection.exec_driver_sql("SELECT count(*) FROM patient_search").scalar()
+        self.assertEqual(count, 2)
+        self.assertEqual([p.last_name for p in PatientRepository(self.session).search("Smith")], ["Smith"])
+    
     def test_doctor_repository(self):
         """Test DoctorRepository"""
         repo = DoctorRepository(self.session)
@@ -242,6 +296,36 @@ class TestRepositories(unittest.TestCase):
         patient_appointments = repo.get_by_patient(self.patient2.id)
         self.assertEqual(len(patient_appointments), 1)
         self.assertEqual(patient_appointments[0].doctor_id, self.doctor2.id)
+        
+        # Test get_busy_intervals
+        start = self.appointment1.schedule_time
+        intervals = repo.get_busy_intervals(self.doctor1.id, start.date())
+        self.assertEqual(intervals, [(start, start + timedelta(minutes=30))])
+        self.assertEqual(
+            repo.get_busy_intervals(self.doctor1.id, start.date(),
+                                    exclude_appointment_id=self.appointment1.appointment_id),
+            []
+        )
+        
+        # Test has_conflict
+        self.assertTrue(repo.has_conflict(self.doctor1.id, start + timedelta(minutes=15), 30))
+        self.assertFalse(repo.has_conflict(self.doctor1.id, start + timedelta(minutes=30), 30))
+        self.assertFalse(repo.has_conflict(self.doctor2.id, start, 30))
+        
+        # Test create_if_available
+        booked = repo.create_if_available(Appointment(
+            patient_id=self.patient2.id, doctor_id=self.doctor1.id,
+            schedule_time=start + timedelta(minutes=30), duration=30
+        ))
+        self.assertIsNotNone(booked.appointment_id)
+        self.assertEqual(booked.status, "scheduled")
+        
+        rejected = repo.create_if_available(Appointment(
+            patient_id=self.patient2.id, doctor_id=self.doctor1.id,
+            schedule_time=start + timedelta(minutes=45), duration=30
+        ))
+        self.assertIsNone(rejected)
+        self.assertEqual(len(repo.get_by_doctor(self.doctor1.id)), 2)
     
     def test_medical_record_repository(self):
         """Test MedicalRecordRepository"""
@@ -265,6 +349,783 @@ class TestRepositories(unittest.TestCase):
         diagnosis_records = repo.search_by_diagnosis("Influenza")
         self.assertEqual(len(diagnosis_records), 1)
         self.assertEqual(diagnosis_records[0].patient_id, self.patient2.id)
+    
+    def test_get_page(self):
+        """Test keyset pagination with cursors"""
+        repo = PatientRepository(self.session)
+        repo.create_many([
+            dict(first_name=f"Page{i}", last_name="Test", dob=datetime(1980, 1, 1).date(),
+                 email=f"page{i}@example.com", patient_id=f"P9{i:07d}")
+            for i in range(5)
+        ])
+        all_ids = sorted(p.id for p in repo.get_all())
+        
+        # Walk every page by primary key
+        pages, cursor = [], None
+        while True:
+            page, cursor = repo.get_page(limit=3, after=cursor)
+            pages.append([p.id for p in page])
+            if cursor is None:
+                break
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        self.assertEqual(sum(pages, []), all_ids)
+        
+        # Rows removed before the current position do not shift later pages
+        first_page, cursor = repo.get_page(limit=3)
+        self.session.execute(Patient.__table__.delete().where(Patient.id == first_page[0].id))
+        second_page, _ = repo.get_page(limit=3, after=cursor)
+        self.assertEqual([p.id for p in second_page], all_ids[3:6])
+        
+        # Sorting on another column, ties broken by the primary key, with filters
+        appointment_repo = AppointmentRepository(self.session)
+        page, cursor = appointment_repo.get_page(
+            limit=1, order_by="schedule_time", criteria=[Appointment.status == "scheduled"]
+        )
+        self.assertEqual(page, [self.appointment1])
+        page, cursor = appointment_repo.get_page(
+            limit=1, after=cursor, order_by="schedule_time", criteria=[Appointment.status == "scheduled"]
+        )
+        self.assertEqual(page, [self.appointment2])
+        self.assertIsNone(cursor)
+        
+        # Cursors are bound to their ordering
+        _, cursor = repo.get_page(limit=1)
+        with self.assertRaises(ValueError):
+            repo.get_page(limit=1, after=cursor, order_by="last_name")
+        with self.assertRaises(ValueError):
+            repo.get_page(limit=1, after="not-a-cursor")
+        
+        # Listing projections page like entities and return plain rows
+        rows, cursor = repo.get_page(limit=3, columns=repo.listing_columns)
+        self.assertEqual([row.id for row in rows], all_ids[1:4])
+        self.assertEqual(rows[0].patient_id, repo.get_by_id(all_ids[1]).patient_id)
+        rows, cursor = repo.get_page(limit=3, after=cursor, columns=repo.listing_columns)
+        self.assertEqual([row.id for row in rows], all_ids[4:7])
+        with self.assertRaises(ValueError):
+            repo.get_page(limit=3, order_by="last_name", columns=("id", "first_name"))
+    
+    def test_strict_loading(self):
+        """Test that lazy loads raise under strict loading and analysis loads lab tests per batch"""
+        for i, record in enumerate([self.record1, self.record2] * 3):
+            self.session.add(LabTest(
+                record_id=record.record_id, test_name=f"Test{i % 2}", test_type="Blood",
+                ordered_date=datetime(2023, 1, 1).date(), is_abnormal=True
+            ))
+        self.session.commit()
+        record_id = self.record1.record_id
+        self.session.expunge_all()
+        strict_loading(self.session)
+        repo = MedicalRecordRepository(self.session)
+        
+        # An accidental lazy load fails instead of running a query per record
+        record = repo.get_by_id(record_id)
+        with self.assertRaises(InvalidRequestError):
+            record.lab_tests
+        self.session.expunge_all()
+        
+        statements = []
+        event.listen(self.engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+        results = analyze_medical_conditions(repo.iter_for_analysis(batch_size=1))
+        
+        # One SELECT for the records and one SELECT ... IN per batch for their lab tests
+        self.assertEqual(len(statements), 3)
+        self.assertEqual(results["total_records"], 2)
+        self.assertEqual(results["top_abnormal_tests"], {"Test0": 3, "Test1": 3})
+        self.assertEqual(len(self.session.identity_map), 0)
+    
+    def test_iter_all(self):
+        """Test streaming entities in batches without keeping them in the session"""
+        repo = PatientRepository(self.session)
+        repo.create_many([
+            dict(first_name=f"Stream{i}", last_name="Test", dob=datetime(1980, 1, 1).date(),
+                 email=f"stream{i}@example.com", patient_id=f"P8{i:07d}")
+            for i in range(25)
+        ])
+        expected = sorted(p.id for p in repo.get_all())
+        self.session.expunge_all()
+        
+        held = []
+        ids = []
+        for patient in repo.iter_all(batch_size=10):
+            ids.append(patient.id)
+            held.append(len(self.session.identity_map))
+        
+        self.assertEqual(ids, expected)
+        # Each batch is expunged before it is handed out
+        self.assertEqual(max(held), 0)
+        self.assertEqual(patient.first_name, "Stream24")
+        
+        records = list(MedicalRecordRepository(self.session).iter_all(
+            criteria=[PatientMedicalRecord.diagnosis == "Influenza"]
+        ))
+        self.assertEqual([r.treatment_plan for r in records], ["Bed rest and fluids"])
+    
+    def test_iter_regex_search(self):
+        """Test regex search pushed into the database"""
+        repo = MedicalRecordRepository(self.session)
+        statements = []
+        
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        event.listen(self.engine, "before_cursor_execute", record)
+        
+        try:
+            # Results stream lazily and the regex runs in the query
+            results = repo.iter_regex_search(r"^influ|sodium\s+intake", ["diagnosis", "notes"])
+            self.assertFalse(isinstance(results, list))
+            self.assertEqual(
+                [r.record_id for r in results], [self.record1.record_id, self.record2.record_id]
+            )
+            self.assertIn("REGEXP", statements[-1])
+            
+            records = list(repo.iter_regex_search("BED REST", ["treatment_plan"], batch_size=1))
+            self.assertEqual([r.record_id for r in records], [self.record2.record_id])
+            
+            # An invalid pattern is a plain substring search, still in the query
+            self.record1.notes = "Recheck BP (home readings_1)"
+            self.session.commit()
+            statements.clear()
+            records = list(repo.iter_regex_search("(HOME readings_", ["treatment_plan", "notes"]))
+            self.assertEqual([r.record_id for r in records], [self.record1.record_id])
+            self.assertIn("LIKE", statements[0])
+            self.assertEqual(list(repo.iter_regex_search("(home readings%", ["notes"])), [])
+            
+            # Non-text fields are matched on their string form in Python
+            statements.clear()
+            records = list(repo.iter_regex_search(r"^2022-05", ["date_created"]))
+            self.assertEqual([r.record_id for r in records], [self.record2.record_id])
+            self.assertNotIn("REGEXP", statements[0])
+        finally:
+            event.remove(self.engine, "before_cursor_execute", record)
+
+    def test_iter_regex_search_fallbacks(self):
+        """Test the searches that cannot be narrowed in the database"""
+        repo = MedicalRecordRepository(self.session)
+        self.record1.notes = "Suivi à domicile (ÉTAPE 2"
+        self.session.commit()
+        statements = []
+        
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        event.listen(self.engine, "before_cursor_execute", record)
+        try:
+            # LIKE only folds ASCII case, so a non-ASCII substring is scanned
+            records = list(repo.iter_regex_search("(étape", ["notes"]))
+            self.assertEqual([r.record_id for r in records], [self.record1.record_id])
+            self.assertNotIn("LIKE", statements[-1])
+        finally:
+            event.remove(self.engine, "before_cursor_execute", record)
+        
+        # A condition the database fails on part way resumes as a scan after the rows returned
+        self.session.connection().connection.driver_connection.create_function(
+            "fails_after_first", 1, lambda record_id: 1 // (record_id == self.record1.record_id)
+        )
+        query = self.session.query(PatientMedicalRecord).order_by(PatientMedicalRecord.record_id)
+        condition = func.fails_after_first(PatientMedicalRecord.record_id) == 1
+        with self.assertLogs("db.repository", level="WARNING"):
+            records = list(repo._iter_pushed_down(query, condition, inspect(PatientMedicalRecord).primary_key[0], 1))
+        self.assertEqual([r.record_id for r in records], [r.record_id for r in query])
+        self.assertGreater(len(records), 1)
+
+class TestBulkOperations(unittest.TestCase):
+    """Test cases for BaseRepository.create_many and bulk_upsert"""
+    
+    def setUp(self):
+        """Set up test database"""
+        self.engine = create_engine('sqlite:///:memory:')
+        Base.metadata.create_all(self.engine)
+        Session = sessionmaker(bind=self.engine)
+        self.session = Session()
+        
+        self.commits = []
+        event.listen(self.engine, "commit", self._record_commit)
+    
+    def tearDown(self):
+        """Clean up after tests"""
+        event.remove(self.engine, "commit", self._record_commit)
+        self.session.close()
+    
+    def _record_commit(self, conn):
+        self.commits.append(conn)
+    
+    def patient_rows(self, count, prefix="P"):
+        """Mappings for count new patients"""
+        return [
+            dict(first_name=f"First{i}", last_name="Bulk", dob=datetime(1980, 1, 1).date(),
+                 email=f"{prefix.lower()}{i}@example.com", patient_id=f"{prefix}{i:06d}")
+            for i in range(count)
+        ]
+    
+    def test_create_many(self):
+        """Test chunked inserts of mappings and models across the hierarchy"""
+        repo = PatientRepository(self.session)
+        rows = self.patient_rows(9)
+        rows[4] = Patient(**rows[4])
+        
+        keys = repo.create_many(rows, chunk_size=4)
+        
+        # One commit per chunk, keys in input order
+        self.assertEqual(len(self.commits), 3)
+        self.assertEqual(len(keys), 9)
+        for key, row in zip(keys, self.patient_rows(9)):
+            patient = repo.get_by_id(key)
+            self.assertEqual(patient.patient_id, row["patient_id"])
+            self.assertEqual(patient.type, "patient")
+            self.assertIsNotNone(patient.reg_date)
+        
+        # Rows reach every table of the Person -> Staff -> Doctor hierarchy
+        doctor_repo = DoctorRepository(self.session)
+        doctor_keys = doctor_repo.create_many([
+            Doctor(first_name="Sarah", last_name="Williams", dob=datetime(1975, 11, 8).date(),
+                   staff_id="D1", role="Doctor", department="Cardiology",
+                   specialisation="Cardiology", license_number="MD1"),
+            dict(first_name="Michael", last_name="Brown", dob=datetime(1980, 4, 20).date(),
+                 staff_id="D2", role="Doctor", department="Pediatrics",
+                 specialisation="Pediatrics", license_number="MD2"),
+        ])
+        self.assertEqual(
+            [d.id for d in doctor_repo.get_by_department("Pediatrics")], [doctor_keys[1]]
+        )
+        self.assertEqual(doctor_repo.get_by_id(doctor_keys[0]).type, "doctor")
+        self.assertEqual([d.id for d in doctor_repo.search("Williams")], [doctor_keys[0]])
+        
+        with self.assertRaises(TypeError):
+            repo.create_many([doctor_repo.get_by_id(doctor_keys[0])])
+    
+    def test_create_many_rolls_back_failed_chunk(self):
+        """Test that a failing chunk leaves earlier chunks committed and itself out"""
+        repo = PatientRepository(self.session)
+        rows = self.patient_rows(6)
+        rows[5]["patient_id"] = rows[4]["patient_id"]
+        
+        with self.assertRaises(IntegrityError):
+            repo.create_many(rows, chunk_size=3)
+        
+        self.assertEqual(
+            sorted(p.patient_id for p in repo.get_all()),
+            [row["patient_id"] for row in rows[:3]]
+        )
+    
+    def test_bulk_upsert(self):
+        """Test inserting new rows and updating existing ones by a unique key"""
+        repo = PatientRepository(self.session)
+        keys = repo.create_many(self.patient_rows(3))
+        
+        upserted = repo.bulk_upsert([
+            dict(patient_id="P000001", last_name="Renamed"),
+            dict(patient_id="N000001", first_name="New", last_name="Patient",
+                 dob=datetime(1990, 1, 1).date()),
+            dict(patient_id="P000001", insurance_info="Aetna"),
+        ], key="patient_id")
+        
+        self.assertEqual(upserted[0], keys[1])
+        self.assertEqual(upserted[2], keys[1])
+        self.assertNotIn(upserted[1], keys)
+        
+        self.session.expire_all()
+        patient = repo.get_by_id(keys[1])
+        self.assertEqual(patient.last_name, "Renamed")
+        self.assertEqual(patient.insurance_info, "Aetna")
+        self.assertEqual(patient.first_name, "First1")
+        self.assertEqual(repo.get_by_patient_id("N000001").id, upserted[1])
+        
+        # The search index follows bulk updates
+        self.assertEqual([p.id for p in repo.search("renamed")], [keys[1]])
+        
+        # Upsert by primary key
+        self.assertEqual(repo.bulk_upsert([dict(id=keys[0], phone="555-0000")]), [keys[0]])
+        self.session.expire_all()
+        self.assertEqual(repo.get_by_id(keys[0]).phone, "555-0000")
+
+class TestUnitOfWork(unittest.TestCase):
+    """Test cases for UnitOfWork transaction scopes"""
+    
+    def setUp(self):
+        """Set up test database"""
+        self.engine = create_engine('sqlite:///:memory:')
+        Base.metadata.create_all(self.engine)
+        Session = sessionmaker(bind=self.engine)
+        self.session = Session()
+        
+        self.patient_repo = PatientRepository(self.session)
+        self.record_repo = MedicalRecordRepository(self.session)
+        self.patient = self.patient_repo.create(Patient(
+            first_name="John", last_name="Doe", dob=datetime(1980, 1, 1).date(),
+            email="john.doe@example.com", patient_id="P12345"
+        ))
+        
+        self.commits = []
+        event.listen(self.engine, "commit", self._record_commit)
+    
+    def tearDown(self):
+        """Clean up after tests"""
+        event.remove(self.engine, "commit", self._record_commit)
+        self.session.close()
+    
+    def _record_commit(self, conn):
+        self.commits.append(conn)
+    
+    def new_record(self, diagnosis="Hypertension"):
+        return PatientMedicalRecord(
+            patient_id=self.patient.id, diagnosis=diagnosis, treatment_plan="Rest"
+        )
+    
+    def test_auto_commit_outside_scope(self):
+        """Test that every write still commits by itself by default"""
+        self.record_repo.create(self.new_record())
+        self.record_repo.create(self.new_record())
+        self.assertEqual(len(self.commits), 2)
+    
+    def test_single_commit(self):
+        """Test that writes inside a scope share one commit"""
+        with UnitOfWork(self.session):
+            record = self.record_repo.create(self.new_record())
+            # Creates are flushed, so generated keys are available
+            self.assertIsNotNone(record.record_id)
+            
+            record.notes = "Follow up in 2 weeks"
+            self.record_repo.update(record)
+            self.patient.phone = "555-0100"
+            self.patient_repo.update(self.patient)
+            self.assertEqual(self.commits, [])
+        
+        self.assertEqual(len(self.commits), 1)
+        self.session.expire_all()
+        self.assertEqual(self.record_repo.get_by_id(record.record_id).notes, "Follow up in 2 weeks")
+        self.assertEqual(self.patient_repo.get_by_id(self.patient.id).phone, "555-0100")
+    
+    def test_rollback_on_exception(self):
+        """Test that an exception leaving the scope discards all its writes"""
+        with self.assertRaises(RuntimeError):
+            with self.record_repo.unit_of_work():
+                self.record_repo.create(self.new_record())
+                raise RuntimeError("abort")
+        
+        self.assertEqual(self.commits, [])
+        self.assertEqual(self.record_repo.get_all(), [])
+    
+    def test_rollback_on_caught_repository_error(self):
+        """Test that a failed write rolls the scope back even if the caller catches it"""
+        with UnitOfWork(self.session):
+            self.record_repo.create(self.new_record())
+            try:
+                self.patient_repo.create(Patient(
+                    first_name="Jane", last_name="Doe", dob=datetime(1985, 1, 1).date(),
+                    email="john.doe@example.com", patient_id="P67890"
+                ))
+            except IntegrityError:
+                pass
+        
+        self.assertEqual(self.commits, [])
+        self.assertEqual(self.record_repo.get_all(), [])
+        
+        # The session is usable again and auto-commits outside the scope
+        self.record_repo.create(self.new_record())
+        self.assertEqual(len(self.commits), 1)
+    
+    def test_nested_scopes(self):
+        """Test that only the outermost scope commits"""
+        with UnitOfWork(self.session):
+            with UnitOfWork(self.session):
+                self.record_repo.create(self.new_record())
+            self.assertEqual(self.commits, [])
+            self.record_repo.create_many([self.new_record("Asthma"), self.new_record("Flu")], chunk_size=1)
+        
+        self.assertEqual(len(self.commits), 1)
+        self.assertEqual(len(self.record_repo.get_all()), 3)
+        self.assertFalse(UnitOfWork.active(self.session))
+    
+    def test_medical_record_service(self):
+        """Test creating a record with its prescriptions and lab tests in one transaction"""
+        from domain.services import MedicalRecordService
+        
+        service = MedicalRecordService(self.record_repo, self.patient_repo)
+        prescriptions = [
+            dict(medication=name, dosage="10mg", frequency="Daily",
+                 start_date="2025-01-01", end_date="2025-02-01")
+            for name in ("Lisinopril", "Amlodipine", "Aspirin")
+        ]
+        lab_tests = [
+            dict(test_name=name, test_type="Blood", ordered_date="2025-01-01")
+            for name in ("Lipid Panel", "CBC")
+        ]
+        
+        record = service.create_medical_record(
+            self.patient.id, "Hypertension", "Medication", prescriptions=prescriptions, lab_tests=lab_tests
+        )
+        
+        self.assertEqual(len(self.commits), 1)
+        self.assertEqual(len(record.prescriptions), 3)
+        self.assertEqual(len(record.lab_tests), 2)
+        stored = PrescriptionRepository(self.session).get_by_record(record.record_id)
+        self.assertEqual(sorted(p.prescription_id for p in stored),
+                         sorted(p.prescription_id for p in record.prescriptions))
+        self.assertEqual(len(LabTestRepository(self.session).get_by_record(record.record_id)), 2)
+        
+        # A failing lab test leaves neither the record nor its prescriptions behind
+        with self.assertRaises(IntegrityError):
+            service.create_medical_record(
+                self.patient.id, "Asthma", "Inhaler", prescriptions=prescriptions,
+                lab_tests=[dict(test_name="Spirometry", test_type=None, ordered_date="2025-01-01")]
+            )
+        self.assertEqual(len(self.commits), 1)
+        self.assertEqual(len(self.record_repo.get_all()), 1)
+        self.assertEqual(len(PrescriptionRepository(self.session).get_all()), 3)
+
+class TestEntityCache(unittest.TestCase):
+    """Test cases for the read-through patient and doctor cache"""
+    
+    def setUp(self):
+        """Set up test database"""
+        self.engine = create_engine('sqlite:///:memory:')
+        Base.metadata.create_all(self.engine)
+        self.Session = sessionmaker(bind=self.engine)
+        
+        session = self.Session()
+        self.patient = Patient(
+            first_name="John", last_name="Doe", dob=datetime(1980, 1, 1).date(),
+            email="john.doe@example.com", patient_id="P12345"
+        )
+        self.doctor = Doctor(
+            first_name="Sarah", last_name="Williams", dob=datetime(1975, 11, 8).date(),
+            staff_id="D1", role="Doctor", specialisation="Cardiology", license_number="MD1"
+        )
+        session.add_all([self.patient, self.doctor])
+        session.commit()
+        self.patient_id, self.doctor_id = self.patient.id, self.doctor.id
+        session.close()
+        
+        self.caches = configure_entity_cache(max_size=100, ttl=60)
+        self.statements = []
+        event.listen(self.engine, "before_cursor_execute", self._record_statement)
+    
+    def tearDown(self):
+        """Clean up after tests"""
+        event.remove(self.engine, "before_cursor_execute", self._record_statement)
+        configure_entity_cache(enabled=False)
+    
+    def _record_statement(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+    
+    def test_read_through(self):
+        """Test that repeated lookups across sessions hit the cache"""
+        for _ in range(3):
+            session = self.Session()
+            doctor = DoctorRepository(session).get_by_id(self.doctor_id)
+            patient = PatientRepository(session).get_by_patient_id("P12345")
+            self.assertEqual(doctor.specialisation, "Cardiology")
+            self.assertEqual(patient.id, self.patient_id)
+            self.assertIn(doctor, session)
+            session.close()
+        
+        # Only the first round reaches the database
+        self.assertEqual(len(self.statements), 2)
+        stats = self.caches["DoctorRepository"].stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (2, 1))
+        
+        # Batched lookups only query the IDs that are not cached
+        session = self.Session()
+        other = Doctor(
+            first_name="Michael", last_name="Brown", dob=datetime(1980, 4, 20).date(),
+            staff_id="D2", role="Doctor", specialisation="Pediatrics", license_number="MD2"
+        )
+        other_id = DoctorRepository(session).create(other).id
+        session.expunge_all()
+        self.statements.clear()
+        doctors = DoctorRepository(session).get_by_ids([self.doctor_id, other_id])
+        self.assertEqual(len(doctors), 2)
+        self.assertEqual(len([s for s in self.statements if s.startswith("SELECT")]), 1)
+        session.close()
+    
+    def test_invalidation(self):
+        """Test that updates and deletes drop cached entities"""
+        session = self.Session()
+        repo = DoctorRepository(session)
+        doctor = repo.get_by_id(self.doctor_id)
+        doctor.department = "Cardiology"
+        repo.update(doctor)
+        session.close()
+        
+        session = self.Session()
+        self.assertEqual(DoctorRepository(session).get_by_id(self.doctor_id).department, "Cardiology")
+        patient_repo = PatientRepository(session)
+        patient_repo.delete(patient_repo.get_by_patient_id("P12345"))
+        self.assertIsNone(patient_repo.get_by_patient_id("P12345"))
+        self.assertIsNone(patient_repo.get_by_id(self.patient_id))
+        session.close()
+    
+    def test_unflushed_changes_survive_cache_hits(self):
+        """Test that reading an entity again does not undo its unflushed changes"""
+        session = self.Session()
+        PatientRepository(session).get_by_id(self.patient_id)
+        session.close()
+        
+        session = self.Session()
+        repo = PatientRepository(session)
+        patient = repo.get_by_id(self.patient_id)
+        patient.first_name = "Changed"
+        self.assertIs(repo.get_by_id(self.patient_id), patient)
+        self.assertIs(repo.get_by_ids([self.patient_id])[self.patient_id], patient)
+        self.assertEqual(patient.first_name, "Changed")
+        self.assertIn(patient, session.dirty)
+        repo.update(patient)
+        session.close()
+        
+        session = self.Session()
+        self.assertEqual(session.get(Patient, self.patient_id).first_name, "Changed")
+        self.assertEqual(PatientRepository(session).get_by_id(self.patient_id).first_name, "Changed")
+        session.close()
+    
+    def test_cli_commands(self):
+        """Test that a patient read by one CLI command is cached for the next"""
+        config = {"db_session": self.Session}
+        counts = []
+        for _ in range(2):
+            self.statements.clear()
+            with redirect_stdout(io.StringIO()) as output:
+                execute_command("patient", "view", {"args": ["P12345"], "options": {}}, config)
+            self.assertIn("Name: John Doe", output.getvalue())
+            counts.append(len(self.statements))
+        
+        # The command's unit of work commits, so the second command is served from the cache
+        self.assertLess(counts[1], counts[0])
+        self.assertEqual(self.caches["PatientRepository"].stats()["hits"], 2)
+    
+    def test_lru_and_ttl(self):
+        """Test eviction of the least recently used and expired entries"""
+        cache = EntityCache(max_size=2, ttl=None)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual((cache.get("a"), cache.get("c")), (1, 3))
+        self.assertEqual(cache.stats()["evictions"], 1)
+        
+        cache = EntityCache(max_size=2, ttl=0)
+        cache.put("a", 1)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["expirations"], 1)
+
+class TestConcurrentBooking(unittest.TestCase):
+    """Test that concurrent bookings of the same slots cannot double-book"""
+    
+    def setUp(self):
+        """Set up a file-based test database shared by several connections"""
+        handle, self.db_path = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+        self.engine = create_engine(f"sqlite:///{self.db_path}", connect_args={"timeout": 30})
+        Base.metadata.create_all(self.engine)
+        self.Session = sessionmaker(bind=self.engine)
+        
+        session = self.Session()
+        patient = Patient(
+            first_name="John", last_name="Doe", email="john.doe@example.com",
+            dob=datetime(1985, 5, 15).date(), patient_id="P12345678"
+        )
+        doctor = Doctor(
+            first_name="Sarah", last_name="Williams", email="sarah.williams@example.com",
+            dob=datetime(1975, 11, 8).date(), staff_id="D12345678", role="Doctor",
+            specialisation="Cardiology", license_number="MD12345"
+        )
+        session.add_all([patient, doctor])
+        session.commit()
+        self.patient_id, self.doctor_id = patient.id, doctor.id
+        session.close()
+    
+    def tearDown(self):
+        """Remove the test database"""
+        self.engine.dispose()
+        os.remove(self.db_path)
+    
+    def test_concurrent_bookings(self):
+        """Test many threads booking the same few slots at once"""
+        thread_count = 24
+        base_time = datetime(2023, 1, 2, 9, 0)
+        # Overlapping candidate slots: 9:00, 9:15 and 9:30, each 30 minutes long
+        slots = [base_time + timedelta(minutes=15 * i) for i in range(3)]
+        barrier = threading.Barrier(thread_count)
+        results = []
+        errors = []
+        
+        def book(index):
+            session = self.Session()
+            try:
+                repo = AppointmentRepository(session)
+                barrier.wait()
+                booked = repo.create_if_available(Appointment(
+                    patient_id=self.patient_id, doctor_id=self.doctor_id,
+                    schedule_time=slots[index % len(slots)], duration=30
+                ))
+                results.append(booked.schedule_time if booked else None)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                session.close()
+        
+        threads = [threading.Thread(target=book, args=(i,)) for i in range(thread_count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(errors, [])
+        booked_times = [t for t in results if t is not None]
+        
+        # Either 9:00 + 9:30 or 9:15 alone can win, never overlapping bookings
+        session = self.Session()
+        stored = sorted(a.schedule_time for a in AppointmentRepository(session).get_by_doctor(self.doctor_id))
+        session.close()
+        
+        self.assertEqual(sorted(booked_times), stored)
+        self.assertIn(stored, [[slots[0], slots[2]], [slots[1]]])
+
+class TestQueryPlans(unittest.TestCase):
+    """Test that the repository lookups are served by an index"""
+    
+    def setUp(self):
+        """Set up an empty in-memory database and a statement recorder"""
+        self.engine = create_engine('sqlite:///:memory:')
+        Base.metadata.create_all(self.engine)
+        Session = sessionmaker(bind=self.engine)
+        self.session = Session()
+        self.statements = []
+        
+        @event.listens_for(self.engine, "before_cursor_execute")
+        def record(conn, cursor, statement, parameters, context, executemany):
+            self.statements.append((statement, parameters))
+    
+    def tearDown(self):
+        """Clean up after tests"""
+        self.session.close()
+    
+    def query_plan(self, func):
+        """Run func and return the EXPLAIN QUERY PLAN details of its statements"""
+        self.statements = []
+        func()
+        captured = list(self.statements)
+        
+        details = []
+        connection = self.engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            for statement, parameters in captured:
+                cursor.execute("EXPLAIN QUERY PLAN " + statement, parameters)
+                details.extend(row[3] for row in cursor.fetchall())
+        finally:
+            connection.close()
+        return details
+    
+    def assertUsesIndexes(self, func):
+        """Assert that no statement issued by func scans a table without an index"""
+        details = self.query_plan(func)
+        self.assertTrue(details)
+        for detail in details:
+            if detail.startswith("SCAN ") and detail != "SCAN CONSTANT ROW":
+                self.assertIn("USING", detail, detail)
+    
+    def test_repository_queries_use_indexes(self):
+        """Test each filtered repository query against its query plan"""
+        day = datetime(2023, 1, 2)
+        patients = PatientRepository(self.session)
+        doctors = DoctorRepository(self.session)
+        appointments = AppointmentRepository(self.session)
+        records = MedicalRecordRepository(self.session)
+        prescriptions = PrescriptionRepository(self.session)
+        lab_tests = LabTestRepository(self.session)
+        
+        queries = [
+            lambda: patients.get_by_patient_id("P12345678"),
+            lambda: doctors.get_by_specialisation("Cardiology"),
+            lambda: doctors.get_by_department("Cardiology"),
+            lambda: appointments.get_by_doctor(1),
+            lambda: appointments.get_by_doctor(1, day),
+            lambda: appointments.get_by_patient(1),
+            lambda: appointments.get_by_patient(1, day),
+            lambda: appointments.get_by_date_range(day, day + timedelta(days=7)),
+            lambda: appointments.get_by_date_range(day, day + timedelta(days=7), [1, 2]),
+            lambda: appointments.get_busy_intervals(1, day),
+            lambda: appointments.has_conflict(1, day, 30),
+            lambda: records.get_by_patient(1),
+            lambda: prescriptions.get_by_record(1),
+            lambda: prescriptions.get_active_prescriptions(),
+            lambda: prescriptions.get_active_prescriptions(1),
+            lambda: lab_tests.get_by_record(1),
+            lambda: lab_tests.get_abnormal_tests(),
+            lambda: lab_tests.get_abnormal_tests(1),
+        ]
+        for query in queries:
+            self.assertUsesIndexes(query)
+    
+    def test_partial_indexes(self):
+        """Test that the active and abnormal filters use the partial indexes"""
+        prescriptions = PrescriptionRepository(self.session)
+        lab_tests = LabTestRepository(self.session)
+        
+        active_plan = " ".join(self.query_plan(lambda: prescriptions.get_active_prescriptions()))
+        self.assertIn("ix_prescriptions_active_record", active_plan)
+        
+        abnormal_plan = " ".join(self.query_plan(lambda: lab_tests.get_abnormal_tests()))
+        self.assertIn("ix_lab_tests_abnormal_record", abnormal_plan)
+    
+    def test_apply_indexes_to_existing_database(self):
+        """Test that indexes missing from an older database are created"""
+        with self.engine.begin() as connection:
+            connection.exec_driver_sql("DROP INDEX ix_appointments_status")
+            connection.exec_driver_sql("DROP INDEX ix_lab_tests_abnormal_record")
+        
+        self.assertEqual(
+            sorted(apply_indexes(self.engine)),
+            ["ix_appointments_status", "ix_lab_tests_abnormal_record"]
+        )
+        names = {index["name"] for index in inspect(self.engine).get_indexes("appointments")}
+        self.assertIn("ix_appointments_status", names)
+        
+        # Running it again is a no-op
+        self.assertEqual(apply_indexes(self.engine), [])
+
+@unittest.skipUnless(os.getenv("TEST_POSTGRES_URL"), "TEST_POSTGRES_URL must name an empty PostgreSQL database")
+class TestPostgresOverlapConstraint(unittest.TestCase):
+    """Test adding the appointment overlap constraint to an existing PostgreSQL database"""
+    
+    def setUp(self):
+        """Create the tables, then drop the constraint as in a database created before it"""
+        self.engine = create_engine(os.getenv("TEST_POSTGRES_URL"))
+        Base.metadata.create_all(self.engine)
+        with self.engine.begin() as connection:
+            connection.exec_driver_sql("ALTER TABLE appointments DROP CONSTRAINT appointments_doctor_no_overlap")
+        
+        session = sessionmaker(bind=self.engine)()
+        patient = Patient(first_name="John", last_name="Doe", dob=datetime(1980, 1, 1).date(),
+                          email="john.doe@example.com", patient_id="P12345")
+        doctor = Doctor(first_name="Sarah", last_name="Williams", dob=datetime(1975, 11, 8).date(),
+                        staff_id="D1", role="Doctor", specialisation="Cardiology", license_number="MD1")
+        session.add_all([patient, doctor])
+        session.flush()
+        self.overlapping = [
+            Appointment(patient_id=patient.id, doctor_id=doctor.id, schedule_time=datetime(2024, 1, 1, 9, minute),
+                        duration=30, status="scheduled")
+            for minute in (0, 15)
+        ]
+        session.add_all(self.overlapping)
+        session.commit()
+        self.session = session
+    
+    def tearDown(self):
+        """Clean up after tests"""
+        self.session.close()
+        Base.metadata.drop_all(self.engine)
+        self.engine.dispose()
+    
+    def test_retrofit(self):
+        """Test that overlapping bookings hold the constraint back until they are resolved"""
+        with self.assertLogs("db.init_db", level="WARNING"):
+            self.assertNotIn("appointments_doctor_no_overlap", apply_indexes(self.engine))
+        
+        self.overlapping[1].status = "cancelled"
+        self.session.commit()
+        self.assertIn("appointments_doctor_no_overlap", apply_indexes(self.engine))
+        self.assertEqual(apply_indexes(self.engine), [])
 
 if __name__ == '__main__':
     unittest.main()
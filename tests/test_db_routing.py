@@ -0,0 +1,135 @@
+"""
+Tests for read replica session routing
+"""
+import unittest
+import os
+import sys
+import tempfile
+from datetime import date, datetime
+from unittest.mock import patch
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from config import load_config
+from db.models import Base, Patient, Doctor, Appointment
+from db.repository import AppointmentRepository, DoctorRepository, PatientRepository, UnitOfWork
+from db.routing import RoutingSession
+from domain.services import AppointmentService
+
+class TestRoutingSession(unittest.TestCase):
+    """Test cases for RoutingSession against a primary and a replica database"""
+    
+    def setUp(self):
+        """Set up two databases whose contents tell them apart"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.primary = create_engine(f"sqlite:///{os.path.join(self.temp_dir.name, 'primary.db')}")
+        self.replica = create_engine(f"sqlite:///{os.path.join(self.temp_dir.name, 'replica.db')}")
+        
+        for engine, name in ((self.primary, "Primary"), (self.replica, "Replica")):
+            Base.metadata.create_all(engine)
+            session = sessionmaker(bind=engine)()
+            session.add(Patient(
+                first_name=name, last_name="Copy", dob=date(1980, 1, 1),
+                email=f"{name.lower()}@example.com", patient_id="P001"
+            ))
+            session.commit()
+            session.close()
+        
+        self.Session = sessionmaker(class_=RoutingSession, primary=self.primary, replica=self.replica)
+        self.session = self.Session()
+        self.repo = PatientRepository(self.session)
+    
+    def tearDown(self):
+        """Clean up after tests"""
+        self.session.close()
+        self.primary.dispose()
+        self.replica.dispose()
+        self.temp_dir.cleanup()
+    
+    def names(self):
+        self.session.expunge_all()
+        return [p.first_name for p in self.repo.get_all()]
+    
+    def test_reads_use_replica(self):
+        """Test that lookups, listings and searches run on the replica"""
+        self.assertEqual(self.names(), ["Replica"])
+        self.assertEqual(self.repo.get_by_id(1).first_name, "Replica")
+        self.assertEqual([p.first_name for p in self.repo.search("Copy")], ["Replica"])
+        self.assertFalse(self.session.sticky)
+    
+    def test_writes_use_primary(self):
+        """Test that writes go to the primary and later reads see them"""
+        with UnitOfWork(self.session):
+            self.repo.create(Patient(
+                first_name="New", last_name="Copy", dob=date(1990, 1, 1),
+                email="new@example.com", patient_id="P002"
+            ))
+            self.assertTrue(self.session.sticky)
+            self.assertEqual(self.names(), ["Primary", "New"])
+        
+        # Still on the primary after the commit, until the session is closed
+        self.assertEqual(self.names(), ["Primary", "New"])
+        self.session.close()
+        self.assertEqual(self.names(), ["Replica"])
+        
+        primary_session = sessionmaker(bind=self.primary)()
+        self.assertEqual(primary_session.query(Patient).count(), 2)
+        primary_session.close()
+    
+    def test_use_primary(self):
+        """Test forcing reads onto the primary"""
+        self.session.use_primary()
+        self.assertEqual(self.names(), ["Primary"])
+    
+    def test_unit_of_work_reads_primary(self):
+        """Test that a reschedule's conflict check sees a booking the replica lacks"""
+        for engine in (self.primary, self.replica):
+            session = sessionmaker(bind=engine)()
+            session.add(Doctor(first_name="Sarah", last_name="Williams", dob=date(1975, 11, 8),
+                               staff_id="D1", role="Doctor", specialisation="Cardiology", license_number="MD1"))
+            session.flush()
+            session.add(Appointment(patient_id=1, doctor_id=2, schedule_time=datetime(2024, 1, 1, 9, 0),
+                                    duration=30, status="scheduled"))
+            if engine is self.primary:
+                # Booked on the primary, not yet replicated
+                session.add(Appointment(patient_id=1, doctor_id=2, schedule_time=datetime(2024, 1, 1, 10, 0),
+                                        duration=30, status="scheduled"))
+            session.commit()
+            session.close()
+        
+        service = AppointmentService(
+            AppointmentRepository(self.session), self.repo, DoctorRepository(self.session)
+        )
+        with self.assertRaises(ValueError):
+            with UnitOfWork(self.session):
+                service.reschedule_appointment(1, datetime(2024, 1, 1, 10, 15))
+        self.assertTrue(self.session.sticky)
+        
+        # Read-only scopes can still use the replica
+        self.session.close()
+        with UnitOfWork(self.session, primary=False):
+            self.assertEqual(self.names(), ["Replica"])
+    
+    def test_load_config_with_replica(self):
+        """Test that DB_REPLICA_URL makes load_config build routing sessions"""
+        env = {
+            "DB_URL": str(self.primary.url),
+            "DB_REPLICA_URL": str(self.replica.url),
+            "CONFIG_FILE": os.path.join(self.temp_dir.name, "config.json"),
+            "EXPORT_DIR": os.path.join(self.temp_dir.name, "exports"),
+        }
+        with patch.dict(os.environ, env):
+            config = load_config()
+        
+        session = config["db_session"]()
+        self.assertIsInstance(session, RoutingSession)
+        self.assertEqual([p.first_name for p in PatientRepository(session).get_all()], ["Replica"])
+        session.close()
+        config["db_engine"].dispose()
+        config["db_replica_engine"].dispose()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -10,6 +10,10 @@ from unittest.mock import MagicMock, patch
 # Add parent directory to path to import modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from db.models import Base, Patient, Doctor, Appointment
+from db.repository import PatientRepository, DoctorRepository, AppointmentRepository, STRICT_LOADING_KEY
 from domain.services import (
     PatientService, DoctorService, AppointmentService, 
     MedicalRecordService, SearchService, FileExportService
@@ -163,9 +167,6 @@ class TestAppointmentService(unittest.TestCase):
         self.patient_repo.get_by_id.return_value = patient_model
         self.doctor_repo.get_by_id.return_value = doctor_model
         
-        # Mock the is_time_available method
-        self.appointment_service.is_time_available = MagicMock(return_value=True)
-        
         # Mock the appointment model
         appointment_model = MagicMock(
             appointment_id=1,
@@ -176,7 +177,7 @@ class TestAppointmentService(unittest.TestCase):
             status="scheduled",
             notes="Follow-up appointment"
         )
-        self.appointment_repo.create.return_value = appointment_model
+        self.appointment_repo.create_if_available.return_value = appointment_model
         
         # Call the service method
         appointment = self.appointment_service.create_appointment(
@@ -186,7 +187,7 @@ class TestAppointmentService(unittest.TestCase):
         # Assert the repository methods were called
         self.patient_repo.get_by_id.assert_called_once_with(1)
         self.doctor_repo.get_by_id.assert_called_once_with(2)
-        self.appointment_repo.create.assert_called_once()
+        self.appointment_repo.create_if_available.assert_called_once()
         
         # Assert the returned appointment has the correct attributes
         self.assertEqual(appointment.patient, patient_model)
@@ -195,20 +196,22 @@ class TestAppointmentService(unittest.TestCase):
         self.assertEqual(appointment.status, "scheduled")
         self.assertEqual(appointment.notes, "Follow-up appointment")
     
+    def test_create_appointment_conflict(self):
+        """Test that a booking rejected by the repository raises an error"""
+        self.patient_repo.get_by_id.return_value = MagicMock(id=1)
+        self.doctor_repo.get_by_id.return_value = MagicMock(id=2)
+        self.appointment_repo.create_if_available.return_value = None
+        
+        with self.assertRaises(ValueError):
+            self.appointment_service.create_appointment(1, 2, "2023-01-01 10:00", 30)
+    
     def test_is_time_available(self):
         """Test checking if a time slot is available"""
-        # Mock the repository get_by_doctor method
-        appointment1 = MagicMock(
-            schedule_time=datetime(2023, 1, 1, 10, 0),
-            duration=30,
-            status="scheduled"
-        )
-        appointment2 = MagicMock(
-            schedule_time=datetime(2023, 1, 1, 11, 0),
-            duration=30,
-            status="scheduled"
-        )
-        self.appointment_repo.get_by_doctor.return_value = [appointment1, appointment2]
+        # Mock the repository get_busy_intervals method
+        self.appointment_repo.get_busy_intervals.return_value = [
+            (datetime(2023, 1, 1, 10, 0), datetime(2023, 1, 1, 10, 30)),
+            (datetime(2023, 1, 1, 11, 0), datetime(2023, 1, 1, 11, 30))
+        ]
         
         # Test with a non-conflicting time
         result = self.appointment_service.is_time_available(
@@ -222,21 +225,78 @@ class TestAppointmentService(unittest.TestCase):
         )
         self.assertFalse(result)
     
+    def test_is_time_available_with_prefetched_intervals(self):
+        """Test checking availability against pre-fetched intervals"""
+        busy_intervals = [(datetime(2023, 1, 1, 10, 0), datetime(2023, 1, 1, 10, 30))]
+        
+        self.assertTrue(self.appointment_service.is_time_available(
+            1, datetime(2023, 1, 1, 10, 30), 30, busy_intervals
+        ))
+        self.assertFalse(self.appointment_service.is_time_available(
+            1, datetime(2023, 1, 1, 9, 45), 30, busy_intervals
+        ))
+        
+        # No query is made when the intervals are supplied
+        self.appointment_repo.get_busy_intervals.assert_not_called()
+    
+    def test_reschedule_appointment_ignores_itself(self):
+        """Test rescheduling an appointment into a slot overlapping its old time"""
+        appointment_model = MagicMock(
+            appointment_id=7, patient_id=1, doctor_id=2,
+            schedule_time=datetime(2023, 1, 1, 10, 0), duration=60, status="scheduled"
+        )
+        self.appointment_repo.get_by_id.return_value = appointment_model
+        self.appointment_repo.update.return_value = appointment_model
+        self.appointment_repo.get_busy_intervals.return_value = []
+        
+        appointment = self.appointment_service.reschedule_appointment(7, "2023-01-01 10:30")
+        
+        self.appointment_repo.get_busy_intervals.assert_called_once_with(
+            2, datetime(2023, 1, 1).date(), exclude_appointment_id=7
+        )
+        self.assertEqual(appointment.schedule_time, datetime(2023, 1, 1, 10, 30))
+        self.assertEqual(appointment.status, "rescheduled")
+    
     def test_find_available_slots(self):
         """Test finding available appointment slots"""
-        # Mock the is_time_available method
-        self.appointment_service.is_time_available = MagicMock(side_effect=[
-            True, False, True, True, False, True, True, True
-        ])
-        
-        # Mock the get_appointments_for_doctor method
-        self.appointment_service.get_appointments_for_doctor = MagicMock(return_value=[])
+        # Mock the repository get_busy_intervals method
+        self.appointment_repo.get_busy_intervals.return_value = [
+            (datetime(2023, 1, 1, 10, 0), datetime(2023, 1, 1, 10, 30)),
+            (datetime(2023, 1, 1, 11, 15), datetime(2023, 1, 1, 11, 45))
+        ]
         
         # Call the service method
         slots = self.appointment_service.find_available_slots(1, datetime(2023, 1, 1).date(), 30)
         
-        # Assert the correct number of slots were returned
-        self.assertEqual(len(slots), 5)
+        # The day is fetched once instead of once per slot
+        self.appointment_repo.get_busy_intervals.assert_called_once()
+        
+        # 16 half-hour slots from 9 AM to 5 PM, minus 10:00, 11:00 and 11:30
+        self.assertEqual(len(slots), 13)
+        self.assertEqual(slots[0], datetime(2023, 1, 1, 9, 0))
+        self.assertEqual(slots[-1], datetime(2023, 1, 1, 16, 30))
+        self.assertNotIn(datetime(2023, 1, 1, 10, 0), slots)
+        self.assertNotIn(datetime(2023, 1, 1, 11, 30), slots)
+
+    def test_find_availability_matrix(self):
+        """Test ranking doctors by earliest availability"""
+        self.doctor_repo.get_by_specialisation.return_value = [MagicMock(id=1), MagicMock(id=2), MagicMock(id=3)]
+        self.appointment_repo.get_by_date_range.return_value = [
+            MagicMock(doctor_id=1, schedule_time=datetime(2023, 1, 2, 9, 0), duration=60, status="scheduled"),
+            MagicMock(doctor_id=2, schedule_time=datetime(2023, 1, 2, 9, 0), duration=30, status="scheduled"),
+            MagicMock(doctor_id=3, schedule_time=datetime(2023, 1, 2, 9, 0), duration=30, status="cancelled")
+        ]
+        
+        matrix = self.appointment_service.find_availability_matrix(
+            "Cardiology", "2023-01-02", "2023-01-02", 30
+        )
+        
+        self.appointment_repo.get_by_date_range.assert_called_once()
+        self.assertEqual([entry["doctor"].id for entry in matrix], [3, 2, 1])
+        self.assertEqual(matrix[0]["first_available"], datetime(2023, 1, 2, 9, 0))
+        self.assertEqual(matrix[1]["first_available"], datetime(2023, 1, 2, 9, 30))
+        self.assertEqual(matrix[2]["first_available"], datetime(2023, 1, 2, 10, 0))
+        self.assertEqual(matrix[2]["free_slots"], 14)
 
 class TestSearchService(unittest.TestCase):
     """Test cases for SearchService"""
@@ -283,6 +343,28 @@ class TestSearchService(unittest.TestCase):
         self.assertEqual(patients[0].first_name, "John")
         self.assertEqual(patients[0].last_name, "Doe")
     
+    def test_iter_medical_records_by_regex(self):
+        """Test streaming regex search over medical records"""
+        records = [
+            MagicMock(record_id=i, patient_id=i % 2, diagnosis=f"Diagnosis {i}",
+                      treatment_plan="Rest", notes=None, date_created=datetime(2022, 1, 1))
+            for i in range(5)
+        ]
+        self.medical_record_repo.iter_regex_search.return_value = iter(records)
+        self.patient_repo.get_by_ids.side_effect = lambda ids: {i: f"patient {i}" for i in ids}
+        
+        results = self.search_service.iter_medical_records_by_regex(r"diagnosis \d", batch_size=2)
+        
+        # Nothing is loaded until the results are consumed
+        self.medical_record_repo.iter_regex_search.assert_not_called()
+        self.assertEqual([r.record_id for r in results], [0, 1, 2, 3, 4])
+        
+        self.medical_record_repo.iter_regex_search.assert_called_once_with(
+            r"diagnosis \d", ("diagnosis", "treatment_plan", "notes"), 2
+        )
+        # One patient lookup per batch of records
+        self.assertEqual(self.patient_repo.get_by_ids.call_count, 3)
+    
     def test_filter_results(self):
         """Test filtering search results"""
         # Create test data
@@ -308,6 +390,192 @@ class TestSearchService(unittest.TestCase):
         self.assertEqual(len(filtered), 1)
         self.assertEqual(filtered[0].name, "Item 1")
 
+class TestAppointmentQueryCounts(unittest.TestCase):
+    """Query-count regression tests for AppointmentService"""
+    
+    def setUp(self):
+        """Set up test database"""
+        self.engine = create_engine('sqlite:///:memory:')
+        Base.metadata.create_all(self.engine)
+        # Lazy relationship loads raise, so an N+1 in a service fails here
+        self.Session = sessionmaker(bind=self.engine, info={STRICT_LOADING_KEY: True})
+        
+        # Count every statement sent to the database
+        self.statements = []
+        event.listen(self.engine, "before_cursor_execute", self._count_statement)
+    
+    def tearDown(self):
+        """Clean up after tests"""
+        event.remove(self.engine, "before_cursor_execute", self._count_statement)
+        self.engine.dispose()
+    
+    def _count_statement(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+    
+    def create_appointments(self, count):
+        """Create count appointments spread across several patients and doctors"""
+        session = self.Session()
+        patients = [
+            Patient(
+                first_name=f"Patient{i}", last_name="Test", email=f"patient{count}_{i}@example.com",
+                dob=datetime(1980, 1, 1).date(), patient_id=f"P{count:04d}{i:04d}"
+            ) for i in range(5)
+        ]
+        doctors = [
+            Doctor(
+                first_name=f"Doctor{i}", last_name="Test", email=f"doctor{count}_{i}@example.com",
+                dob=datetime(1970, 1, 1).date(), staff_id=f"D{count:04d}{i:04d}", role="Doctor",
+                specialisation="General", license_number=f"MD{count:04d}{i:04d}"
+            ) for i in range(3)
+        ]
+        session.add_all(patients + doctors)
+        session.commit()
+        
+        base_time = datetime(2023, 1, 2, 9, 0)
+        session.add_all([
+            Appointment(
+                patient_id=patients[i % len(patients)].id,
+                doctor_id=doctors[0].id,
+                schedule_time=base_time + timedelta(minutes=30 * i),
+                duration=30
+            ) for i in range(count)
+        ])
+        session.commit()
+        doctor_id = doctors[0].id
+        session.close()
+        return doctor_id
+    
+    def count_queries(self, func):
+        """Run func against a fresh session and return (result, query count)"""
+        session = self.Session()
+        service = AppointmentService(
+            AppointmentRepository(session), PatientRepository(session), DoctorRepository(session)
+        )
+        self.statements.clear()
+        result = func(service)
+        query_count = len(self.statements)
+        session.close()
+        return result, query_count
+    
+    def test_query_count_is_constant(self):
+        """Test that listing appointments does not issue a query per row"""
+        small_doctor = self.create_appointments(5)
+        large_doctor = self.create_appointments(200)
+        
+        small, small_queries = self.count_queries(
+            lambda service: service.get_appointments_for_doctor(small_doctor)
+        )
+        large, large_queries = self.count_queries(
+            lambda service: service.get_appointments_for_doctor(large_doctor)
+        )
+        
+        self.assertEqual(len(small), 5)
+        self.assertEqual(len(large), 200)
+        self.assertEqual(small_queries, large_queries)
+        self.assertLessEqual(large_queries, 3)
+        
+        # Patients and doctors are attached to every appointment
+        self.assertTrue(all(a.patient is not None and a.doctor is not None for a in large))
+        self.assertEqual(large[0].doctor.id, large_doctor)
+    
+    def test_find_available_slots_single_query(self):
+        """Test that finding a day's free slots costs one query"""
+        doctor_id = self.create_appointments(8)  # 9:00 - 13:00 on 2023-01-02
+        
+        session = self.Session()
+        session.add(Appointment(
+            patient_id=session.query(Patient).first().id, doctor_id=doctor_id,
+            schedule_time=datetime(2023, 1, 2, 15, 0), duration=60, status="cancelled"
+        ))
+        session.commit()
+        session.close()
+        
+        slots, query_count = self.count_queries(
+            lambda service: service.find_available_slots(doctor_id, "2023-01-02", 30)
+        )
+        
+        self.assertEqual(query_count, 1)
+        self.assertEqual(slots[0], datetime(2023, 1, 2, 13, 0))
+        self.assertEqual(len(slots), 8)
+    
+    def test_availability_matrix_query_count(self):
+        """Test that the availability matrix uses one doctor and one range query"""
+        busy_doctor = self.create_appointments(16)  # 9:00 - 17:00 on 2023-01-02
+        
+        matrix, query_count = self.count_queries(
+            lambda service: service.find_availability_matrix("General", "2023-01-02", "2023-01-03")
+        )
+        
+        self.assertEqual(query_count, 2)
+        self.assertEqual(len(matrix), 3)
+        
+        # The fully booked doctor is ranked last
+        self.assertEqual(matrix[-1]["doctor"].id, busy_doctor)
+        self.assertEqual(matrix[-1]["first_available"], datetime(2023, 1, 3, 9, 0))
+        self.assertEqual(matrix[-1]["free_slots"], 16)
+        self.assertEqual(matrix[0]["first_available"], datetime(2023, 1, 2, 9, 0))
+        self.assertEqual(matrix[0]["free_slots"], 32)
+    
+    def test_audit_conflicts(self):
+        """Test auditing overlapping bookings straight from the database"""
+        doctor_id = self.create_appointments(4)  # 9:00 - 11:00 on 2023-01-02
+        
+        session = self.Session()
+        patient_id = session.query(Patient).first().id
+        session.add_all([
+            Appointment(patient_id=patient_id, doctor_id=doctor_id,
+                        schedule_time=datetime(2023, 1, 2, 9, 15), duration=60),
+            Appointment(patient_id=patient_id, doctor_id=doctor_id, status="cancelled",
+                        schedule_time=datetime(2023, 1, 2, 9, 0), duration=30)
+        ])
+        session.commit()
+        session.close()
+        
+        conflicts, _ = self.count_queries(
+            lambda service: service.audit_conflicts("2023-01-01", "2023-12-31")
+        )
+        
+        pairs = [(a.schedule_time.strftime("%H:%M"), b.schedule_time.strftime("%H:%M")) for a, b in conflicts]
+        self.assertEqual(sorted(pairs), [("09:00", "09:15"), ("09:15", "09:30"), ("09:15", "10:00")])
+    
+    def test_search_appointments_query_count(self):
+        """Test that searching appointments uses batched hydration"""
+        doctor_id = self.create_appointments(50)
+        
+        def search(service):
+            search_service = SearchService(
+                service.patient_repository, service.doctor_repository,
+                service.appointment_repository, None
+            )
+            return search_service.search_appointments(doctor_id=doctor_id)
+        
+        appointments, query_count = self.count_queries(search)
+        
+        self.assertEqual(len(appointments), 50)
+        self.assertLessEqual(query_count, 3)
+        self.assertEqual(len({a.patient.id for a in appointments}), 5)
+    
+    def test_search_appointments_page(self):
+        """Test paging through appointment search results in schedule order"""
+        doctor_id = self.create_appointments(25)
+        session = self.Session()
+        search_service = SearchService(
+            PatientRepository(session), DoctorRepository(session), AppointmentRepository(session), None
+        )
+        
+        pages, cursor = [], None
+        while True:
+            page, cursor = search_service.search_appointments_page(doctor_id=doctor_id, limit=10, after=cursor)
+            pages.append(page)
+            if cursor is None:
+                break
+        
+        times = [a.schedule_time for page in pages for a in page]
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+        self.assertEqual(times, sorted(times))
+        self.assertEqual(len(set(a.appointment_id for page in pages for a in page)), 25)
+        session.close()
+
 if __name__ == '__main__':
     unittest.main()
 
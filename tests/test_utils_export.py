@@ -7,10 +7,17 @@ import sys
 import tempfile
 import json
 import csv
+import io
+from contextlib import redirect_stdout
+from datetime import date
 
 # Add parent directory to path to import modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from cli.cmd_executor import execute_command
+from db.models import Base, Patient
 from utils.export import export_to_csv, export_to_json, export_report
 
 class TestExport(unittest.TestCase):
@@ -66,6 +73,25 @@ class TestExport(unittest.TestCase):
             self.assertEqual(rows[2]["name"], "Bob")
             self.assertEqual(int(rows[2]["age"]), 40)
     
+    def test_export_to_csv_from_iterator(self):
+        """Test exporting rows from a lazy iterable"""
+        class Row:
+            def __init__(self, id):
+                self.id = id
+            
+            def to_dict(self):
+                return {"id": self.id, "square": self.id * self.id}
+        
+        filename = os.path.join(self.temp_dir.name, "stream.csv")
+        export_to_csv((Row(i) for i in range(1000)), filename)
+        
+        with open(filename, 'r', newline='') as csvfile:
+            rows = list(csv.DictReader(csvfile))
+        
+        self.assertEqual(len(rows), 1000)
+        self.assertEqual(rows[0], {"id": "0", "square": "0"})
+        self.assertEqual(rows[-1]["square"], str(999 * 999))
+    
     def test_export_to_json(self):
         """Test exporting data to JSON"""
         # Create test data
@@ -126,6 +152,54 @@ class TestExport(unittest.TestCase):
         with self.assertRaises(ValueError):
             export_report(data, "invalid.xyz", format_type="xyz")
 
+class TestReportExportCommand(unittest.TestCase):
+    """Test cases for the streaming report export command"""
+    
+    def setUp(self):
+        """Set up a database with two patients and an export directory"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        engine = create_engine('sqlite:///:memory:')
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        session = Session()
+        session.add_all([
+            Patient(first_name="John", last_name="Doe", dob=date(1980, 1, 1),
+                    email="john.doe@example.com", patient_id="P001"),
+            Patient(first_name="Jane", last_name="Smith", dob=date(1985, 6, 1),
+                    email="jane.smith@example.com", patient_id="P002"),
+        ])
+        session.commit()
+        session.close()
+        self.config = {"db_session": Session, "export": {"default_directory": self.temp_dir.name}}
+    
+    def tearDown(self):
+        """Clean up after tests"""
+        self.temp_dir.cleanup()
+    
+    def export(self, filters):
+        """Run the export command for patients and return its output"""
+        options = {"type": "patients", "format": "csv", "output": "patients.csv", "filters": filters}
+        with redirect_stdout(io.StringIO()) as output:
+            execute_command("report", "export", {"args": [], "options": options}, self.config)
+        return output.getvalue()
+    
+    def test_filters_match_column_values(self):
+        """Test that filters are matched against the exported column values"""
+        output = self.export("last_name=Doe")
+        self.assertIn("Report exported successfully", output)
+        with open(os.path.join(self.temp_dir.name, "patients.csv"), newline="") as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual([row["patient_id"] for row in rows], ["P001"])
+    
+    def test_unknown_filter_fields(self):
+        """Test that relationship and unknown fields are rejected before exporting"""
+        for filters in ("appointments=1", "last_name=Doe,nickname=JD"):
+            with self.subTest(filters=filters):
+                output = self.export(filters)
+                self.assertIn("Unknown filter field", output)
+                self.assertNotIn("Error executing command", output)
+                self.assertFalse(os.path.exists(os.path.join(self.temp_dir.name, "patients.csv")))
+
 if __name__ == '__main__':
     unittest.main()
 
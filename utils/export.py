@@ -5,6 +5,7 @@ import csv
 import json
 import os
 import logging
+from itertools import chain
 
 logger = logging.getLogger(__name__)
 
@@ -13,7 +14,7 @@ def export_to_csv(data, filename, headers=None):
     Export data to CSV file
     
     Args:
-        data: List of dictionaries or objects with to_dict method
+        data: List or lazy iterable of dictionaries or objects with to_dict method
         filename: Output filename
         headers: Optional list of column headers
     
@@ -24,19 +25,26 @@ def export_to_csv(data, filename, headers=None):
         # Ensure the directory exists
         os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
         
-        # Convert objects to dictionaries if needed
-        if data and hasattr(data[0], 'to_dict'):
-            data = [item.to_dict() for item in data]
+        # Peek at the first item without materialising the rest
+        items = iter(data or ())
+        first = next(items, None)
+        rows = chain([first], items) if first is not None else iter(())
+        
+        # Convert objects to dictionaries as they are written
+        if hasattr(first, 'to_dict'):
+            first = first.to_dict()
+            rows = chain([first], (item.to_dict() for item in items))
         
         # Determine headers if not provided
-        if not headers and data:
-            headers = list(data[0].keys())
+        if not headers and first is not None:
+            headers = list(first.keys())
         
-        # Write to CSV
+        # Write to CSV one row at a time
         with open(filename, 'w', newline='') as csvfile:
             writer = csv.DictWriter(csvfile, fieldnames=headers)
             writer.writeheader()
-            writer.writerows(data)
+            for row in rows:
+                writer.writerow(row)
         
         logger.info(f"Data exported to CSV: {filename}")
         return filename